@@ -1,14 +1,23 @@
+import os
+import sys
 import cv2
-import mediapipe as mp
 import numpy as np
 import math
+import time
+
+# Share the hand-tracking engine with HoloDoodle Pro
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "holodoodle-pro", "backend"))
+from engine.gesture import GestureRecognizer, draw_skeleton
+from engine.filters import TipSmoother
+from engine.sources import CameraSource
 
 # -------------------------
 # Setup
 # -------------------------
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-hands = mp_hands.Hands(max_num_hands=1, min_detection_confidence=0.7)
+# Adaptive inference: half-resolution detection, cropped to the last hand,
+# full MediaPipe pass every 2nd frame with predicted landmarks in between.
+# Up to two hands draw at once, each with its own stroke
+recognizer = GestureRecognizer(inference_scale=0.5, roi_tracking=True, detect_every=2, max_hands=2)
 
 # Drawing canvas
 canvas = None
@@ -18,8 +27,9 @@ MODES = ["neon", "sparkle", "fire"]
 mode_i = 0
 brush_mode = MODES[mode_i]
 
-# Smoothing
-prev_x, prev_y = None, None
+# Smoothing: One-Euro filtered fingertip per hand ID, sub-2px jitter is not drawn
+tip_smoothers = {}
+prev_points = {}
 
 # -------------------------
 # UPGRADE 3: Optimized Cyberpunk Color Cycling
@@ -59,21 +69,26 @@ def fire_brush(img, x1, y1, x2, y2):
     cv2.line(img, (x1, y1), (x2, y2), fire_core, 12)   # animated orange core
     cv2.line(img, (x1, y1), (x2, y2), fire_outside, 4)     # animated red outside
 
+# Brush name -> draw function, looked up once per segment
+BRUSH_FUNCS = {"neon": neon_brush, "sparkle": sparkle_brush, "fire": fire_brush}
+
 # -------------------------
 # Main App
 # -------------------------
-cap = cv2.VideoCapture(0)
+# Capture runs on its own thread into a frame ring; the loop takes the newest frame
+source = CameraSource(0, mirror=True).start()
+last_seq = -1
 print("\n🔥 Controls:")
 print("Press 'm' to change brush (neon/sparkle/fire)")
 print("Press 'c' to clear screen")
 print("Press 'q' to quit\n")
 
 while True:
-    ret, frame = cap.read()
-    if not ret:
+    item = source.wait(last_seq)
+    if item is None:
         break
-    
-    frame = cv2.flip(frame, 1)
+    # Zero-copy view of the ring slot; it is only reused 8 frames later, so drawing on it is safe
+    last_seq, _, frame = item
     h, w, _ = frame.shape
 
     # Initialize canvas once
@@ -84,28 +99,29 @@ while True:
     canvas = (canvas * 0.92).astype(np.uint8)  # Less fade = faster
 
     # Normal camera feed - no filters
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = hands.process(rgb)
-
-    if results.multi_hand_landmarks:
-        hand = results.multi_hand_landmarks[0]
+    hands = recognizer.get_hands(frame)
+    now = time.monotonic()
 
+    for hand_id, points in zip(hands.ids.tolist(), hands.points):
         # Index finger tip (landmark 8)
-        x = int(hand.landmark[8].x * w)
-        y = int(hand.landmark[8].y * h)
+        smoother = tip_smoothers.setdefault(hand_id, TipSmoother())
+        point = smoother.update(points[8, 0] * w, points[8, 1] * h, now)
+
+        if point is not None:
+            x, y = int(point[0]), int(point[1])
+            prev = prev_points.get(hand_id)
+            if prev is not None:
+                BRUSH_FUNCS[brush_mode](canvas, prev[0], prev[1], x, y)
 
-        if prev_x is not None:
-            if brush_mode == "neon":
-                neon_brush(canvas, prev_x, prev_y, x, y)
-            elif brush_mode == "sparkle":
-                sparkle_brush(canvas, prev_x, prev_y, x, y)
-            elif brush_mode == "fire":
-                fire_brush(canvas, prev_x, prev_y, x, y)
+            prev_points[hand_id] = (x, y)
 
-        prev_x, prev_y = x, y
+    # Hands that left the frame lift their pen
+    for hand_id in set(prev_points) - set(hands.ids.tolist()):
+        del prev_points[hand_id]
+        tip_smoothers.pop(hand_id, None)
 
-        # Draw skeleton on screen
-        mp_drawing.draw_landmarks(frame, hand, mp_hands.HAND_CONNECTIONS)
+    # Draw skeletons on screen
+    draw_skeleton(frame, hands.points)
 
     # Mix canvas with webcam
     blended = cv2.addWeighted(frame, 0.5, canvas, 1, 0)
@@ -125,9 +141,11 @@ while True:
         brush_mode = MODES[mode_i]
     if key == ord('c'):   # clear
         canvas = np.zeros_like(frame, dtype=np.uint8)
-        prev_x, prev_y = None, None
+        prev_points.clear()
+        tip_smoothers.clear()
     if key == ord('q'):
         break
 
-cap.release()
+source.stop()
 cv2.destroyAllWindows()
+print(f"Inference stats: {recognizer.stats_dict()}")
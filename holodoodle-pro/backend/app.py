@@ -1,22 +1,29 @@
+import io
+import math
+import os
 import cv2
 import numpy as np
-import base64
 import json
 import asyncio
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import time
+import uuid
+from functools import partial
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi import HTTPException, Query
+from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
 import uvicorn
-import mediapipe as mp
-
-from engine.gesture import GestureRecognizer
-from engine.utils import Canvas
-from engine.particles import ParticleSystem
-from engine.brushes import (
-    neon_glow_brush, lightning_brush, fire_brush, 
-    galaxy_brush, energy_whirl_brush
+
+from engine.encoding import DEFAULT_RUNG, RUNGS
+from engine.gesture import GESTURE_NAMES, GestureRecognizer
+from engine.metrics import CONTENT_TYPE, render_metrics
+from engine.session import BRUSHES, SessionManager
+from engine.sources import CameraSource
+from engine.transport import (
+    CODECS, DeltaViewer, StateTracker, encode_image, frame_to_base64, pack_frame, pack_landmarks, pack_state,
+    pack_strokes
 )
-from engine.shaders import apply_shader_effects, ripple_pulse
 
 app = FastAPI()
 
@@ -29,169 +36,235 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global state
-BRUSHES = ["neon", "lightning", "fire", "galaxy", "energy"]
-brush_index = 0
-drawing_enabled = True
-glow_mode = False
-glitch_mode = False
-particle_intensity = 1.0
+# Output pacing
+TARGET_FPS = 30
+STATS_INTERVAL = 1.0  # seconds between pipeline stats messages
+LATE_JOIN_SECONDS = 2.0  # client-rendered viewers joining a room get its strokes this recent (older ones have faded)
+MAX_EXPORT_SIZE = 4096   # largest width/height /rooms/<room>/strokes renders
+
+# Adaptive hand-tracking inference (see GestureRecognizer)
+INFERENCE_SCALE = 0.5  # detect on a half-resolution copy
+ROI_TRACKING = True    # crop around the tracked hands
+ROI_RESCAN_EVERY = 10  # while fewer than MAX_HANDS are tracked, look for new ones on the full frame every Nth detection
+DETECT_EVERY = 1       # >1 predicts landmarks on the frames in between
+MAX_HANDS = 4          # hands tracked per source, each drawing with its own brush
+
+# Step quality down (JPEG quality, particles, bloom, inference size, shaders,
+# output size) when frames run over the TARGET_FPS budget, and back up after
+ADAPTIVE_QUALITY = True
+
+# Time every render sub-stage for /metrics; HOLODOODLE_PROFILE=0 leaves only the coarse stages
+PROFILE = os.environ.get("HOLODOODLE_PROFILE", "1") != "0"
+
+# Record every room's landmarks to <dir>/<room>-<time>.trace (see replay_trace.py)
+TRACE_DIR = os.environ.get("HOLODOODLE_TRACE_DIR")
+
+# Camera indices a /ws client may pick with ?source=, comma-separated; anything
+# else is refused. Video files, image sequences and synthetic frames
+# (engine.sources.open_source) are for local tools and benchmarks only
+ALLOWED_SOURCES = {v.strip() for v in os.environ.get("HOLODOODLE_CAMERAS", "0").split(",") if v.strip().isdigit()}
+
+def open_camera(source_id):
+    """Capture device for an allowed ?source= camera index, mirrored like a selfie view"""
+    return CameraSource(int(source_id))
+
+def encode_variant(frame, variant, quality=85):
+    """Encode a rendered frame for one (protocol, codec) transport variant; the rung is applied by the room"""
+    protocol, codec = variant
+    if protocol == "binary":
+        return encode_image(frame, codec, quality)
+    return frame_to_base64(frame, quality)
+
+make_recognizer = partial(GestureRecognizer, inference_scale=INFERENCE_SCALE, roi_tracking=ROI_TRACKING,
+                          detect_every=DETECT_EVERY, max_hands=MAX_HANDS, rescan_every=ROI_RESCAN_EVERY)
+sessions = SessionManager(open_camera, make_recognizer, encode_variant, trace_dir=TRACE_DIR, profile=PROFILE,
+                          target_fps=TARGET_FPS if ADAPTIVE_QUALITY else None)
 
-def frame_to_base64(frame):
-    """Convert frame to base64 string"""
-    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-    return base64.b64encode(buffer).decode('utf-8')
+async def stream_landmarks(websocket, source_id, room_id=None):
+    """Client-side rendering: send landmarks, fired gestures and state, the browser draws the rest"""
+    await websocket.send_json({"type": "hello", "protocol": "landmarks", "brushes": BRUSHES,
+                               "gestures": GESTURE_NAMES})
+    # Late joiner: the room's still-visible strokes as vectors, instead of an empty canvas
+    log = await asyncio.to_thread(sessions.stroke_log, room_id) if room_id else None
+    if log is not None:
+        now = time.monotonic()
+        indices = log.current(since=now - LATE_JOIN_SECONDS)
+        if len(indices):
+            await websocket.send_bytes(pack_strokes(log, indices, now))
+    try:
+        producer, stream, queue = await asyncio.to_thread(sessions.watch, uuid.uuid4().hex, source_id,
+                                                          loop=asyncio.get_running_loop())
+    except (ValueError, cv2.error) as error:
+        await websocket.close(status.WS_1011_INTERNAL_ERROR, str(error)[:120])
+        return
+    state_tracker = StateTracker()
+    next_stats = time.perf_counter() + STATS_INTERVAL
+    
+    try:
+        while producer.running:
+            # Every inferred frame is forwarded (strokes follow the whole fingertip path),
+            # so wait on the subscription instead of pacing to TARGET_FPS. It is
+            # awaited on the loop, so idle viewers hold no executor thread.
+            item = await queue.get_async(STATS_INTERVAL)
+            if item is not None:
+                seq, timestamp, _, landmarks = item
+                hands, present, state = stream.update(timestamp, landmarks)
+                send_start = time.perf_counter()
+                if state_tracker.changed(state):
+                    await websocket.send_bytes(pack_state(state, BRUSHES))
+                message = pack_landmarks(seq, timestamp, hands.points, [
+                    (hand.id, GESTURE_NAMES.index(gesture) if gesture else -1, hand.brush_index, hand.drawing_enabled)
+                    for hand, gesture in present
+                ])
+                await websocket.send_bytes(message)
+                stream.record_send(send_start, len(message))
+            
+            now = time.perf_counter()
+            if now >= next_stats:
+                await websocket.send_json({"type": "stats", **stream.stats_dict()})
+                next_stats = now + STATS_INTERVAL
+    
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await asyncio.to_thread(sessions.unwatch, source_id, producer, stream, queue)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    source_id = websocket.query_params.get("source", "0")
+    if source_id not in ALLOWED_SOURCES:
+        await websocket.close(status.WS_1008_POLICY_VIOLATION, f"Unknown source {source_id!r}")
+        return
     
-    global brush_index, drawing_enabled, glow_mode, glitch_mode, particle_intensity
+    # ?protocol=landmarks: the browser renders strokes and effects itself (see stream_landmarks)
+    if websocket.query_params.get("protocol") == "landmarks":
+        await stream_landmarks(websocket, source_id, websocket.query_params.get("room"))
+        return
     
-    # Initialize components
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    # Transport negotiation: ?protocol=binary[&codec=webp] streams raw image bytes,
+    # adding &delta=1 sends keyframes plus changed tiles only; ?rung=medium|low picks
+    # a smaller, lower-quality encode shared with every viewer on the same rung
+    binary = websocket.query_params.get("protocol") == "binary"
+    delta = binary and websocket.query_params.get("delta") == "1"
+    codec = websocket.query_params.get("codec", "jpeg")
+    if codec not in CODECS:
+        codec = "jpeg"
+    rung = websocket.query_params.get("rung", DEFAULT_RUNG)
+    if rung not in RUNGS:
+        rung = DEFAULT_RUNG
+    if binary:
+        await websocket.send_json({"type": "hello", "protocol": "binary", "codec": codec, "delta": delta,
+                                   "rung": rung, "brushes": BRUSHES})
+    variant = ("delta" if delta else "binary", codec, rung) if binary else ("json", "jpeg", rung)
+    delta_viewer = DeltaViewer()
     
-    gesture_recognizer = GestureRecognizer()
-    canvas = None
-    particle_system = ParticleSystem(max_particles=300)
+    # Viewers sharing ?room= see (and draw on) the same session; the default is private
+    room_id = websocket.query_params.get("room")
+    try:
+        # Opening the source and building the recognizer block, keep them off the event loop
+        room = await asyncio.to_thread(sessions.join, room_id or uuid.uuid4().hex, source_id, variant,
+                                         not room_id)
+    except (ValueError, cv2.error) as error:
+        await websocket.close(status.WS_1011_INTERNAL_ERROR, str(error)[:120])
+        return
+    # ?hud=1 overlays stage timings on the room's frames
+    if websocket.query_params.get("hud") == "1":
+        room.session.hud = True
     
-    prev_x, prev_y = None, None
-    time_counter = 0
-    last_gesture = None
-    gesture_cooldown = 0
+    # Pace sends to the target frame rate instead of sleeping a fixed amount
+    period = 1.0 / TARGET_FPS
+    next_tick = time.perf_counter()
+    next_stats = next_tick + STATS_INTERVAL
+    state_tracker = StateTracker()
+    last_seq = 0
     
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame = cv2.flip(frame, 1)
-            h, w = frame.shape[:2]
-            
-            if canvas is None:
-                canvas = Canvas(h, w)
-            
-            # Fade canvas
-            canvas.fade()
-            
-            # Get hand landmarks
-            landmarks = gesture_recognizer.get_landmarks(frame)
+        while room.running:
+            latest = room.latest()
+            if latest is not None and latest[0] > last_seq:
+                last_seq, (state, encoded) = latest
+                data = encoded.get(variant)
+                if data is None:
+                    # First frame after this viewer's rung joined: encode it from the room's frame cache
+                    # (delta variants give None and start on the next frame)
+                    data = await asyncio.to_thread(room.encoded, last_seq, variant)
+                if data is not None:
+                    send_start = time.perf_counter()
+                    if binary:
+                        if state_tracker.changed(state):
+                            await websocket.send_bytes(pack_state(state, BRUSHES))
+                        messages = delta_viewer.messages(last_seq, data, codec) if delta else [pack_frame(last_seq, data, codec)]
+                        for message in messages:
+                            await websocket.send_bytes(message)
+                        size = sum(len(message) for message in messages)
+                    else:
+                        await websocket.send_json({"type": "frame", "data": data, **state})
+                        size = len(data)
+                    room.record_send(send_start, size)
             
-            # Detect gesture
-            gesture = None
-            if landmarks and gesture_cooldown == 0:
-                gesture = gesture_recognizer.detect_gesture(landmarks)
-                if gesture and gesture != last_gesture:
-                    # Handle gestures
-                    if gesture == "peace":
-                        brush_index = (brush_index + 1) % len(BRUSHES)
-                        # Ripple effect on brush change
-                        center = (w // 2, h // 2)
-                        frame = ripple_pulse(frame, center, 50, 30)
-                    elif gesture == "thumbs_up":
-                        glow_mode = not glow_mode
-                    elif gesture == "pinch":
-                        drawing_enabled = not drawing_enabled
-                    elif gesture == "fist":
-                        canvas.clear()
-                        particle_system.clear()
-                    elif gesture == "rock":
-                        glitch_mode = not glitch_mode
-                    
-                    last_gesture = gesture
-                    gesture_cooldown = 15
+            now = time.perf_counter()
+            if now >= next_stats:
+                await websocket.send_json({"type": "stats", **room.stats_dict()})
+                next_stats = now + STATS_INTERVAL
             
-            if gesture_cooldown > 0:
-                gesture_cooldown -= 1
-            
-            # Drawing logic
-            if landmarks and drawing_enabled:
-                x, y = gesture_recognizer.get_finger_tip(landmarks, 8)
-                if x and y:
-                    x_pixel = int(x * w)
-                    y_pixel = int(y * h)
-                    
-                    if prev_x is not None:
-                        # Get time for animation
-                        t = (time_counter % 1000) / 1000.0
-                        
-                        # Apply brush
-                        brush_name = BRUSHES[brush_index]
-                        canvas_img = canvas.get_canvas()
-                        
-                        if brush_name == "neon":
-                            neon_glow_brush(canvas_img, prev_x, prev_y, x_pixel, y_pixel, t)
-                        elif brush_name == "lightning":
-                            lightning_brush(canvas_img, prev_x, prev_y, x_pixel, y_pixel, t)
-                        elif brush_name == "fire":
-                            fire_brush(canvas_img, prev_x, prev_y, x_pixel, y_pixel, t)
-                        elif brush_name == "galaxy":
-                            galaxy_brush(canvas_img, prev_x, prev_y, x_pixel, y_pixel, t)
-                        elif brush_name == "energy":
-                            energy_whirl_brush(canvas_img, prev_x, prev_y, x_pixel, y_pixel, t, frame)
-                        
-                        canvas.set_canvas(canvas_img)
-                        
-                        # Spawn particles
-                        if particle_intensity > 0:
-                            color = (255, int(200 + 55 * t), int(100 + 155 * t))
-                            particle_system.spawn_trail(x_pixel, y_pixel, color, int(3 * particle_intensity))
-                    
-                    prev_x, prev_y = x_pixel, y_pixel
-                    
-                    # Draw hand skeleton
-                    mp_drawing = mp.solutions.drawing_utils
-                    mp_hands = mp.solutions.hands
-                    mp_drawing.draw_landmarks(frame, landmarks, mp_hands.HAND_CONNECTIONS)
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
             else:
-                prev_x, prev_y = None, None
-            
-            # Update particles
-            canvas_img = canvas.get_canvas()
-            particle_system.update(canvas_img)
-            canvas.set_canvas(canvas_img)
-            
-            # Blend canvas with frame
-            blended = cv2.addWeighted(frame, 0.5, canvas.get_canvas(), 1.0, 0)
-            
-            # Apply shader effects
-            shader_config = {
-                'chromatic_aberration': glow_mode,
-                'glitch': glitch_mode,
-                'vhs_noise': glitch_mode,
-                'chromatic_intensity': 3,
-                'glitch_intensity': 5,
-                'vhs_intensity': 10
-            }
-            blended = apply_shader_effects(blended, shader_config)
-            
-            # Add UI text
-            cv2.putText(blended, f"Brush: {BRUSHES[brush_index].upper()}", (10, 30),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            cv2.putText(blended, f"Drawing: {'ON' if drawing_enabled else 'OFF'}", (10, 60),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if drawing_enabled else (0, 0, 255), 2)
-            
-            # Send frame
-            frame_b64 = frame_to_base64(blended)
-            await websocket.send_json({
-                "type": "frame",
-                "data": frame_b64,
-                "brush": BRUSHES[brush_index],
-                "drawing": drawing_enabled,
-                "glow": glow_mode,
-                "glitch": glitch_mode
-            })
-            
-            time_counter += 1
-            await asyncio.sleep(0.03)  # ~30 FPS
+                # Running late: resync instead of bursting to catch up
+                room.late_frames += 1
+                next_tick = time.perf_counter()
+                await asyncio.sleep(0)
             
     except WebSocketDisconnect:
         pass
     finally:
-        cap.release()
+        await asyncio.to_thread(sessions.leave, room, variant)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: per-stage histograms, drops, late frames, bytes sent"""
+    return Response(await asyncio.to_thread(render_metrics, sessions), media_type=CONTENT_TYPE)
+
+def parse_viewport(viewport):
+    """Normalized (x1, y1, x2, y2) from "x1,y1,x2,y2", HTTP 400 unless x1 < x2 and y1 < y2 are finite"""
+    try:
+        box = tuple(float(v) for v in viewport.split(","))
+    except ValueError:
+        box = ()
+    if len(box) != 4 or not all(math.isfinite(v) for v in box) or box[0] >= box[2] or box[1] >= box[3]:
+        raise HTTPException(400, f"viewport must be x1,y1,x2,y2 with x1 < x2 and y1 < y2, got {viewport!r}")
+    return box
+
+@app.get("/rooms/{room_id}/strokes")
+async def room_strokes(room_id: str, format: str = "svg", since: float = None, until: float = None,
+                       viewport: str = None, width: int = Query(None, gt=0, le=MAX_EXPORT_SIZE),
+                       height: int = Query(None, gt=0, le=MAX_EXPORT_SIZE), history: bool = False):
+    """A room's logged strokes as SVG, the binary stroke log format or a re-rasterized PNG.
+
+    since/until are seconds since the room started, viewport is normalized
+    "x1,y1,x2,y2" and is stretched over the output when rendering a PNG.
+    Strokes a fist has cleared are left out unless history is set. width and
+    height are capped at MAX_EXPORT_SIZE, since a PNG is allocated at full size.
+    """
+    log = await asyncio.to_thread(sessions.stroke_log, room_id)
+    if log is None:
+        raise HTTPException(404, f"No strokes for room {room_id}")
+    box = parse_viewport(viewport) if viewport else None
+    indices = log.query(box, None if since is None else log.origin + since,
+                        None if until is None else log.origin + until, history)
+    if format == "svg":
+        return Response(log.to_svg(indices, width, height), media_type="image/svg+xml")
+    if format == "bin":
+        buffer = io.BytesIO()
+        log.dump(buffer, indices)
+        return Response(buffer.getvalue(), media_type="application/octet-stream")
+    if format == "png":
+        image = await asyncio.to_thread(log.rasterize, height or log.height, width or log.width, indices, box)
+        return Response(cv2.imencode(".png", image)[1].tobytes(), media_type="image/png")
+    raise HTTPException(400, f"Unknown format {format!r}")
 
 @app.get("/")
 async def root():
@@ -0,0 +1,74 @@
+import time
+import tracemalloc
+import numpy as np
+
+RESOLUTIONS = {"480p": (480, 640), "720p": (720, 1280), "1080p": (1080, 1920)}
+
+class Case:
+    """One benchmark: make() builds fixtures and returns (call, reset).
+
+    call() is the timed operation; reset(), if not None, runs untimed before
+    every call to put the fixtures back into the state being measured.
+    """
+
+    def __init__(self, name, params, make):
+        self.name = name
+        self.params = params
+        self.make = make
+
+    @property
+    def key(self):
+        return self.name + "".join(f" {k}={v}" for k, v in self.params.items())
+
+def measure(case, repeat=200, warmup=5, alloc_repeat=20):
+    """Time case repeat times and trace allocations on alloc_repeat more calls"""
+    call, reset = case.make()
+    for _ in range(warmup):
+        if reset is not None:
+            reset()
+        call()
+
+    times = np.empty(repeat)
+    for i in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        call()
+        times[i] = time.perf_counter() - start
+
+    # Separate pass: tracemalloc slows everything down, so it never overlaps timing
+    peaks = np.empty(alloc_repeat)
+    tracemalloc.start()
+    try:
+        for i in range(alloc_repeat):
+            if reset is not None:
+                reset()
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            call()
+            peaks[i] = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+    times *= 1000.0
+    return {
+        "name": case.name,
+        "params": case.params,
+        "calls": repeat,
+        "p50_ms": round(float(np.percentile(times, 50)), 4),
+        "p99_ms": round(float(np.percentile(times, 99)), 4),
+        "mean_ms": round(float(times.mean()), 4),
+        "min_ms": round(float(times.min()), 4),
+        "alloc_peak_kb": round(float(np.median(peaks)) / 1024, 1),
+    }
+
+def compare(results, baseline, threshold=0.1):
+    """Rows (key, old p50, new p50, ratio) for cases present in both runs, slowest change first"""
+    old = {Case(r["name"], r["params"], None).key: r for r in baseline["results"]}
+    rows = []
+    for r in results["results"]:
+        key = Case(r["name"], r["params"], None).key
+        if key in old and old[key]["p50_ms"] > 0:
+            ratio = r["p50_ms"] / old[key]["p50_ms"]
+            rows.append((key, old[key]["p50_ms"], r["p50_ms"], ratio, abs(ratio - 1) > threshold))
+    return sorted(rows, key=lambda row: -row[3])
@@ -0,0 +1,321 @@
+"""Engine hot-path benchmarks: python -m benchmarks.run [--quick] [--output results.json]
+
+Runs every case on synthetic frames (and a synthetic or recorded landmark
+trace) at 480p/720p/1080p, prints p50/p99 latency and per-call allocation
+peaks, and writes everything to a JSON file. Pass --compare old.json to list
+cases whose p50 moved by more than --threshold.
+"""
+import argparse
+import json
+import platform
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+from engine.brushes import brush_names, get_brush, seed_brushes
+from engine.encoding import RUNGS, LadderEncoder
+from engine.gesture import Hands
+from engine.particles import ParticleSystem
+from engine.session import DoodleSession
+from engine.shaders import ShaderChain, apply_shader_effects
+from engine.sources import SyntheticSource
+from engine.stroke_log import StrokeLog
+from engine.strokes import StrokeBuilder
+from engine.trace import TraceReplay
+from engine.transport import encode_image, frame_to_base64
+from engine.utils import Canvas, LayerStack
+
+from .harness import RESOLUTIONS, Case, compare, measure
+
+SHADER_COMBOS = {
+    "glow": {"chromatic_aberration": True},
+    "glitch": {"glitch": True, "vhs_noise": True},
+    "all": {"chromatic_aberration": True, "glitch": True, "vhs_noise": True},
+}
+PARTICLE_COUNTS = (1000, 10000, 50000)
+HAND_COUNTS = (1, 4)
+
+def camera_frame(h, w, seed=0):
+    """Camera-like BGR frame: smooth gradients plus sensor noise, so codecs do real work"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[:h, :w].astype(np.float32)
+    base = np.stack((x / w * 180 + 40, y / h * 120 + 60, (x + y) / (w + h) * 90 + 80), axis=2)
+    base += rng.normal(0, 6, base.shape)
+    return np.clip(base, 0, 255).astype(np.uint8)
+
+def circle_trace(frames=240, seed=0, hands=1):
+    """(t, Hands) of index fingers drawing circles, index pointing up; extra hands circle in other spots"""
+    rng = np.random.default_rng(seed)
+    hand = np.full((21, 3), 0.5, dtype=np.float32)
+    hand[[6, 10, 14, 18, 3], 1] = 0.55          # joints
+    hand[[12, 16, 20, 4], 1] = 0.6               # curled tips
+    centres = [(0.5, 0.45), (0.25, 0.3), (0.75, 0.3), (0.5, 0.75)][:hands]
+    ids = np.arange(hands)
+    trace = []
+    for i in range(frames):
+        a = 2 * np.pi * i / 90
+        points = np.repeat(hand[None], hands, axis=0)
+        for k, (cx, cy) in enumerate(centres):
+            points[k, :, :2] += (cx - 0.5, cy - 0.5)
+            points[k, 8, :2] = (cx + 0.2 * np.cos(a + k), cy + 0.2 * np.sin(a + k))
+        points[..., :2] += rng.normal(0, 0.001, (hands, 21, 2))
+        trace.append((i / 30.0, Hands(ids, points)))
+    return trace
+
+class TraceSource:
+    """Recognizer stand-in feeding a fixed landmark list to DoodleSession"""
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def detect_gestures(self, hands):
+        return [None] * len(hands.ids)
+
+    def stats_dict(self):
+        return {}
+
+def canvas_cases(res, h, w):
+    def make(op, state):
+        def build():
+            canvas = Canvas(h, w)
+            frame = camera_frame(h, w)
+            canvas.canvas[:] = 200
+
+            def reset():
+                if state == "full":
+                    canvas.mark_all_dirty()
+                elif state == "stroke":
+                    canvas.mark_dirty(w // 2 - 64, h // 2 - 64, w // 2 + 64, h // 2 + 64)
+
+            call = canvas.fade if op == "fade" else (lambda: canvas.composite(frame, 0.5))
+            return call, reset
+        return build
+
+    for op in ("fade", "composite"):
+        for state in ("idle", "stroke", "full"):
+            yield Case(f"canvas.{op}", {"res": res, "state": state}, make(op, state))
+
+    def make_layers(state):
+        def build():
+            layers = LayerStack(h, w)
+            frame = camera_frame(h, w)
+            for layer in layers:
+                layer.canvas[:] = 100
+
+            def reset():
+                for layer in layers:
+                    if state == "full":
+                        layer.mark_all_dirty()
+                    elif state == "stroke":
+                        layer.mark_dirty(w // 2 - 64, h // 2 - 64, w // 2 + 64, h // 2 + 64)
+
+            return (lambda: layers.composite(frame, 0.5)), reset
+        return build
+
+    for state in ("idle", "stroke", "full"):
+        yield Case("layers.composite", {"res": res, "state": state}, make_layers(state))
+
+def particle_cases(res, h, w):
+    def make(count):
+        def build():
+            ps = ParticleSystem(max_particles=count, seed=0)
+            canvas = np.zeros((h, w, 3), dtype=np.uint8)
+            rng = np.random.default_rng(0)
+
+            def reset():
+                # Top the population back up, spread over the frame
+                missing = count - len(ps)
+                if missing:
+                    for x, y in rng.uniform((0, 0), (w, h), (max(missing // 100, 1), 2)):
+                        ps.spawn_trail(float(x), float(y), (255, 200, 100), 100)
+
+            return (lambda: ps.update(canvas)), reset
+        return build
+
+    for count in PARTICLE_COUNTS:
+        yield Case("particles.update", {"res": res, "count": count}, make(count))
+
+def brush_cases(res, h, w):
+    def make(name):
+        def build():
+            brush = get_brush(name)
+            seed_brushes(0)
+            canvas = np.zeros((h, w, 3), dtype=np.uint8)
+            frame = camera_frame(h, w)
+            # One frame of fast movement: ~120px of arc, resampled at the brush spacing
+            builder = StrokeBuilder()
+            builder.add(w * 0.4, h * 0.5, brush.spacing)
+            builder.add(w * 0.45, h * 0.45, brush.spacing)
+            stroke = builder.add(w * 0.55, h * 0.42, brush.spacing)
+            return (lambda: brush.draw(canvas, [stroke], 0.5, overlay=frame)), None
+        return build
+
+    for name in brush_names():
+        yield Case(f"brush.{name}", {"res": res}, make(name))
+
+def shader_cases(res, h, w):
+    def make(config):
+        def build():
+            chain = ShaderChain(seed=0)
+            source = camera_frame(h, w)
+            frame = source.copy()
+
+            def reset():
+                np.copyto(frame, source)
+
+            return (lambda: apply_shader_effects(frame, config, in_place=True, chain=chain)), reset
+        return build
+
+    for combo, config in SHADER_COMBOS.items():
+        yield Case("shaders.apply", {"res": res, "effects": combo}, make(config))
+
+def encode_cases(res, h, w, pool):
+    def build():
+        frame = camera_frame(h, w)
+        return (lambda: frame_to_base64(frame)), None
+
+    yield Case("transport.frame_to_base64", {"res": res}, build)
+
+    def make_ladder(rungs):
+        def build():
+            frame = camera_frame(h, w)
+            ladder = LadderEncoder(lambda f, variant, quality: encode_image(f, variant[1], quality), pool)
+            variants = [("binary", "jpeg", rung) for rung in rungs]
+            seq = iter(range(1 << 30))
+            return (lambda: ladder.encode(next(seq), frame, variants)), None
+        return build
+
+    # Cost follows the rungs in use, however many viewers share them
+    for rungs in (["high"], list(RUNGS)):
+        yield Case("encode.ladder", {"res": res, "rungs": len(rungs)}, make_ladder(rungs))
+
+def source_cases(res, h, w):
+    def build():
+        # One capture step as the source thread runs it, without the pacing sleep
+        source = SyntheticSource(w, h, fps=None)
+        ring = source.ring
+
+        def call():
+            ring.commit(source.read(ring.slot()), 0.0)
+            ring.latest()
+
+        return call, None
+
+    yield Case("source.synthetic", {"res": res}, build)
+
+def stroke_log_cases(res, h, w):
+    def make(kind):
+        def build():
+            # Ten minutes of four hands drawing, 3 points per segment
+            log = StrokeLog(w, h, ["neon"])
+            rng = np.random.default_rng(0)
+            for frame in range(18000):
+                for hand in range(4):
+                    start = rng.uniform(0, 1, 2) * (w, h)
+                    log.append(start + rng.normal(0, 4, (3, 2)), frame / 30.0, 0, hand)
+            if kind == "viewport":
+                return (lambda: log.query(viewport=(0.4, 0.4, 0.6, 0.6))), None
+            return (lambda: log.query(since=590.0)), None
+        return build
+
+    for kind in ("viewport", "recent"):
+        yield Case("stroke_log.query", {"res": res, "query": kind}, make(kind))
+
+def session_cases(res, h, w, trace_path=None):
+    def make(hands):
+        def build():
+            if trace_path:
+                replay = TraceReplay(trace_path)
+                trace, source = list(replay), replay
+            else:
+                trace = circle_trace(hands=hands)
+                source = TraceSource(trace)
+            seed_brushes(0)
+            session = DoodleSession(source, seed=0)
+            frame = camera_frame(h, w)
+            frames = iter(())
+
+            def call():
+                nonlocal frames
+                item = next(frames, None)
+                if item is None:
+                    frames = iter(enumerate(trace))
+                    item = next(frames)
+                index, (t, hands) = item
+                if hasattr(source, "index"):
+                    source.index = index
+                session.render(frame, hands, t)
+
+            return call, None
+        return build
+
+    if trace_path:
+        yield Case("session.render", {"res": res, "trace": "recorded"}, make(None))
+        return
+    for hands in HAND_COUNTS:
+        yield Case("session.render", {"res": res, "trace": "circle", "hands": hands}, make(hands))
+
+SUITES = (canvas_cases, particle_cases, brush_cases, shader_cases, encode_cases, source_cases, stroke_log_cases,
+          session_cases)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HoloDoodle engine hot paths")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--quick", action="store_true", help="480p only, 30 calls per case")
+    parser.add_argument("--trace", help="landmark trace for session.render instead of the synthetic one")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative p50 change worth flagging")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.resolutions, args.repeat = ["480p"], 30
+
+    # One encode pool for every encode.ladder case, as the server shares one between rooms
+    pool = ThreadPoolExecutor(os.cpu_count(), thread_name_prefix="encode-rung")
+    extra = {session_cases: (args.trace,), encode_cases: (pool,)}
+    cases = []
+    for res in args.resolutions:
+        h, w = RESOLUTIONS[res]
+        for suite in SUITES:
+            found = suite(res, h, w, *extra.get(suite, ()))
+            cases.extend(case for case in found if args.filter in case.name)
+
+    results = []
+    print(f"{'case':<52} {'p50 ms':>9} {'p99 ms':>9} {'alloc KB':>10}")
+    with pool:
+        for case in cases:
+            result = measure(case, repeat=args.repeat)
+            results.append(result)
+            print(f"{case.key:<52} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f} {result['alloc_peak_kb']:>10.1f}")
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\n{'case':<52} {'old p50':>9} {'new p50':>9} {'ratio':>7}")
+        for key, old, new, ratio, flagged in compare(report, baseline, args.threshold):
+            mark = (" slower" if ratio > 1 else " faster") if flagged else ""
+            print(f"{key:<52} {old:>9.3f} {new:>9.3f} {ratio:>7.2f}{mark}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
+from .base import Brush, BRUSH_REGISTRY, register_brush, get_brush, brush_names, seed_brushes
 from .neon_glow import neon_glow_brush
 from .lightning import lightning_brush
 from .fire import fire_brush
 from .galaxy import galaxy_brush
 from .energy_whirl import energy_whirl_brush
 
-__all__ = ['neon_glow_brush', 'lightning_brush', 'fire_brush', 'galaxy_brush', 'energy_whirl_brush']
-
+__all__ = ['Brush', 'BRUSH_REGISTRY', 'register_brush', 'get_brush', 'brush_names', 'seed_brushes',
+           'neon_glow_brush', 'lightning_brush', 'fire_brush', 'galaxy_brush', 'energy_whirl_brush']
@@ -0,0 +1,127 @@
+import cv2
+import numpy as np
+
+# name -> Brush instance, in registration order (the order brushes cycle in)
+BRUSH_REGISTRY = {}
+
+def register_brush(cls):
+    """Class decorator adding a Brush subclass to the registry under cls.name"""
+    BRUSH_REGISTRY[cls.name] = cls()
+    return cls
+
+def seed_brushes(seed):
+    """Reseed every registered brush"""
+    for index, brush in enumerate(BRUSH_REGISTRY.values()):
+        brush.seed(None if seed is None else seed + index)
+
+def get_brush(name):
+    return BRUSH_REGISTRY[name]
+
+def brush_names():
+    return list(BRUSH_REGISTRY)
+
+def as_strokes(strokes):
+    """Normalize one (N, 2) polyline or a list of them to a list of int32 arrays"""
+    if isinstance(strokes, np.ndarray) and strokes.ndim == 2:
+        strokes = [strokes]
+    return [np.asarray(s, dtype=np.int32).reshape(-1, 2) for s in strokes if len(s) > 0]
+
+def segments(strokes):
+    """All consecutive point pairs of the strokes as (M, 2, 2) start/end pairs"""
+    pairs = [np.stack((s[:-1], s[1:]), axis=1) for s in strokes if len(s) > 1]
+    return np.concatenate(pairs) if pairs else np.zeros((0, 2, 2), dtype=np.int32)
+
+def stroke_groups(strokes, reach):
+    """Split strokes into groups whose reach-padded bounding boxes overlap.
+
+    Strokes from hands far apart end up in separate groups, so per-patch work
+    (blur, copies) covers each hand's area rather than one box spanning them all.
+    """
+    groups = []  # [x1, y1, x2, y2, strokes]
+    for stroke in strokes:
+        lo = stroke.min(axis=0) - reach
+        hi = stroke.max(axis=0) + reach + 1
+        group = [lo[0], lo[1], hi[0], hi[1], [stroke]]
+        for other in list(groups):
+            if other[0] < group[2] and group[0] < other[2] and other[1] < group[3] and group[1] < other[3]:
+                group = [min(group[0], other[0]), min(group[1], other[1]),
+                         max(group[2], other[2]), max(group[3], other[3]), other[4] + group[4]]
+                groups.remove(other)
+        groups.append(group)
+    return [group[4] for group in groups]
+
+def polylines(canvas, lines, color, thickness):
+    """One cv2.polylines call for a list of (N, 2) polylines"""
+    if lines:
+        cv2.polylines(canvas, lines, False, color, thickness)
+
+_ring_offsets = {}
+
+def rings(canvas, centers, color, radius):
+    """1px circle outlines at (K, 2) centers, stamped in one scatter"""
+    offsets = _ring_offsets.get(radius)
+    if offsets is None:
+        stamp = np.zeros((2 * radius + 1, 2 * radius + 1), dtype=np.uint8)
+        cv2.circle(stamp, (radius, radius), radius, 1, 1)
+        dy, dx = np.nonzero(stamp)
+        offsets = _ring_offsets[radius] = (dy - radius, dx - radius)
+    if not len(centers):
+        return
+    h, w = canvas.shape[:2]
+    centers = np.asarray(centers)
+    ys = (centers[:, 1:2] + offsets[0]).ravel()
+    xs = (centers[:, 0:1] + offsets[1]).ravel()
+    inside = (ys >= 0) & (ys < h) & (xs >= 0) & (xs < w)
+    canvas[ys[inside], xs[inside]] = color
+
+def dots(canvas, centers, color, radius):
+    """Filled dots at (K, 2) centers in one call, as zero-length round-capped lines
+
+    Thickness 2 * radius rasterizes the same pixels as cv2.circle(..., radius, -1).
+    """
+    if len(centers):
+        pts = np.repeat(np.asarray(centers, dtype=np.int32)[:, None, :], 2, axis=1)
+        cv2.polylines(canvas, list(pts), False, color, 2 * radius)
+
+class Brush:
+    """A brush renders a batch of stroke polylines in a fixed number of draw calls.
+
+    strokes is a list of (N, 2) int pixel polylines: every point since the last
+    frame, for every hand drawing with this brush. overlay is a buffer redrawn
+    every frame and shown on top of everything (the overlay layer, or the
+    camera frame itself); effects is a fast-fading buffer for short-lived
+    details, the canvas when not given. reach is how far past its polylines the
+    brush may draw into the canvas, layer_reach the same per extra layer name,
+    both used for dirty tracking; spacing is the point spacing strokes are
+    resampled to before drawing. detail in (0, 1] lets a brush trade fidelity
+    for speed under load. width and color(t) describe the main stroke for
+    vector exports.
+    """
+
+    name = None
+    reach = 0
+    layer_reach = {}
+    spacing = 4.0
+    width = 8
+
+    def __init__(self):
+        self.rng = np.random.default_rng()
+
+    def seed(self, seed):
+        """Reseed this brush's random details (branches, stars) for reproducible output"""
+        self.rng = np.random.default_rng(seed)
+
+    def color(self, t):
+        """Main stroke BGR color at animation time t"""
+        return (255, 255, 255)
+
+    def draw(self, canvas, strokes, t, overlay=None, detail=1.0, effects=None):
+        raise NotImplementedError
+
+    def bounds(self, strokes, reach=None):
+        """(x1, y1, x2, y2) pixel box the brush may touch when drawing strokes, reach defaults to self.reach"""
+        reach = self.reach if reach is None else reach
+        points = np.concatenate(as_strokes(strokes))
+        lo = points.min(axis=0) - reach
+        hi = points.max(axis=0) + reach + 1
+        return int(lo[0]), int(lo[1]), int(hi[0]), int(hi[1])
@@ -1,26 +1,54 @@
 import cv2
 import numpy as np
 
-def energy_whirl_brush(canvas, x1, y1, x2, y2, t, frame):
+from .base import Brush, register_brush, as_strokes, segments, polylines, get_brush
+
+# Unit vectors of the 8 distortion spokes
+_SPOKES = np.stack((np.cos(np.radians(np.arange(0, 360, 45))),
+                    np.sin(np.radians(np.arange(0, 360, 45)))), axis=1)
+
+@register_brush
+class EnergyWhirlBrush(Brush):
     """Energy whirl with distortion and ripple field"""
-    # Energy colors (green/cyan)
-    energy_color = (int(100 + 155 * t), 255, int(200 + 55 * t))
-    energy_bgr = (int(energy_color[2]), int(energy_color[1]), int(energy_color[0]))
-    
-    # Main energy line
-    cv2.line(canvas, (x1, y1), (x2, y2), energy_bgr, 10)
-    
-    # Ripple effect around finger
-    center = (x2, y2)
-    for radius in range(20, 60, 10):
-        alpha = 1.0 - (radius / 60.0)
-        color = tuple(int(c * alpha) for c in energy_bgr)
-        cv2.circle(frame, center, radius, color, 2)
-    
-    # Distortion lines (warp effect)
-    for angle in range(0, 360, 45):
-        rad = np.radians(angle)
-        end_x = int(x2 + 30 * np.cos(rad))
-        end_y = int(y2 + 30 * np.sin(rad))
-        cv2.line(canvas, (x2, y2), (end_x, end_y), energy_bgr, 2)
 
+    name = "energy"
+    reach = 36
+    layer_reach = {"overlay": 52}  # outermost ripple ring: radius 50, 2px thick
+    spacing = 16.0
+    width = 10
+
+    def color(self, t):
+        return (int(200 + 55 * t), 255, int(100 + 155 * t))
+
+    def draw(self, canvas, strokes, t, overlay=None, detail=1.0, effects=None):
+        strokes = as_strokes(strokes)
+        if not strokes:
+            return
+
+        # Energy colors (green/cyan)
+        energy_bgr = self.color(t)
+
+        # Main energy line
+        polylines(canvas, strokes, energy_bgr, 10)
+
+        # Ripple effect around each finger, on top of the video. Colors are
+        # premultiplied: an overlay layer blends them translucent by alpha, a
+        # plain BGR frame ignores alpha and gets the dimmed color
+        if overlay is not None:
+            for stroke in strokes:
+                center = (int(stroke[-1, 0]), int(stroke[-1, 1]))
+                for radius in range(20, 60, 10):
+                    alpha = 1.0 - (radius / 60.0)
+                    color = tuple(int(c * alpha) for c in energy_bgr) + (int(255 * alpha),)
+                    cv2.circle(overlay, center, radius, color, 2)
+
+        # Distortion lines (warp effect) from the end of every segment
+        ends = segments(strokes)[:, 1]
+        if len(ends):
+            tips = (ends[:, None, :] + 30 * _SPOKES).astype(np.int32)
+            spokes = np.stack((np.broadcast_to(ends[:, None, :], tips.shape), tips), axis=2)
+            polylines(canvas, list(spokes.reshape(-1, 2, 2).astype(np.int32)), energy_bgr, 2)
+
+def energy_whirl_brush(canvas, x1, y1, x2, y2, t, frame):
+    """Energy whirl with distortion and ripple field"""
+    get_brush("energy").draw(canvas, [np.array([[x1, y1], [x2, y2]])], t, overlay=frame)
@@ -1,15 +1,31 @@
-import cv2
 import numpy as np
 
-def fire_brush(canvas, x1, y1, x2, y2, t):
+from .base import Brush, register_brush, as_strokes, polylines, get_brush
+
+@register_brush
+class FireBrush(Brush):
     """Fire brush with hot core and ember smoke"""
-    # Fire gradient: orange -> red -> dark
-    fire_core = (0, int(140 + 115 * t), 255)
-    fire_mid = (0, int(50 + 50 * t), 255)
-    fire_ash = (0, int(20 + 10 * t), 100)
-    
-    # Layered fire effect
-    cv2.line(canvas, (x1, y1), (x2, y2), fire_core, 14)  # Hot core
-    cv2.line(canvas, (x1, y1), (x2, y2), fire_mid, 8)   # Mid flame
-    cv2.line(canvas, (x1, y1), (x2, y2), fire_ash, 4)   # Ash particles
 
+    name = "fire"
+    reach = 8
+    width = 14
+
+    def color(self, t):
+        return (0, int(140 + 115 * t), 255)
+
+    def draw(self, canvas, strokes, t, overlay=None, detail=1.0, effects=None):
+        strokes = as_strokes(strokes)
+
+        # Fire gradient: orange -> red -> dark
+        fire_core = self.color(t)
+        fire_mid = (0, int(50 + 50 * t), 255)
+        fire_ash = (0, int(20 + 10 * t), 100)
+
+        # Layered fire effect
+        polylines(canvas, strokes, fire_core, 14)  # Hot core
+        polylines(canvas, strokes, fire_mid, 8)    # Mid flame
+        polylines(canvas, strokes, fire_ash, 4)    # Ash particles
+
+def fire_brush(canvas, x1, y1, x2, y2, t):
+    """Fire brush with hot core and ember smoke"""
+    get_brush("fire").draw(canvas, [np.array([[x1, y1], [x2, y2]])], t)
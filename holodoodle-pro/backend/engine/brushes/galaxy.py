@@ -1,27 +1,49 @@
-import cv2
 import numpy as np
-import random
 
-def galaxy_brush(canvas, x1, y1, x2, y2, t):
+from .base import Brush, register_brush, as_strokes, segments, polylines, dots, rings, get_brush
+
+@register_brush
+class GalaxyBrush(Brush):
     """Galaxy brush with stars and nebula trails"""
-    # Cosmic colors (purple, blue, pink)
-    nebula1 = (int(255 * (0.5 + 0.5 * t)), int(100 + 155 * t), 255)
-    nebula2 = (255, int(150 * t), int(200 + 55 * t))
-    star_color = (255, 255, 255)
-    
-    # Convert to BGR
-    nebula1_bgr = (int(nebula1[2]), int(nebula1[1]), int(nebula1[0]))
-    nebula2_bgr = (int(nebula2[2]), int(nebula2[1]), int(nebula2[0]))
-    
-    # Nebula trail
-    cv2.line(canvas, (x1, y1), (x2, y2), nebula1_bgr, 10)
-    cv2.line(canvas, (x1, y1), (x2, y2), nebula2_bgr, 6)
-    
-    # Stars (glowing dots)
-    for _ in range(8):
-        star_x = x2 + random.randint(-20, 20)
-        star_y = y2 + random.randint(-20, 20)
-        size = random.randint(1, 3)
-        cv2.circle(canvas, (star_x, star_y), size, star_color, -1)
-        cv2.circle(canvas, (star_x, star_y), size + 2, star_color, 1)
 
+    name = "galaxy"
+    reach = 26
+    layer_reach = {"effects": 26}
+    spacing = 8.0
+    width = 10
+
+    def color(self, t):
+        return (255, int(100 + 155 * t), int(255 * (0.5 + 0.5 * t)))
+
+    def draw(self, canvas, strokes, t, overlay=None, detail=1.0, effects=None):
+        strokes = as_strokes(strokes)
+        if not strokes:
+            return
+
+        # Cosmic colors (purple, blue, pink)
+        nebula2 = (255, int(150 * t), int(200 + 55 * t))
+        star_color = (255, 255, 255)
+
+        # Convert to BGR
+        nebula1_bgr = self.color(t)
+        nebula2_bgr = (int(nebula2[2]), int(nebula2[1]), int(nebula2[0]))
+
+        # Nebula trail
+        polylines(canvas, strokes, nebula1_bgr, 10)
+        polylines(canvas, strokes, nebula2_bgr, 6)
+
+        # Stars (glowing dots): 8 around the end of every segment, twinkling out faster than the trail
+        ends = segments(strokes)[:, 1]
+        if not len(ends):
+            return
+        effects = canvas if effects is None else effects
+        stars = (ends[:, None, :] + self.rng.integers(-20, 21, (len(ends), 8, 2))).reshape(-1, 2)
+        sizes = self.rng.integers(1, 4, len(stars))
+        for size in range(1, 4):
+            centers = stars[sizes == size]
+            dots(effects, centers, star_color, size)
+            rings(effects, centers, star_color, size + 2)
+
+def galaxy_brush(canvas, x1, y1, x2, y2, t):
+    """Galaxy brush with stars and nebula trails"""
+    get_brush("galaxy").draw(canvas, [np.array([[x1, y1], [x2, y2]])], t)
@@ -1,31 +1,52 @@
-import cv2
 import numpy as np
-import random
 
-def lightning_brush(canvas, x1, y1, x2, y2, t):
+from .base import Brush, register_brush, as_strokes, segments, polylines, dots, get_brush
+
+@register_brush
+class LightningBrush(Brush):
     """Electric lightning bolts with branches"""
-    # Electric blue/cyan colors
-    color = (255, int(200 + 55 * t), int(100 + 155 * t))
-    color_bgr = (int(color[2]), int(color[1]), int(color[0]))
-    
-    # Main bolt
-    cv2.line(canvas, (x1, y1), (x2, y2), color_bgr, 6)
-    
-    # Branches
-    dist = np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-    if dist > 10:
-        for _ in range(3):
-            branch_t = random.uniform(0.3, 0.7)
-            bx = int(x1 + (x2 - x1) * branch_t)
-            by = int(y1 + (y2 - y1) * branch_t)
-            offset_x = random.randint(-15, 15)
-            offset_y = random.randint(-15, 15)
-            cv2.line(canvas, (bx, by), (bx + offset_x, by + offset_y), color_bgr, 3)
-    
-    # Sparks on fast movement
-    if dist > 30:
-        for _ in range(5):
-            spark_x = x2 + random.randint(-10, 10)
-            spark_y = y2 + random.randint(-10, 10)
-            cv2.circle(canvas, (spark_x, spark_y), 2, (255, 255, 255), -1)
 
+    name = "lightning"
+    reach = 20
+    layer_reach = {"effects": 13}
+    spacing = 12.0
+    width = 6
+
+    def color(self, t):
+        return (int(100 + 155 * t), int(200 + 55 * t), 255)
+
+    def draw(self, canvas, strokes, t, overlay=None, detail=1.0, effects=None):
+        strokes = as_strokes(strokes)
+        if not strokes:
+            return
+
+        # Electric blue/cyan colors
+        color_bgr = self.color(t)
+
+        # Main bolt
+        polylines(canvas, strokes, color_bgr, 6)
+
+        seg = segments(strokes)
+        start, end = seg[:, 0], seg[:, 1]
+        dist = np.hypot(*(end - start).T)
+        rng = self.rng
+
+        # Branches: 3 per segment longer than 10px
+        long_seg = dist > 10
+        n = int(long_seg.sum())
+        if n:
+            a, b = start[long_seg, None, :], end[long_seg, None, :]
+            branch_t = rng.uniform(0.3, 0.7, (n, 3, 1))
+            base = (a + (b - a) * branch_t).astype(np.int32)
+            tip = base + rng.integers(-15, 16, (n, 3, 2))
+            polylines(canvas, list(np.stack((base, tip), axis=2).reshape(-1, 2, 2).astype(np.int32)), color_bgr, 3)
+
+        # Sparks on fast movement: 5 at the end of every stroke that moved more than 30px
+        fast = np.array([s[-1] for s in strokes if np.hypot(*np.diff(s, axis=0).T).sum() > 30])
+        if len(fast):
+            sparks = fast[:, None, :] + rng.integers(-10, 11, (len(fast), 5, 2))
+            dots(canvas if effects is None else effects, sparks.reshape(-1, 2), (255, 255, 255), 2)
+
+def lightning_brush(canvas, x1, y1, x2, y2, t):
+    """Electric lightning bolts with branches"""
+    get_brush("lightning").draw(canvas, [np.array([[x1, y1], [x2, y2]])], t)
@@ -1,22 +1,67 @@
 import cv2
 import numpy as np
 
-def neon_glow_brush(canvas, x1, y1, x2, y2, t):
+from .base import Brush, register_brush, as_strokes, stroke_groups, get_brush
+
+BLOOM_KERNEL = 21
+BLOOM_SIGMA = 10
+# Core line half-width plus blur radius: how far the brush can touch past the segment
+NEON_REACH = 6 + BLOOM_KERNEL // 2
+
+@register_brush
+class NeonGlowBrush(Brush):
     """Neon glow with HDR-like bloom effect"""
-    # Animated colors
-    color1 = (int(255 * t), int(80 + 175 * t), 255)
-    color2 = (255, int(255 * t), int(255 * (1 - t)))
-    
-    # Convert RGB to BGR
-    color1_bgr = (int(color1[2]), int(color1[1]), int(color1[0]))
-    color2_bgr = (int(color2[2]), int(color2[1]), int(color2[0]))
-    
-    # Triple-layer glow
-    cv2.line(canvas, (x1, y1), (x2, y2), color1_bgr, 12)  # Core
-    cv2.line(canvas, (x1, y1), (x2, y2), color2_bgr, 8)   # Mid
-    cv2.line(canvas, (x1, y1), (x2, y2), (255, 255, 255), 4)  # Outer glow
-    
-    # Apply bloom effect
-    glow = cv2.GaussianBlur(canvas, (21, 21), 10)
-    canvas[:] = cv2.addWeighted(canvas, 1.0, glow, 0.4, 0)
 
+    name = "neon"
+    reach = NEON_REACH
+    width = 12
+
+    def color(self, t):
+        return (255, int(80 + 175 * t), int(255 * t))
+
+    def draw(self, canvas, strokes, t, overlay=None, detail=1.0, effects=None):
+        strokes = as_strokes(strokes)
+        if not strokes:
+            return
+
+        # Animated colors
+        color2 = (255, int(255 * t), int(255 * (1 - t)))
+
+        # Convert RGB to BGR
+        color1_bgr = self.color(t)
+        color2_bgr = (int(color2[2]), int(color2[1]), int(color2[0]))
+
+        # Strokes far apart (several hands) bloom on separate patches
+        for group in stroke_groups(strokes, self.reach):
+            self._draw_patch(canvas, group, color1_bgr, color2_bgr, detail)
+
+    def _draw_patch(self, canvas, strokes, color1_bgr, color2_bgr, detail):
+        # Only the strokes' bounding box plus the bloom radius is touched
+        h, w = canvas.shape[:2]
+        bx1, by1, bx2, by2 = self.bounds(strokes)
+        bx1, by1, bx2, by2 = max(bx1, 0), max(by1, 0), min(bx2, w), min(by2, h)
+        if bx1 >= bx2 or by1 >= by2:
+            return
+        region = canvas[by1:by2, bx1:bx2]
+        local = [s - (bx1, by1) for s in strokes]
+
+        # Triple-layer glow, drawn on its own patch so only the new strokes bloom
+        patch = np.zeros_like(region)
+        cv2.polylines(patch, local, False, color1_bgr, 12)  # Core
+        cv2.polylines(patch, local, False, color2_bgr, 8)   # Mid
+        cv2.polylines(patch, local, False, (255, 255, 255), 4)  # Outer glow
+        np.copyto(region, patch, where=patch.any(axis=2, keepdims=True))
+
+        # Apply bloom effect, on a patch downscaled by detail when under load
+        if detail < 1.0:
+            small = cv2.resize(patch, None, fx=detail, fy=detail, interpolation=cv2.INTER_AREA)
+            kernel = max(int(BLOOM_KERNEL * detail) | 1, 3)
+            small = cv2.GaussianBlur(small, (kernel, kernel), BLOOM_SIGMA * detail)
+            glow = cv2.resize(small, (patch.shape[1], patch.shape[0]), interpolation=cv2.INTER_LINEAR)
+        else:
+            glow = cv2.GaussianBlur(patch, (BLOOM_KERNEL, BLOOM_KERNEL), BLOOM_SIGMA)
+        cv2.addWeighted(region, 1.0, glow, 0.4, 0, dst=region)
+
+def neon_glow_brush(canvas, x1, y1, x2, y2, t):
+    """Neon glow with HDR-like bloom effect"""
+    get_brush("neon").draw(canvas, [np.array([[x1, y1], [x2, y2]])], t)
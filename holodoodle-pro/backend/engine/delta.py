@@ -0,0 +1,95 @@
+import math
+import threading
+from collections import namedtuple
+import cv2
+import numpy as np
+
+from .transport import encode_image
+
+# One encoded frame of a delta stream. key_data is the keyframe image the
+# tiles apply to (shared, not copied, between frames); tiles is an (N, 2)
+# uint16 array of (column, row) indices of tile x tile pixel tiles, stored
+# row-major in the atlas image, `cols` per atlas row. A keyframe has tiles=None.
+DeltaFrame = namedtuple("DeltaFrame", "key_id key_data tile tiles cols atlas")
+
+class TileDeltaEncoder:
+    """Encodes a frame stream as keyframes plus atlases of changed tiles.
+
+    Every delta is relative to the current keyframe, not to the previous
+    frame, so a viewer that skips frames (the send loop only ever sends the
+    newest) can still rebuild the picture from keyframe + latest delta. A tile
+    counts as changed once at least min_pixels of its pixels differ from the
+    keyframe by more than threshold in some channel, so a lone particle or a
+    stroke tip is sent even though it barely moves the tile's mean, while
+    faint sensor noise is not. A new keyframe is taken every keyframe_interval frames,
+    or sooner once more than max_changed of the tiles differ.
+    """
+
+    def __init__(self, codec="jpeg", tile=32, threshold=16, min_pixels=2, max_changed=0.4, keyframe_interval=150):
+        self.codec = codec
+        self.tile = tile
+        self.threshold = threshold
+        self.min_pixels = min_pixels
+        self.max_changed = max_changed
+        self.keyframe_interval = keyframe_interval
+        self.key_id = 0
+        self.keyframes = 0
+        self.deltas = 0
+        self._key = None
+        self._key_data = None
+        self._since_key = 0
+        self._lock = threading.Lock()
+
+    def _keyframe(self, frame, quality):
+        self._key = frame.copy()
+        self._key_data = encode_image(frame, self.codec, quality)
+        self._since_key = 0
+        self.key_id = (self.key_id + 1) & 0xFFFFFFFF
+        self.keyframes += 1
+        return DeltaFrame(self.key_id, self._key_data, self.tile, None, 0, None)
+
+    def changed_tiles(self, frame):
+        """(rows, cols) bool grid of tiles that differ from the keyframe"""
+        h, w = frame.shape[:2]
+        tile = self.tile
+        # Pixels whose largest channel difference is over threshold, counted
+        # per tile from one integral image
+        b, g, r = cv2.split(cv2.absdiff(frame, self._key))
+        diff = cv2.max(cv2.max(b, g), r)
+        _, mask = cv2.threshold(diff, self.threshold, 1, cv2.THRESH_BINARY)
+        integral = cv2.integral(mask, sdepth=cv2.CV_32S)
+        ys = np.append(np.arange(0, h, tile), h)
+        xs = np.append(np.arange(0, w, tile), w)
+        corners = integral[np.ix_(ys, xs)]
+        counts = corners[1:, 1:] - corners[:-1, 1:] - corners[1:, :-1] + corners[:-1, :-1]
+        return counts >= self.min_pixels
+
+    def encode(self, frame, quality=85):
+        with self._lock:
+            if self._key is None or self._key.shape != frame.shape or self._since_key >= self.keyframe_interval:
+                return self._keyframe(frame, quality)
+            self._since_key += 1
+
+            changed = self.changed_tiles(frame)
+            rows, cols = np.nonzero(changed)
+            if len(rows) > self.max_changed * changed.size:
+                return self._keyframe(frame, quality)
+            self.deltas += 1
+            if not len(rows):
+                return DeltaFrame(self.key_id, self._key_data, self.tile, np.zeros((0, 2), dtype=np.uint16), 0, None)
+
+            # Pack the changed tiles into a near-square atlas, encoded as one image
+            tile, h, w = self.tile, frame.shape[0], frame.shape[1]
+            atlas_cols = math.ceil(math.sqrt(len(rows)))
+            atlas = np.zeros((math.ceil(len(rows) / atlas_cols) * tile, atlas_cols * tile, 3), dtype=np.uint8)
+            for i, (row, col) in enumerate(zip(rows, cols)):
+                y, x = row * tile, col * tile
+                th, tw = min(tile, h - y), min(tile, w - x)
+                ay, ax = (i // atlas_cols) * tile, (i % atlas_cols) * tile
+                atlas[ay:ay + th, ax:ax + tw] = frame[y:y + th, x:x + tw]
+            tiles = np.stack((cols, rows), axis=1).astype(np.uint16)
+            return DeltaFrame(self.key_id, self._key_data, tile, tiles, atlas_cols,
+                              encode_image(atlas, self.codec, quality))
+
+    def stats_dict(self):
+        return {"keyframes": self.keyframes, "deltas": self.deltas, "tile": self.tile}
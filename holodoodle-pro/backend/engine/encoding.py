@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+import cv2
+
+from .delta import TileDeltaEncoder
+from .pipeline import StageStats
+
+# Per-viewer ladder: rung -> (output scale, encoder quality). The room's
+# adaptive quality level caps both on top.
+RUNGS = {
+    "high": (1.0, 85),
+    "medium": (0.75, 70),
+    "low": (0.5, 55),
+}
+DEFAULT_RUNG = "high"
+
+def resize(frame, scale):
+    """Downscale for a rung; INTER_AREA only for integer factors, where it is fast (4x slower than linear at 3/4)"""
+    if scale >= 1.0:
+        return frame
+    size = (max(int(frame.shape[1] * scale), 1), max(int(frame.shape[0] * scale), 1))
+    interpolation = cv2.INTER_AREA if (1.0 / scale).is_integer() else cv2.INTER_LINEAR
+    return cv2.resize(frame, size, interpolation=interpolation)
+
+class LadderEncoder:
+    """Encodes one room's frames once per (protocol, codec, rung) variant in use.
+
+    Every viewer on a variant shares its bytes, so encoding cost follows the
+    number of rungs in use, not the number of viewers. A frame is resized
+    once per scale and its variants are encoded in parallel on a thread pool
+    shared by all rooms. cv2.resize and cv2.imencode release the GIL, so
+    threads use every core without pickling frames to worker processes.
+    Results are cached by frame sequence number for the last `keep` frames;
+    a variant missing from a cached frame (a rung that joined after it was
+    encoded) is encoded on demand, except delta variants: their encoders are
+    stateful and must see frames in order, so those wait for the next frame.
+    """
+
+    def __init__(self, encode, pool, keep=2):
+        self.encode_variant = encode  # (frame, (protocol, codec), quality) -> encoded data
+        self.pool = pool
+        self.keep = keep
+        self.delta_encoders = {}      # (codec, rung) -> TileDeltaEncoder
+        self.stats = {rung: StageStats(f"encode_{rung}") for rung in RUNGS}
+        self._cache = OrderedDict()   # seq -> ({scale: frame}, {variant: data}, quality cap, scale cap)
+        self._lock = threading.Lock()
+
+    def encode(self, seq, frame, variants, quality_cap=85, scale_cap=1.0):
+        """{variant: data} for frame number seq, each variant encoded once and cached under seq"""
+        scales = sorted({RUNGS[rung][0] * scale_cap for _, _, rung in variants} - {1.0})
+        frames = {1.0: frame}
+        frames.update(zip(scales, self.pool.map(lambda scale: resize(frame, scale), scales)))
+        futures = {variant: self.pool.submit(self._encode_one, frames, variant, quality_cap, scale_cap)
+                   for variant in variants}
+        encoded = {variant: future.result() for variant, future in futures.items()}
+        with self._lock:
+            self._cache[seq] = (frames, encoded, quality_cap, scale_cap)
+            while len(self._cache) > self.keep:
+                self._cache.popitem(last=False)
+        return encoded
+
+    def get(self, seq, variant):
+        """Data for variant of frame seq, encoded now if it is missing; None once seq left the cache.
+
+        Missing delta variants are not encoded out of order and give None too.
+        """
+        with self._lock:
+            entry = self._cache.get(seq)
+        if entry is None:
+            return None
+        frames, encoded, quality_cap, scale_cap = entry
+        data = encoded.get(variant)
+        if data is None and variant[0] != "delta":
+            data = encoded[variant] = self._encode_one(frames, variant, quality_cap, scale_cap)
+        return data
+
+    def _encode_one(self, frames, variant, quality_cap, scale_cap):
+        start = time.perf_counter()
+        protocol, codec, rung = variant
+        scale, quality = RUNGS[rung]
+        scale, quality = scale * scale_cap, min(quality, quality_cap)
+        frame = frames.get(scale)
+        if frame is None:
+            frame = frames[scale] = resize(frames[1.0], scale)
+        if protocol == "delta":
+            encoder = self.delta_encoders.get((codec, rung))
+            if encoder is None:
+                encoder = self.delta_encoders.setdefault((codec, rung), TileDeltaEncoder(codec))
+            data = encoder.encode(frame, quality)
+        else:
+            data = self.encode_variant(frame, (protocol, codec), quality)
+        self.stats[rung].record(start)
+        return data
+
+    def stats_dict(self):
+        return {
+            "rungs": {rung: stats.as_dict() for rung, stats in self.stats.items() if stats.count},
+            "delta": {f"{codec}/{rung}": encoder.stats_dict() for (codec, rung), encoder in self.delta_encoders.items()},
+        }
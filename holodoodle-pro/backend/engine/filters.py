@@ -0,0 +1,174 @@
+import math
+from collections import Counter, deque
+import numpy as np
+
+class OneEuroFilter:
+    """One-Euro low-pass filter (Casiez et al.) for scalars or NumPy vectors.
+
+    Smoothing adapts to speed: slow movement is filtered hard to kill jitter,
+    fast movement lightly to keep lag low. Timestamps are in seconds, so the
+    response is the same at any frame rate.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._dx = None
+        self._t = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t):
+        x = np.asarray(x, dtype=np.float64)
+        if self._x is None:
+            self._x, self._dx, self._t = x, np.zeros_like(x), t
+            return x
+        dt = t - self._t
+        if dt <= 0:
+            return self._x
+        self._t = t
+
+        dx = (x - self._x) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        self._dx = self._dx + a_d * (dx - self._dx)
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self._dx)
+        a = self._alpha(cutoff, dt)
+        self._x = self._x + a * (x - self._x)
+        return self._x
+
+class TipSmoother:
+    """One-Euro smoothing plus a dead band for the drawing fingertip.
+
+    update() returns the smoothed pixel position, or None while the tip has
+    moved less than min_step pixels since the last emitted point, so jitter
+    does not turn into extra zero-length brush segments.
+    """
+
+    def __init__(self, min_cutoff=1.5, beta=0.02, min_step=2.0):
+        self.filter = OneEuroFilter(min_cutoff, beta)
+        self.min_step = min_step
+        self.last = None
+
+    def reset(self):
+        self.filter.reset()
+        self.last = None
+
+    def update(self, x, y, t):
+        sx, sy = self.filter((x, y), t)
+        if self.last is not None and math.hypot(sx - self.last[0], sy - self.last[1]) < self.min_step:
+            return None
+        self.last = (float(sx), float(sy))
+        return self.last
+
+class GestureStabilizer:
+    """Time-window majority vote with hysteresis for per-frame gesture labels.
+
+    Each label is weighted by how long it was observed, so votes mean the same
+    at 15 and 60 FPS. A label becomes the stable gesture once it holds at least
+    enter_ratio of the last window seconds, and stays stable until its share
+    drops below exit_ratio. update() returns each stable gesture once: on the
+    frame it becomes stable, or when the cooldown after the previous trigger
+    ends if it is still stable then.
+    """
+
+    def __init__(self, window=0.2, enter_ratio=0.6, exit_ratio=0.4, cooldown=0.5):
+        self.window = window
+        self.enter_ratio = enter_ratio
+        self.exit_ratio = exit_ratio
+        self.cooldown = cooldown
+        self.history = deque()
+        self.stable = None
+        self.fired = False  # whether the current stable gesture was returned yet
+        self.last_trigger = -math.inf
+        self._t = None
+
+    def reset(self):
+        self.history.clear()
+        self.stable = None
+        self.fired = False
+        self._t = None
+
+    def update(self, gesture, t):
+        # Credit the time since the previous sample to the label seen now
+        dt = 0.0 if self._t is None else max(t - self._t, 0.0)
+        self._t = t
+        history = self.history
+        history.append((t, gesture, dt))
+        while history and history[0][0] <= t - self.window:
+            history.popleft()
+
+        votes = Counter()
+        for _, label, weight in history:
+            votes[label] += weight
+        total = sum(votes.values())
+        if total < 0.5 * self.window:
+            return None  # not enough observed time to decide yet
+        if self.stable is None or votes[self.stable] / total < self.exit_ratio:
+            label, share = votes.most_common(1)[0]
+            stable = label if share / total >= self.enter_ratio else None
+            if stable != self.stable:
+                self.stable = stable
+                self.fired = False
+        if self.stable is None or self.fired or t - self.last_trigger < self.cooldown:
+            return None
+        self.fired = True
+        self.last_trigger = t
+        return self.stable
+
+# Palm centre landmarks: wrist and the four finger bases
+PALM = [0, 5, 9, 13, 17]
+
+class HandTracker:
+    """Stable IDs for the hands detected on each frame.
+
+    Detections are matched to live tracks by palm centre, closest pair first,
+    within max_distance (normalized frame units); unmatched detections start
+    new tracks. A track unseen for more than max_missed detections is dropped,
+    so a hand that drops out for a moment keeps its ID.
+    """
+
+    def __init__(self, max_distance=0.15, max_missed=5):
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.tracks = {}  # id -> [palm centre, detections missed]
+        self.next_id = 0
+
+    def reset(self):
+        self.tracks.clear()
+
+    def update(self, points):
+        """(H,) int array of track IDs for (H, 21, 3) detected landmarks"""
+        centres = points[:, PALM, :2].mean(axis=1)
+        ids = np.full(len(points), -1, dtype=np.int64)
+        if self.tracks and len(points):
+            track_ids = list(self.tracks)
+            known = np.array([self.tracks[i][0] for i in track_ids])
+            dist = np.linalg.norm(centres[:, None, :] - known[None, :, :], axis=2)
+            taken = set()
+            for flat in np.argsort(dist, axis=None):
+                d, k = divmod(int(flat), len(track_ids))
+                if dist[d, k] > self.max_distance:
+                    break
+                if ids[d] < 0 and k not in taken:
+                    ids[d] = track_ids[k]
+                    taken.add(k)
+        for d in np.flatnonzero(ids < 0):
+            ids[d] = self.next_id
+            self.next_id += 1
+
+        for track_id, track in list(self.tracks.items()):
+            track[1] += 1
+            if track[1] > self.max_missed:
+                del self.tracks[track_id]
+        for track_id, centre in zip(ids.tolist(), centres):
+            self.tracks[track_id] = [centre, 0]
+        return ids
@@ -1,84 +1,293 @@
+import time
+from collections import namedtuple
 import cv2
-import mediapipe as mp
 import numpy as np
 
+from .filters import HandTracker
+from .pipeline import StageStats
+
+# MediaPipe is imported where it is used, so array-only code (gesture rules,
+# skeleton drawing, trace replay) runs on machines without it
+
+def landmarks_to_array(landmarks):
+    """(21, 3) float32 array of normalized x, y, z from a landmark list"""
+    return np.array([(p.x, p.y, p.z) for p in landmarks.landmark], dtype=np.float32)
+
+def array_to_landmarks(points):
+    """NormalizedLandmarkList from an (N, 3) array, for drawing and gesture code"""
+    from mediapipe.framework.formats import landmark_pb2
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in points.tolist():
+        landmarks.landmark.add(x=x, y=y, z=z)
+    return landmarks
+
+def as_points(landmarks):
+    """Accept either a landmark list or a (21, 3) array, return the array"""
+    if landmarks is None or isinstance(landmarks, np.ndarray):
+        return landmarks
+    return landmarks_to_array(landmarks)
+
+# The hands tracked on one frame: ids is an (H,) int array of stable track IDs
+# (see HandTracker), points the matching (H, 21, 3) normalized landmarks
+Hands = namedtuple("Hands", "ids points")
+NO_HANDS = Hands(np.zeros(0, dtype=np.int64), np.zeros((0, 21, 3), dtype=np.float32))
+
+def as_hands(landmarks):
+    """Hands from None, a Hands, one hand's (21, 3) array or landmark list, or an (H, 21, 3) array"""
+    if landmarks is None:
+        return NO_HANDS
+    if isinstance(landmarks, Hands):
+        return landmarks
+    points = as_points(landmarks)
+    if points.ndim == 2:
+        points = points[None]
+    return Hands(np.arange(len(points)), points)
+
+# mp.solutions.hands.HAND_CONNECTIONS
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12), (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+_CONNECTIONS = np.array(HAND_CONNECTIONS)
+
+def draw_skeleton(frame, points):
+    """Draw (21, 3) or (H, 21, 3) normalized landmarks in MediaPipe's default style, in 3 draw calls for all hands"""
+    h, w = frame.shape[:2]
+    pixels = np.rint(points[..., :2] * (w, h)).astype(np.int32).reshape(-1, 21, 2)
+    if not len(pixels):
+        return
+    cv2.polylines(frame, list(pixels[:, _CONNECTIONS].reshape(-1, 2, 2)), False, (224, 224, 224), 2)
+    # White ring around a red dot per landmark, as zero-length round-capped lines
+    dots = list(np.repeat(pixels.reshape(-1, 1, 2), 2, axis=1))
+    cv2.polylines(frame, dots, False, (255, 255, 255), 8)
+    cv2.polylines(frame, dots, False, (0, 0, 255), 4)
+
+# Finger order: thumb, index, middle, ring, pinky
+FINGER_TIPS = np.array([4, 8, 12, 16, 20])
+FINGER_JOINTS = np.array([3, 6, 10, 14, 18])  # thumb IP, finger PIPs
+
+UP, DOWN, ANY = 1, -1, 0
+
+# Gestures in priority order: required finger states, optional max thumb-index distance
+GESTURE_RULES = (
+    # name          thumb  index  middle ring  pinky   pinch
+    ("peace",     ((ANY,  UP,    UP,    DOWN, DOWN), None)),   # ✌️
+    ("thumbs_up", ((UP,   DOWN,  DOWN,  ANY,  ANY),  None)),   # 👍
+    ("pinch",     ((ANY,  ANY,   ANY,   ANY,  ANY),  0.05)),   # 👌
+    ("fist",      ((DOWN, DOWN,  DOWN,  DOWN, DOWN), None)),   # ✊
+    ("rock",      ((ANY,  UP,    DOWN,  DOWN, UP),   None)),   # 🤘
+)
+
+GESTURE_NAMES = [name for name, _ in GESTURE_RULES]
+_RULE_FINGERS = np.array([fingers for _, (fingers, _) in GESTURE_RULES])
+_REQUIRE_UP = _RULE_FINGERS == UP
+_REQUIRE_DOWN = _RULE_FINGERS == DOWN
+_PINCH_MAX = np.array([np.inf if pinch is None else pinch for _, (_, pinch) in GESTURE_RULES])
+
+def hand_features(points):
+    """Finger states for (..., 21, 3) landmarks: (up, down, thumb-index distance)"""
+    tips_y = points[..., FINGER_TIPS, 1]
+    joints_y = points[..., FINGER_JOINTS, 1]
+    pinch = np.hypot(points[..., 4, 0] - points[..., 8, 0], points[..., 4, 1] - points[..., 8, 1])
+    return tips_y < joints_y, tips_y > joints_y, pinch
+
+def classify_gestures(points):
+    """Rule index for every hand in (..., 21, 3) landmarks, -1 where nothing matches.
+
+    Works on one hand, several hands or a history window in a single pass.
+    """
+    up, down, pinch = hand_features(np.asarray(points))
+    matches = (((up[..., None, :] | ~_REQUIRE_UP) & (down[..., None, :] | ~_REQUIRE_DOWN)).all(axis=-1) &
+               (pinch[..., None] < _PINCH_MAX))
+    return np.where(matches.any(axis=-1), matches.argmax(axis=-1), -1)
+
 class GestureRecognizer:
-    def __init__(self):
+    """MediaPipe hand tracking with an optional adaptive inference mode.
+
+    max_hands        hands detected per frame, each given a stable ID by a HandTracker
+    inference_scale  run detection on a copy downscaled by this factor
+    roi_tracking     crop to the tracked hands' bounding box (plus roi_margin)
+                     and fall back to the full frame when a hand is lost there
+    rescan_every     with roi_tracking and fewer than max_hands tracked, detect on
+                     the full frame every Nth detection, as a crop cannot find new hands
+    detect_every     run MediaPipe on every Nth frame only; frames in between
+                     get landmarks extrapolated with a constant-velocity predictor
+    """
+
+    def __init__(self, inference_scale=1.0, roi_tracking=False, roi_margin=0.35, detect_every=1, max_hands=1,
+                 rescan_every=10):
+        import mediapipe as mp
         self.mp_hands = mp.solutions.hands
+        self.max_hands = max_hands
         self.hands = self.mp_hands.Hands(
-            max_num_hands=1,
+            max_num_hands=max_hands,
             min_detection_confidence=0.7,
             min_tracking_confidence=0.5
         )
-    
-    def get_landmarks(self, frame):
-        """Get hand landmarks from frame"""
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self.inference_scale = inference_scale
+        self.base_scale = inference_scale
+        self._scale_requests = {}
+        self.roi_tracking = roi_tracking
+        self.roi_margin = roi_margin
+        self.detect_every = max(1, int(detect_every))
+        self.rescan_every = max(1, int(rescan_every))
+        self.tracker = HandTracker()
+
+        self.frame_index = 0
+        self._last = None         # Hands of the last detection
+        self._velocity = None     # per-frame landmark velocity of each of those hands
+        self._last_detect_index = 0
+        self._roi_detections = 0  # ROI detections since the last full-frame one
+
+        # Latency / accuracy counters
+        self.detect_stats = StageStats("detect")
+        self.predicted_frames = 0
+        self.roi_hits = 0
+        self.roi_misses = 0
+        self.prediction_error_px = 0.0
+
+    def request_scale(self, key, factor):
+        """Ask for inference_scale = base_scale * factor on behalf of key (None withdraws).
+
+        Rooms on one source share this recognizer, so the lowest request wins.
+        """
+        if factor is None:
+            self._scale_requests.pop(key, None)
+        else:
+            self._scale_requests[key] = factor
+        self.inference_scale = self.base_scale * min(self._scale_requests.values(), default=1.0)
+
+    def _detect(self, frame, roi=None):
+        """Run MediaPipe on frame (or the (x1, y1, x2, y2) roi of it), returns (H, 21, 3) or None"""
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = roi if roi is not None else (0, 0, w, h)
+        crop = frame[y1:y2, x1:x2]
+        if self.inference_scale != 1.0:
+            crop = cv2.resize(crop, None, fx=self.inference_scale, fy=self.inference_scale,
+                              interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
         results = self.hands.process(rgb)
-        if results.multi_hand_landmarks:
-            return results.multi_hand_landmarks[0]
-        return None
+        if not results.multi_hand_landmarks:
+            return None
+
+        # Map crop-normalized coordinates back to full-frame normalized ones
+        points = np.stack([landmarks_to_array(hand) for hand in results.multi_hand_landmarks])
+        points[..., 0] = (points[..., 0] * (x2 - x1) + x1) / w
+        points[..., 1] = (points[..., 1] * (y2 - y1) + y1) / h
+        return points
+
+    def _roi(self, points, width, height, min_size=32):
+        """Pixel box around (..., 21, 3) points, padded by roi_margin of their size.
+
+        None when the box left the frame (a predicted fast hand) or is
+        clipped to under min_size pixels, which needs a full-frame detect.
+        """
+        points = points.reshape(-1, 3)
+        x1, y1 = points[:, 0].min() * width, points[:, 1].min() * height
+        x2, y2 = points[:, 0].max() * width, points[:, 1].max() * height
+        pad = self.roi_margin * max(x2 - x1, y2 - y1, 32)
+        x1, y1 = max(int(x1 - pad), 0), max(int(y1 - pad), 0)
+        x2, y2 = min(int(x2 + pad), width), min(int(y2 + pad), height)
+        if x2 - x1 < min_size or y2 - y1 < min_size:
+            return None
+        return x1, y1, x2, y2
+
+    def get_landmarks(self, frame):
+        """Get the first hand's landmarks from frame"""
+        points = self.get_points(frame)
+        return None if points is None else array_to_landmarks(points)
+
+    def get_points(self, frame):
+        """Get the first hand's landmarks from frame as a (21, 3) normalized array"""
+        hands = self.get_hands(frame)
+        return hands.points[0] if len(hands.ids) else None
+
+    def get_hands(self, frame):
+        """Every tracked hand on frame as Hands, IDs stable across frames"""
+        self.frame_index += 1
+        h, w = frame.shape[:2]
+        since = self.frame_index - self._last_detect_index
+        last = self._last
+
+        # Skipped frame: extrapolate from the last detection
+        if last is not None and since < self.detect_every:
+            self.predicted_frames += 1
+            return Hands(last.ids, last.points + self._velocity * since)
+
+        start = time.perf_counter()
+        points = None
+        # Crop to the tracked hands; while fewer than max_hands are tracked, every
+        # rescan_every-th detection looks at the whole frame for new ones
+        use_roi = (self.roi_tracking and last is not None and
+                   (len(last.ids) >= self.max_hands or self._roi_detections + 1 < self.rescan_every))
+        roi = self._roi(last.points + self._velocity * since, w, h) if use_roi else None
+        if roi is not None:
+            points = self._detect(frame, roi)
+            if points is None or len(points) < len(last.ids):
+                points = None
+                self.roi_misses += 1
+            else:
+                self.roi_hits += 1
+                self._roi_detections += 1
+        if points is None:
+            points = self._detect(frame)
+            self._roi_detections = 0
+        self.detect_stats.record(start)
+
+        if points is None:
+            self.tracker.update(NO_HANDS.points)
+            self._last = self._velocity = None
+            self._last_detect_index = self.frame_index
+            return NO_HANDS
+
+        hands = Hands(self.tracker.update(points), points)
+        velocity = np.zeros_like(points)
+        if last is not None:
+            previous = {hand_id: i for i, hand_id in enumerate(last.ids.tolist())}
+            errors = []
+            for i, hand_id in enumerate(hands.ids.tolist()):
+                j = previous.get(hand_id)
+                if j is None:
+                    continue
+                predicted = last.points[j] + self._velocity[j] * since
+                # Error the predictor would have made on this frame (index fingertip)
+                errors.append(np.hypot((predicted[8, 0] - points[i, 8, 0]) * w,
+                                       (predicted[8, 1] - points[i, 8, 1]) * h))
+                velocity[i] = (points[i] - last.points[j]) / since
+            if self.detect_every > 1 and errors:
+                self.prediction_error_px += 0.1 * (float(np.mean(errors)) - self.prediction_error_px)
+        self._last = hands
+        self._velocity = velocity
+        self._last_detect_index = self.frame_index
+        return hands
+
+    def stats_dict(self):
+        return {
+            "detect": self.detect_stats.as_dict(),
+            "predicted_frames": self.predicted_frames,
+            "roi_hits": self.roi_hits,
+            "roi_misses": self.roi_misses,
+            "prediction_error_px": round(self.prediction_error_px, 2),
+        }
     
     def detect_gesture(self, landmarks):
-        """Detect gesture from landmarks"""
-        if not landmarks:
+        """Detect gesture from landmarks (landmark list or (21, 3) array)"""
+        points = as_points(landmarks)
+        if points is None:
             return None
-        
-        # Get key points
-        thumb_tip = landmarks.landmark[4]
-        index_tip = landmarks.landmark[8]
-        middle_tip = landmarks.landmark[12]
-        ring_tip = landmarks.landmark[16]
-        pinky_tip = landmarks.landmark[20]
-        
-        thumb_ip = landmarks.landmark[3]
-        index_pip = landmarks.landmark[6]
-        middle_pip = landmarks.landmark[10]
-        ring_pip = landmarks.landmark[14]
-        pinky_pip = landmarks.landmark[18]
-        
-        # Peace sign (✌️) - index and middle up, others down
-        if (index_tip.y < index_pip.y and 
-            middle_tip.y < middle_pip.y and
-            ring_tip.y > ring_pip.y and
-            pinky_tip.y > pinky_pip.y):
-            return "peace"
-        
-        # Thumbs up (👍) - thumb up, others down
-        if (thumb_tip.y < thumb_ip.y and
-            index_tip.y > index_pip.y and
-            middle_tip.y > middle_pip.y):
-            return "thumbs_up"
-        
-        # Pinch (👌) - thumb and index close
-        thumb_index_dist = np.sqrt(
-            (thumb_tip.x - index_tip.x)**2 + 
-            (thumb_tip.y - index_tip.y)**2
-        )
-        if thumb_index_dist < 0.05:
-            return "pinch"
-        
-        # Fist (✊) - all fingers down
-        if (thumb_tip.y > thumb_ip.y and
-            index_tip.y > index_pip.y and
-            middle_tip.y > middle_pip.y and
-            ring_tip.y > ring_pip.y and
-            pinky_tip.y > pinky_pip.y):
-            return "fist"
-        
-        # Rock (🤘) - index and pinky up, middle and ring down
-        if (index_tip.y < index_pip.y and
-            pinky_tip.y < pinky_pip.y and
-            middle_tip.y > middle_pip.y and
-            ring_tip.y > ring_pip.y):
-            return "rock"
-        
-        return None
+        index = int(classify_gestures(points))
+        return GESTURE_NAMES[index] if index >= 0 else None
+
+    def detect_gestures(self, hands):
+        """Gesture name or None for every hand of a Hands, classified in one batched pass"""
+        if not len(hands.ids):
+            return []
+        return [GESTURE_NAMES[i] if i >= 0 else None for i in classify_gestures(hands.points).tolist()]
     
     def get_finger_tip(self, landmarks, finger_index=8):
         """Get finger tip position (default: index finger)"""
-        if not landmarks:
+        points = as_points(landmarks)
+        if points is None:
             return None, None
-        tip = landmarks.landmark[finger_index]
-        return tip.x, tip.y
-
+        return float(points[finger_index, 0]), float(points[finger_index, 1])
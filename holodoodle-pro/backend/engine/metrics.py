@@ -0,0 +1,123 @@
+from .pipeline import BUCKETS_MS
+from .session import DeliveryTotals
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+_BOUNDS = [f"{ms / 1000.0:g}" for ms in BUCKETS_MS] + ["+Inf"]
+
+# room label values of the per-source roll-ups; only named rooms get their own
+# series, so private rooms (one per connection) do not grow the label set
+PRIVATE_ROOMS = "(private)"
+CLIENT_VIEWERS = "(client)"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+def _series(name, labels):
+    return f"{name}{{{_labels(labels)}}}" if labels else name
+
+class MetricsWriter:
+    """Collects samples grouped by metric name, with HELP/TYPE lines written once per metric"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _family(self, name, kind, help_text):
+        family = self._metrics.get(name)
+        if family is None:
+            family = self._metrics[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        return family
+
+    def sample(self, name, kind, help_text, labels, value):
+        value = value if isinstance(value, int) else float(value)
+        self._family(name, kind, help_text).append(f"{_series(name, labels)} {value}")
+
+    def histogram(self, name, help_text, labels, stats):
+        """Cumulative buckets, sum and count of a StageStats, in seconds"""
+        family = self._family(name, "histogram", help_text)
+        label_text = _labels(labels)
+        running = 0
+        for bound, count in zip(_BOUNDS, stats.buckets):
+            running += count
+            family.append(f'{name}_bucket{{{label_text},le="{bound}"}} {running}')
+        family.append(f"{name}_sum{{{label_text}}} {stats.total_ms / 1000.0}")
+        family.append(f"{name}_count{{{label_text}}} {stats.count}")
+
+    def text(self):
+        return "\n".join(line for family in self._metrics.values() for line in family) + "\n"
+
+def _delivery(out, labels, totals, stage_help):
+    for name, stats in totals.stages.items():
+        out.histogram("holodoodle_stage_seconds", stage_help, {**labels, "stage": name}, stats)
+    out.sample("holodoodle_frames_dropped_total", "counter",
+               "Inferred frames the room's renderer skipped because it fell behind", labels, totals.dropped)
+    out.sample("holodoodle_frames_late_total", "counter",
+               "Send-loop ticks that started after their deadline", labels, totals.late_frames)
+    out.sample("holodoodle_frames_sent_total", "counter", "Frame messages sent to viewers",
+               labels, totals.frames_sent)
+    out.sample("holodoodle_bytes_sent_total", "counter", "Frame payload bytes sent to viewers",
+               labels, totals.bytes_sent)
+
+def _room_gauges(out, labels, rooms, viewers):
+    out.sample("holodoodle_particles", "gauge", "Live particles", labels,
+               sum(len(room.session.particle_system) for room in rooms))
+    out.sample("holodoodle_hands", "gauge", "Tracked hands", labels, sum(len(room.session.hands) for room in rooms))
+    out.sample("holodoodle_viewers", "gauge", "Connected viewers", labels, viewers)
+    out.sample("holodoodle_quality_level", "gauge", "Adaptive quality level, 0 is full quality",
+               labels, max((room.session.quality_level for room in rooms), default=0))
+
+def render_metrics(manager):
+    """Prometheus text for every live source and room of a SessionManager"""
+    out = MetricsWriter()
+    stage_help = "Time spent per frame in each pipeline stage"
+    with manager._lock:
+        producers = list(manager.producers.items())
+        recognizers = dict(manager.recognizers)
+        rooms = list(manager.rooms.values())
+        streams = list(manager.streams.items())
+        private = {source_id: totals.copy() for source_id, totals in manager.retired_private.items()}
+        client = {source_id: totals.copy() for source_id, totals in manager.retired_streams.items()}
+
+    out.sample("holodoodle_rooms", "gauge", "Active rooms", {}, len(rooms))
+    for source_id, producer in producers:
+        labels = {"source": source_id}
+        for name, stats in producer.stats.items():
+            out.histogram("holodoodle_stage_seconds", stage_help, {**labels, "room": "", "stage": name}, stats)
+        recognizer = recognizers.get(source_id)
+        if recognizer is not None:
+            out.histogram("holodoodle_stage_seconds", stage_help,
+                          {**labels, "room": "", "stage": "detect"}, recognizer.detect_stats)
+            out.sample("holodoodle_predicted_frames_total", "counter",
+                       "Frames whose landmarks were extrapolated instead of detected",
+                       labels, recognizer.predicted_frames)
+        out.sample("holodoodle_capture_dropped_total", "counter",
+                   "Captured frames dropped before inference", labels, producer.dropped)
+
+    private_rooms = {}
+    for room in rooms:
+        if room.private:
+            private.setdefault(room.source_id, DeliveryTotals()).add_room(room)
+            private_rooms.setdefault(room.source_id, []).append(room)
+            continue
+        labels = {"source": room.source_id, "room": room.room_id}
+        _delivery(out, labels, DeliveryTotals().add_room(room), stage_help)
+        _room_gauges(out, labels, [room], sum(room.variants.values()))
+
+    for source_id, totals in private.items():
+        labels = {"source": source_id, "room": PRIVATE_ROOMS}
+        _delivery(out, labels, totals, stage_help)
+        live = private_rooms.get(source_id, [])
+        _room_gauges(out, labels, live, sum(sum(room.variants.values()) for room in live))
+
+    viewers = {}
+    for stream, source_id in streams:
+        client.setdefault(source_id, DeliveryTotals()).add_stream(stream)
+        viewers[source_id] = viewers.get(source_id, 0) + 1
+    for source_id, totals in client.items():
+        labels = {"source": source_id, "room": CLIENT_VIEWERS}
+        _delivery(out, labels, totals, stage_help)
+        out.sample("holodoodle_viewers", "gauge", "Connected viewers", labels, viewers.get(source_id, 0))
+    return out.text()
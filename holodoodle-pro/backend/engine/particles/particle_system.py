@@ -1,75 +1,171 @@
-import numpy as np
 import cv2
-import random
-
-class Particle:
-    def __init__(self, x, y, vx, vy, color, size, lifetime):
-        self.x = float(x)
-        self.y = float(y)
-        self.vx = float(vx)
-        self.vy = float(vy)
-        self.color = color
-        self.size = float(size)
-        self.lifetime = float(lifetime)
-        self.age = 0.0
-    
-    def update(self, gravity=0.2, friction=0.98):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += gravity
-        self.vx *= friction
-        self.vy *= friction
-        self.age += 1.0
-        self.size = max(0, self.size - 0.1)
-    
-    def is_alive(self, width, height):
-        return (self.age < self.lifetime and 
-                self.size > 0 and 
-                0 <= self.x < width and 
-                0 <= self.y < height)
-    
-    def draw(self, canvas):
-        if self.size > 0:
-            alpha = 1.0 - (self.age / self.lifetime)
-            color = tuple(int(c * alpha) for c in self.color)
-            cv2.circle(canvas, (int(self.x), int(self.y)), int(self.size), color, -1)
+import numpy as np
+
+# Batched splatting costs about this many window pixels per particle drawn
+# one by one; sparser particles are drawn with cv2.circle instead
+SPLAT_PIXELS_PER_PARTICLE = 256
 
 class ParticleSystem:
-    def __init__(self, max_particles=500):
-        self.particles = []
+    """Struct-of-arrays particle store updated and drawn in batched passes"""
+
+    def __init__(self, max_particles=500, gravity=0.2, friction=0.98, seed=None):
         self.max_particles = max_particles
-    
+        self.limit = max_particles  # live-particle cap, lowered by the quality controller
+        self.gravity = gravity
+        self.friction = friction
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self._disks = {}
+        self._splat = None
+
+        # Preallocated particle attributes, live particles packed in [0, count)
+        self.pos = np.zeros((max_particles, 2), dtype=np.float32)
+        self.vel = np.zeros((max_particles, 2), dtype=np.float32)
+        self.color = np.zeros((max_particles, 3), dtype=np.float32)
+        self.size = np.zeros(max_particles, dtype=np.float32)
+        self.age = np.zeros(max_particles, dtype=np.float32)
+        self.lifetime = np.zeros(max_particles, dtype=np.float32)
+
+    def __len__(self):
+        return self.count
+
+    def _reserve(self, count):
+        """Claim up to count free slots, returns the slice to fill"""
+        n = max(0, min(count, self.limit - self.count))
+        start = self.count
+        self.count += n
+        return slice(start, start + n), n
+
+    def _emit(self, sl, x, y, vx, vy, color, size, lifetime):
+        self.pos[sl] = (x, y)
+        self.vel[sl, 0] = vx
+        self.vel[sl, 1] = vy
+        self.color[sl] = color
+        self.size[sl] = size
+        self.age[sl] = 0.0
+        self.lifetime[sl] = lifetime
+
     def spawn_explosion(self, x, y, color, count=20):
         """Spawn explosion particles"""
-        for _ in range(min(count, self.max_particles - len(self.particles))):
-            angle = random.uniform(0, 2 * np.pi)
-            speed = random.uniform(2, 8)
-            vx = np.cos(angle) * speed
-            vy = np.sin(angle) * speed
-            size = random.uniform(3, 8)
-            lifetime = random.uniform(30, 60)
-            self.particles.append(Particle(x, y, vx, vy, color, size, lifetime))
-    
+        sl, n = self._reserve(count)
+        if n == 0:
+            return
+        rng = self.rng
+        angle = rng.uniform(0, 2 * np.pi, n)
+        speed = rng.uniform(2, 8, n)
+        self._emit(sl, x, y, np.cos(angle) * speed, np.sin(angle) * speed, color,
+                   rng.uniform(3, 8, n), rng.uniform(30, 60, n))
+
     def spawn_trail(self, x, y, color, count=3):
         """Spawn trail particles"""
-        for _ in range(min(count, self.max_particles - len(self.particles))):
-            vx = random.uniform(-1, 1)
-            vy = random.uniform(-1, 1)
-            size = random.uniform(2, 4)
-            lifetime = random.uniform(10, 20)
-            self.particles.append(Particle(x, y, vx, vy, color, size, lifetime))
-    
+        sl, n = self._reserve(count)
+        if n == 0:
+            return
+        rng = self.rng
+        self._emit(sl, x, y, rng.uniform(-1, 1, n), rng.uniform(-1, 1, n), color,
+                   rng.uniform(2, 4, n), rng.uniform(10, 20, n))
+
+    def step(self, width, height):
+        """Integrate, cull and compact all particles in one batched pass"""
+        n = self.count
+        if n == 0:
+            return
+        pos, vel = self.pos[:n], self.vel[:n]
+        size, age = self.size[:n], self.age[:n]
+
+        pos += vel
+        vel[:, 1] += self.gravity
+        vel *= self.friction
+        age += 1.0
+        np.maximum(size - 0.1, 0, out=size)
+
+        x, y = pos[:, 0], pos[:, 1]
+        alive = ((age < self.lifetime[:n]) & (size > 0) &
+                 (x >= 0) & (x < width) & (y >= 0) & (y < height))
+        keep = np.flatnonzero(alive)
+        if len(keep) < n:
+            for arr in (self.pos, self.vel, self.color, self.size, self.age, self.lifetime):
+                arr[:len(keep)] = arr[keep]
+            self.count = len(keep)
+
+    def _disk(self, radius, stride):
+        """Flat offsets of a filled circle inside a buffer with the given row stride"""
+        key = (radius, stride)
+        disk = self._disks.get(key)
+        if disk is None:
+            dy, dx = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+            inside = dx * dx + dy * dy <= radius * radius
+            disk = dy[inside] * stride + dx[inside]
+            self._disks[key] = disk
+        return disk
+
+    def _splat_buffer(self, height, width):
+        """Zeroed particle-index scratch window, a view into one reused flat buffer"""
+        size = height * width
+        if self._splat is None or len(self._splat) < size:
+            self._splat = np.zeros(size, dtype=np.int32)
+        else:
+            self._splat[:size] = 0
+        return self._splat[:size].reshape(height, width)
+
+    def draw(self, canvas):
+        """Splat all live particles into canvas with one scatter per radius.
+
+        Each pixel keeps the newest particle covering it, so overlaps stack in
+        spawn order as with one-by-one drawing. Only the particles' bounding
+        box is splatted and written back; when they are few for the size of
+        that box they are drawn one by one.
+        Returns the (x1, y1, x2, y2) bounding box of the drawn pixels, or None.
+        """
+        n = self.count
+        if n == 0:
+            return None
+        h, w = canvas.shape[:2]
+        radii = self.size[:n].astype(np.intp)
+        pad = int(radii.max())
+        xs = self.pos[:n, 0].astype(np.intp)
+        ys = self.pos[:n, 1].astype(np.intp)
+        x1, y1 = int(xs.min()) - pad, int(ys.min()) - pad
+        x2, y2 = int(xs.max()) + pad + 1, int(ys.max()) + pad + 1
+
+        alpha = 1.0 - self.age[:n] / self.lifetime[:n]
+        c = (self.color[:n] * alpha[:, None]).astype(np.uint8)
+
+        if n * SPLAT_PIXELS_PER_PARTICLE < (x2 - x1) * (y2 - y1):
+            for x, y, radius, color in zip(xs.tolist(), ys.tolist(), radii.tolist(), c.tolist()):
+                cv2.circle(canvas, (x, y), radius, color, -1)
+            return x1, y1, x2, y2
+
+        buf = self._splat_buffer(y2 - y1, x2 - x1)
+        stride = buf.shape[1]
+        centers = (ys - y1) * stride + xs - x1
+
+        # Scatter particle index + 1 (0 is uncovered). Within a radius group
+        # the last write wins and indices ascend; across groups only a newer
+        # particle may overwrite a pixel
+        flat = buf.reshape(-1)
+        for radius in np.unique(radii):
+            sel = np.flatnonzero(radii == radius)
+            disk = self._disk(int(radius), stride)
+            pixels = (centers[sel, None] + disk).ravel()
+            owners = np.repeat(sel.astype(np.int32) + 1, len(disk))
+            newer = owners > flat[pixels]
+            flat[pixels[newer]] = owners[newer]
+
+        # Write back the part of the window inside the canvas
+        cx1, cy1, cx2, cy2 = max(x1, 0), max(y1, 0), min(x2, w), min(y2, h)
+        if cx1 >= cx2 or cy1 >= cy2:
+            return x1, y1, x2, y2
+        splat = buf[cy1 - y1:cy2 - y1, cx1 - x1:cx2 - x1]
+        covered = splat != 0
+        canvas[cy1:cy2, cx1:cx2][covered] = c[splat[covered] - 1]
+        return x1, y1, x2, y2
+
     def update(self, canvas):
-        """Update and draw all particles"""
+        """Update and draw all particles, returns the drawn bounding box or None"""
         h, w = canvas.shape[:2]
-        alive_particles = []
-        for p in self.particles:
-            p.update()
-            if p.is_alive(w, h):
-                p.draw(canvas)
-                alive_particles.append(p)
-        self.particles = alive_particles
-    
-    def clear(self):
-        self.particles.clear()
+        self.step(w, h)
+        return self.draw(canvas)
 
+    def clear(self):
+        self.count = 0
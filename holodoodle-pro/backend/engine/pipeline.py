@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class DropQueue:
+    """Bounded handoff queue that discards the oldest item when full"""
+
+    def __init__(self, maxsize=1):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Pop the oldest item, or None on timeout/close"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self.closed, timeout)
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class AsyncDropQueue(DropQueue):
+    """DropQueue an asyncio task can wait on without holding a thread.
+
+    Producer threads still put() as usual; each put or close wakes the
+    waiting task through the event loop.
+    """
+
+    def __init__(self, loop, maxsize=1):
+        super().__init__(maxsize)
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def _wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # loop already closed, nobody is waiting
+
+    def put(self, item):
+        super().put(item)
+        self._wake()
+
+    def close(self):
+        super().close()
+        self._wake()
+
+    async def get_async(self, timeout=None):
+        """Pop the oldest item, or None on timeout/close; call from the queue's loop"""
+        deadline = None if timeout is None else self._loop.time() + timeout
+        while True:
+            with self._cond:
+                if self._items:
+                    return self._items.popleft()
+                if self.closed:
+                    return None
+                # Cleared before waiting: a later put schedules its set() after this
+                self._ready.clear()
+            remaining = None if deadline is None else deadline - self._loop.time()
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+# Histogram bucket upper bounds in milliseconds, chosen around the 33 ms frame budget
+BUCKETS_MS = (1, 2, 4, 8, 12, 16, 25, 33, 50, 100, 250, 1000)
+
+class StageStats:
+    """Latency counters for one pipeline stage.
+
+    Keeps an EMA for quick display, cumulative histogram buckets (for
+    Prometheus) and the last `window` samples for rolling percentiles.
+    """
+
+    def __init__(self, name, smoothing=0.1, window=256):
+        self.name = name
+        self.smoothing = smoothing
+        self.count = 0
+        self.last_ms = 0.0
+        self.avg_ms = 0.0
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # last one is +Inf
+        self.recent = deque(maxlen=window)
+
+    def record(self, start):
+        """Record a stage run that began at perf_counter() value start"""
+        self.add((time.perf_counter() - start) * 1000.0)
+
+    def add(self, ms):
+        """Record a stage run that took ms milliseconds"""
+        self.count += 1
+        self.last_ms = ms
+        self.avg_ms = ms if self.count == 1 else self.avg_ms + self.smoothing * (ms - self.avg_ms)
+        self.max_ms = max(self.max_ms, ms)
+        self.total_ms += ms
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+        self.recent.append(ms)
+
+    def percentile(self, q):
+        """q-th percentile (0-100) of the recent window, 0 when empty"""
+        recent = sorted(self.recent)
+        if not recent:
+            return 0.0
+        return recent[min(int(q / 100.0 * len(recent)), len(recent) - 1)]
+
+    def merge(self, other):
+        """Add another StageStats' counts and histogram into this one (the rolling window is not merged)"""
+        self.count += other.count
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.total_ms += other.total_ms
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        return self
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "last_ms": round(self.last_ms, 2),
+            "avg_ms": round(self.avg_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": round(self.percentile(50), 2),
+            "p99_ms": round(self.percentile(99), 2),
+        }
+
+class SourceProducer:
+    """Inference over one FrameSource, fanned out to N subscribers.
+
+    The source captures on its own thread into a frame ring; inference always
+    takes the newest frame, skipping any it fell behind on. Each subscriber
+    gets its own DropQueue of (seq, timestamp, frame, landmarks), timestamp
+    being the monotonic capture time in seconds; a slow subscriber only drops
+    its own stale frames. Frames are zero-copy views of ring slots shared by
+    every subscriber, so they must not be drawn on in place.
+    """
+
+    def __init__(self, source, infer):
+        self.source = source    # FrameSource, started and stopped with the producer
+        self.infer = infer      # frame -> landmarks
+        self.stats = {"capture": source.stats, "inference": StageStats("inference")}
+        self.seq = 0
+        self.dropped = 0        # captured frames inference never saw
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def subscribe(self, maxsize=1, loop=None):
+        """New subscriber queue; with an event loop, one its tasks can await"""
+        queue = AsyncDropQueue(loop, maxsize) if loop is not None else DropQueue(maxsize)
+        with self._lock:
+            self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        """Detach a subscriber queue, returns the number of subscribers left"""
+        with self._lock:
+            if queue in self._subscribers:
+                self._subscribers.remove(queue)
+            queue.close()
+            return len(self._subscribers)
+
+    def start(self):
+        self.source.start()
+        self._thread = threading.Thread(target=self._inference_loop, name="inference", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        self.source.stop(timeout)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _inference_loop(self):
+        last = -1
+        try:
+            while self.running:
+                item = self.source.wait(last)
+                if item is None:
+                    break
+                capture_seq, timestamp, frame = item
+                self.dropped += capture_seq - last - 1
+                last = capture_seq
+                start = time.perf_counter()
+                landmarks = self.infer(frame)
+                self.stats["inference"].record(start)
+                self.seq += 1
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                for queue in subscribers:
+                    queue.put((self.seq, timestamp, frame, landmarks))
+        except Exception:
+            logger.exception("Inference thread failed")
+            self.source.stop()
+        finally:
+            # Stopped, ended or failed: let every subscriber see it instead of waiting forever
+            self._stop.set()
+            with self._lock:
+                for queue in self._subscribers:
+                    queue.close()
+
+class RenderStage:
+    """Render thread plus encode pool consuming one SourceProducer subscription.
+
+    Finished payloads are published as (seq, payload) in sequence order; any
+    number of readers can poll latest() without consuming it.
+    """
+
+    def __init__(self, source_q, render, encode, encode_workers=2):
+        self.source_q = source_q
+        self.render = render    # (frame, landmarks, timestamp) -> rendered output
+        self.encode = encode    # (seq, rendered output) -> payload
+        self.stats = {name: StageStats(name) for name in ("render", "encode")}
+        self.encode_workers = encode_workers
+        self.current = None
+        self._pool = ThreadPoolExecutor(encode_workers, thread_name_prefix="encode")
+        self._pending = deque()
+        self._publish_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._render_loop, name="render", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        self.source_q.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _render_loop(self):
+        try:
+            while self.running:
+                item = self.source_q.get()
+                if item is None:
+                    break
+                seq, timestamp, frame, landmarks = item
+                start = time.perf_counter()
+                output = self.render(frame, landmarks, timestamp)
+                self.stats["render"].record(start)
+
+                # Backpressure: wait on the oldest encode rather than queue unbounded work
+                while self._pending and self._pending[0].done():
+                    self._pending.popleft()
+                if len(self._pending) >= self.encode_workers:
+                    self._pending.popleft().exception()
+                future = self._pool.submit(self._encode, seq, output)
+                future.add_done_callback(lambda f, seq=seq: self._publish(seq, f))
+                self._pending.append(future)
+        except Exception:
+            logger.exception("Render thread failed")
+        finally:
+            self._stop.set()
+            self.source_q.close()
+
+    def _encode(self, seq, output):
+        start = time.perf_counter()
+        payload = self.encode(seq, output)
+        self.stats["encode"].record(start)
+        return payload
+
+    def _publish(self, seq, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error("Encoding frame %d failed", seq, exc_info=future.exception())
+            return
+        with self._publish_lock:
+            if self.current is None or seq > self.current[0]:
+                self.current = (seq, future.result())
+
+    def latest(self):
+        """Newest finished (seq, payload), or None if nothing is ready yet"""
+        return self.current
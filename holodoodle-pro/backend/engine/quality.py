@@ -0,0 +1,90 @@
+import threading
+import time
+
+# Quality ladder, best first. Factors are relative to the configured values.
+#   jpeg_quality      encoder quality for every variant
+#   particles         multiplier on particle_intensity and the live-particle cap
+#   bloom_scale       neon bloom blur resolution
+#   inference_scale   multiplier on the recognizer's inference scale
+#   shaders           "all", "light" (no VHS noise) or "none"
+#   output_scale      encoded frame size
+QUALITY_LEVELS = (
+    {"jpeg_quality": 85, "particles": 1.0, "bloom_scale": 1.0, "inference_scale": 1.0, "shaders": "all", "output_scale": 1.0},
+    {"jpeg_quality": 75, "particles": 1.0, "bloom_scale": 0.5, "inference_scale": 1.0, "shaders": "all", "output_scale": 1.0},
+    {"jpeg_quality": 70, "particles": 0.6, "bloom_scale": 0.5, "inference_scale": 1.0, "shaders": "light", "output_scale": 1.0},
+    {"jpeg_quality": 65, "particles": 0.3, "bloom_scale": 0.25, "inference_scale": 0.75, "shaders": "light", "output_scale": 0.75},
+    {"jpeg_quality": 60, "particles": 0.0, "bloom_scale": 0.25, "inference_scale": 0.5, "shaders": "none", "output_scale": 0.75},
+    {"jpeg_quality": 50, "particles": 0.0, "bloom_scale": 0.25, "inference_scale": 0.5, "shaders": "none", "output_scale": 0.5},
+)
+
+class QualityController:
+    """Steps down the QUALITY_LEVELS ladder when frames run over budget and back up when there is room.
+
+    Frame times are smoothed with an EMA. The controller degrades once the
+    average stays above degrade_at x budget for degrade_after seconds, and
+    upgrades only after upgrade_after seconds below upgrade_at x budget; every
+    change is followed by a cooldown so the effect of the last step is measured
+    before the next. The gap between the two thresholds plus the slow upgrade
+    is the hysteresis that keeps it from oscillating between two levels.
+    """
+
+    def __init__(self, target_fps=30, levels=QUALITY_LEVELS, degrade_at=1.0, upgrade_at=0.7,
+                 degrade_after=0.5, upgrade_after=3.0, cooldown=1.0, smoothing=0.1):
+        self.budget_ms = 1000.0 / target_fps
+        self.levels = levels
+        self.degrade_at = degrade_at
+        self.upgrade_at = upgrade_at
+        self.degrade_after = degrade_after
+        self.upgrade_after = upgrade_after
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.level = 0
+        self.frame_ms = None
+        self.changes = 0
+        self._over_since = None
+        self._under_since = None
+        self._hold_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def observe(self, frame_ms, now=None):
+        """Feed one measured frame time; returns True when the level changed"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.frame_ms is None:
+                self.frame_ms = frame_ms
+            else:
+                self.frame_ms += self.smoothing * (frame_ms - self.frame_ms)
+            load = self.frame_ms / self.budget_ms
+
+            self._over_since = (self._over_since or now) if load > self.degrade_at else None
+            self._under_since = (self._under_since or now) if load < self.upgrade_at else None
+            if now < self._hold_until:
+                return False
+
+            step = 0
+            if self._over_since is not None and now - self._over_since >= self.degrade_after:
+                step = 1
+            elif self._under_since is not None and now - self._under_since >= self.upgrade_after:
+                step = -1
+            level = min(max(self.level + step, 0), len(self.levels) - 1)
+            if level == self.level:
+                return False
+            self.level = level
+            self.changes += 1
+            self._over_since = self._under_since = None
+            self._hold_until = now + self.cooldown
+            return True
+
+    def as_dict(self):
+        return {
+            "level": self.level,
+            "max_level": len(self.levels) - 1,
+            "frame_ms": round(self.frame_ms or 0.0, 2),
+            "budget_ms": round(self.budget_ms, 2),
+            "changes": self.changes,
+            **self.settings,
+        }
@@ -0,0 +1,619 @@
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+from .utils import LayerStack
+from .particles import ParticleSystem
+from .brushes import get_brush, brush_names
+from .shaders import ShaderChain, apply_shader_effects, ripple_pulse
+from .pipeline import RenderStage, SourceProducer, StageStats
+from .gesture import as_hands, draw_skeleton
+from .filters import GestureStabilizer, TipSmoother
+from .strokes import StrokeBuilder
+from .stroke_log import StrokeLog
+from .trace import TraceWriter
+from .quality import QualityController
+from .encoding import LadderEncoder
+
+# Registered brushes, in the order the peace gesture cycles through them
+BRUSHES = brush_names()
+# Sub-stages of DoodleSession.render timed when profiling
+SESSION_STAGES = ("fade", "gesture", "draw", "particles", "blend", "shaders", "overlay")
+
+class HandState:
+    """One tracked hand's brush, drawing toggle, gesture stabilizer, fingertip filter and stroke"""
+
+    def __init__(self, hand_id, brush_index=0, drawing_enabled=True):
+        self.id = hand_id
+        self.brush_index = brush_index
+        self.drawing_enabled = drawing_enabled
+        self.gestures = GestureStabilizer()
+        self.tip = TipSmoother()
+        self.stroke = StrokeBuilder()
+        self.last_seen = None
+
+    def lift(self):
+        """End the current stroke, the next point starts a new one"""
+        self.stroke.reset()
+        self.tip.reset()
+
+class GestureControls:
+    """Per-hand and session-wide toggles driven by stabilized gestures.
+
+    Every tracked hand has a HandState with its own brush, drawing toggle and
+    gesture stabilizer; glow and glitch are shared. The last brush/drawing
+    change is also the session's, shown in the UI and given to new hands.
+    Shared by server-rendered sessions and client-rendered landmark streams so
+    both react to a gesture the same way; fist (clear) and the peace ripple are
+    left to whichever side draws.
+    """
+
+    # Seconds a hand may go unseen before its state is forgotten
+    hand_timeout = 1.0
+
+    def __init__(self):
+        self.brush_index = 0
+        self.drawing_enabled = True
+        self.glow_mode = False
+        self.glitch_mode = False
+        self.hands = {}  # hand ID -> HandState
+
+    def state(self):
+        return {
+            "brush": BRUSHES[self.brush_index],
+            "drawing": self.drawing_enabled,
+            "glow": self.glow_mode,
+            "glitch": self.glitch_mode,
+            "hands": len(self.hands)
+        }
+
+    def toggle(self, gesture, hand=None):
+        """Apply the state change a stabilized gesture stands for, brush and drawing on hand"""
+        if gesture == "peace":
+            current = self.brush_index if hand is None else hand.brush_index
+            self.brush_index = (current + 1) % len(BRUSHES)
+            if hand is not None:
+                hand.brush_index = self.brush_index
+        elif gesture == "thumbs_up":
+            self.glow_mode = not self.glow_mode
+        elif gesture == "pinch":
+            current = self.drawing_enabled if hand is None else hand.drawing_enabled
+            self.drawing_enabled = not current
+            if hand is not None:
+                hand.drawing_enabled = self.drawing_enabled
+        elif gesture == "rock":
+            self.glitch_mode = not self.glitch_mode
+
+    def update_hands(self, hands, gestures, timestamp):
+        """Stabilize each present hand's gesture, returns [(HandState, fired gesture or None)] in hands order.
+
+        Absent hands lift their stroke and are dropped after hand_timeout seconds.
+        """
+        present = []
+        for hand_id, gesture in zip(hands.ids.tolist(), gestures):
+            hand = self.hands.get(hand_id)
+            if hand is None:
+                hand = self.hands[hand_id] = HandState(hand_id, self.brush_index, self.drawing_enabled)
+            hand.last_seen = timestamp
+            present.append((hand, hand.gestures.update(gesture, timestamp)))
+        if len(present) < len(self.hands):
+            seen = set(hands.ids.tolist())
+            for hand_id, hand in list(self.hands.items()):
+                if hand_id in seen:
+                    continue
+                hand.lift()
+                hand.gestures.update(None, timestamp)
+                if timestamp - hand.last_seen > self.hand_timeout:
+                    del self.hands[hand_id]
+        return present
+
+class DoodleSession(GestureControls):
+    """Per-room drawing state: layers, particles, brush settings and gesture/tip filters"""
+
+    def __init__(self, recognizer, max_particles=300, seed=None, trace_path=None, profile=False, quality=None):
+        super().__init__()
+        self.recognizer = recognizer
+        # LayerStack and its strokes layer, created on the first frame once the size is known
+        self.layers = None
+        self.canvas = None
+        # Vector record of every stroke drawn, outliving the fading pixels; also created on the first frame
+        self.stroke_log = None
+        # Per-sub-stage timings; off by default, hud implies profiling
+        self.profile = profile
+        self.hud = False
+        self.stats = {name: StageStats(name) for name in SESSION_STAGES}
+        # Landmark trace recording, opened on the first frame once the size is known
+        self.trace_path = trace_path
+        self.trace = None
+        # seed makes particles and shader noise reproducible (offline rendering)
+        self.particle_system = ParticleSystem(max_particles=max_particles, seed=seed)
+        self.shaders = ShaderChain(seed=seed)
+        self.particle_intensity = 1.0
+
+        # Adaptive quality: a QualityController whose level is applied at the next render
+        self.quality = quality
+        self.quality_level = 0
+        self.particle_factor = 1.0
+        self.brush_detail = 1.0
+        self.shader_set = "all"
+
+        self.time_counter = 0
+
+    def state(self):
+        return {**super().state(), "quality": self.quality_level}
+
+    def apply_quality(self, level, settings):
+        """Switch the render-side quality knobs to one QUALITY_LEVELS entry"""
+        self.quality_level = level
+        self.particle_factor = settings["particles"]
+        self.particle_system.limit = int(self.particle_system.max_particles * settings["particles"])
+        self.brush_detail = settings["bloom_scale"]
+        self.shader_set = settings["shaders"]
+        if hasattr(self.recognizer, "request_scale"):
+            self.recognizer.request_scale(id(self), settings["inference_scale"])
+
+    def _lap(self, name, start):
+        """Record sub-stage name as ending now, returns the next stage's start (None when not profiling)"""
+        if start is None:
+            return None
+        now = time.perf_counter()
+        self.stats[name].add((now - start) * 1000.0)
+        return now
+
+    def draw_hud(self, frame):
+        """Timing overlay: rolling p50/p99 per render sub-stage plus live counts"""
+        lines = [f"{name:<9} {s.percentile(50):5.1f} {s.percentile(99):5.1f} ms" for name, s in self.stats.items()]
+        detect = getattr(self.recognizer, "detect_stats", None)
+        if detect is not None:
+            lines.append(f"{'detect':<9} {detect.percentile(50):5.1f} {detect.percentile(99):5.1f} ms")
+        lines.append(f"particles {len(self.particle_system)}")
+        y = frame.shape[0] - 10 - 16 * (len(lines) - 1)
+        for line in lines:
+            cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_PLAIN, 1.0, (0, 255, 255), 1)
+            y += 16
+
+    def close(self):
+        """Flush and close the trace recording, withdraw any inference scale request"""
+        if self.trace is not None:
+            self.trace.close()
+        if hasattr(self.recognizer, "request_scale"):
+            self.recognizer.request_scale(id(self), None)
+
+    def handle_gesture(self, gesture, frame, hand=None):
+        """Apply a gesture command made by hand, returns the (possibly replaced) frame"""
+        h, w = frame.shape[:2]
+        self.toggle(gesture, hand)
+        if gesture == "peace":
+            # Ripple effect on brush change
+            frame = ripple_pulse(frame, (w // 2, h // 2), 50, 30)
+        elif gesture == "fist":
+            self.layers.clear()
+            self.particle_system.clear()
+        return frame
+
+    def draw_strokes(self, strokes, t, frame, brush_index=None):
+        """Draw (N, 2) pixel polylines with one brush (the session's by default) in one batch and spawn trail particles"""
+        layers = self.layers
+        brush = get_brush(BRUSHES[self.brush_index if brush_index is None else brush_index])
+        with layers.draw():
+            brush.draw(layers["strokes"].canvas, strokes, t, overlay=layers["overlay"].canvas,
+                       detail=self.brush_detail, effects=layers["effects"].canvas)
+            # Per stroke, so hands far apart do not dirty every tile between them
+            for stroke in strokes:
+                layers["strokes"].mark_dirty(*brush.bounds(stroke))
+                for name, reach in brush.layer_reach.items():
+                    layers[name].mark_dirty(*brush.bounds(stroke, reach))
+
+        # Spawn particles
+        intensity = self.particle_intensity * self.particle_factor
+        if intensity > 0:
+            color = (255, int(200 + 55 * t), int(100 + 155 * t))
+            for stroke in strokes:
+                x, y = stroke[-1]
+                self.particle_system.spawn_trail(int(x), int(y), color, int(3 * intensity))
+
+    def render(self, frame, landmarks, timestamp=None):
+        """Render one frame with Hands (or one hand's (21, 3) landmarks, or None), returns (blended, state)"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        # Source frames are shared between rooms, never draw on them in place
+        frame = frame.copy()
+        h, w = frame.shape[:2]
+
+        if self.layers is None:
+            self.layers = LayerStack(h, w)
+            self.canvas = self.layers["strokes"]
+            self.stroke_log = StrokeLog(w, h, BRUSHES, origin=timestamp)
+        layers = self.layers
+        if self.trace_path and self.trace is None:
+            self.trace = TraceWriter(self.trace_path, w, h)
+        if self.quality is not None and self.quality.level != self.quality_level:
+            self.apply_quality(self.quality.level, self.quality.settings)
+        lap = time.perf_counter() if self.profile or self.hud else None
+
+        # Fade every layer at its own rate
+        layers.fade()
+        lap = self._lap("fade", lap)
+
+        # Classify every hand's gesture in one pass, debounced per hand over time rather than frames
+        hands = as_hands(landmarks)
+        gestures = self.recognizer.detect_gestures(hands)
+        if self.trace is not None:
+            self.trace.write(timestamp, hands, gestures)
+        present = self.update_hands(hands, gestures, timestamp)
+        for hand, gesture in present:
+            if gesture:
+                frame = self.handle_gesture(gesture, frame, hand)
+                if gesture == "fist":
+                    self.stroke_log.clear(timestamp)
+        lap = self._lap("gesture", lap)
+
+        # Drawing logic: each drawing hand's new stroke points, then one draw per brush in use
+        if present:
+            # Get time for animation
+            t = (self.time_counter % 1000) / 1000.0
+            tips = (hands.points[:, 8, :2] * (w, h)).tolist()
+            drawing = [hand.drawing_enabled for hand, _ in present]
+            by_brush = {}
+            for (hand, _), (x, y) in zip(present, tips):
+                if not hand.drawing_enabled:
+                    hand.lift()
+                    continue
+                if x and y:
+                    # Smoothed tip; None while it sits inside the jitter dead band
+                    point = hand.tip.update(x, y, timestamp)
+                    if point is not None:
+                        # Spline-resampled points since the last frame, spaced for the hand's brush
+                        brush = get_brush(BRUSHES[hand.brush_index])
+                        stroke = hand.stroke.add(point[0], point[1], brush.spacing)
+                        if stroke is not None:
+                            by_brush.setdefault(hand.brush_index, []).append(stroke)
+                            self.stroke_log.append(stroke, timestamp, hand.brush_index, hand.id, t)
+
+            for brush_index, strokes in by_brush.items():
+                self.draw_strokes(strokes, t, frame, brush_index)
+            # Draw the drawing hands' skeletons
+            if any(drawing):
+                draw_skeleton(frame, hands.points[drawing])
+        lap = self._lap("draw", lap)
+
+        # Update particles, drawn on their own layer
+        particles = layers["particles"]
+        with layers.draw():
+            drawn = self.particle_system.update(particles.canvas)
+            if drawn is not None:
+                particles.mark_dirty(*drawn)
+        lap = self._lap("particles", lap)
+
+        # Composite all layers over the frame in one pass over their active tiles
+        blended = layers.composite(frame, 0.5)
+        lap = self._lap("blend", lap)
+
+        # Apply shader effects
+        # The quality level can drop VHS noise ("light") or every effect ("none")
+        shaders_on = self.shader_set != "none"
+        shader_config = {
+            'chromatic_aberration': self.glow_mode and shaders_on,
+            'glitch': self.glitch_mode and shaders_on,
+            'vhs_noise': self.glitch_mode and self.shader_set == "all",
+            'chromatic_intensity': 3,
+            'glitch_intensity': 5,
+            'vhs_intensity': 10
+        }
+        # composite() returned a fresh frame, so the chain can work in place
+        blended = apply_shader_effects(blended, shader_config, in_place=True, chain=self.shaders)
+        lap = self._lap("shaders", lap)
+
+        # Add UI text
+        cv2.putText(blended, f"Brush: {BRUSHES[self.brush_index].upper()}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        cv2.putText(blended, f"Drawing: {'ON' if self.drawing_enabled else 'OFF'}", (10, 60),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0) if self.drawing_enabled else (0, 0, 255), 2)
+        if self.hud:
+            self.draw_hud(blended)
+        self._lap("overlay", lap)
+
+        self.time_counter += 1
+        return blended, self.state()
+
+class LandmarkStream(GestureControls):
+    """Server half of client-side rendering for one viewer.
+
+    Only gestures are interpreted here; the browser draws strokes, particles
+    and effects from the landmarks itself, so nothing is rendered or encoded
+    per frame and a viewer costs about 140 bytes per hand per frame.
+    """
+
+    def __init__(self, recognizer, trace_path=None):
+        super().__init__()
+        self.recognizer = recognizer
+        self.trace_path = trace_path
+        self.trace = None
+        self.send_stats = StageStats("send")
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    def update(self, timestamp, landmarks):
+        """Feed one inferred frame, returns (Hands, [(HandState, fired gesture or None)], state)"""
+        hands = as_hands(landmarks)
+        gestures = self.recognizer.detect_gestures(hands)
+        if self.trace_path and self.trace is None:
+            self.trace = TraceWriter(self.trace_path, rendering="client")
+        if self.trace is not None:
+            self.trace.write(timestamp, hands, gestures)
+        present = self.update_hands(hands, gestures, timestamp)
+        for hand, gesture in present:
+            if gesture:
+                self.toggle(gesture, hand)
+        return hands, present, self.state()
+
+    def record_send(self, start, size):
+        self.send_stats.record(start)
+        self.frames_sent += 1
+        self.bytes_sent += size
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.close()
+
+    def stats_dict(self):
+        return {
+            "rendering": "client",
+            "stages": {"send": self.send_stats.as_dict()},
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "recognizer": self.recognizer.stats_dict()
+        }
+
+class DeliveryTotals:
+    """Summed delivery counters and stage histograms of viewers reported as one group.
+
+    /metrics reports private rooms and client-rendered viewers per source
+    rather than one series per connection; closed ones are added to a running
+    total when they leave so the summed counters never go backwards.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.late_frames = 0
+        self.dropped = 0
+
+    def add(self, stages, frames_sent, bytes_sent, late_frames=0, dropped=0):
+        for name, stats in stages.items():
+            self.stages.setdefault(name, StageStats(name)).merge(stats)
+        self.frames_sent += frames_sent
+        self.bytes_sent += bytes_sent
+        self.late_frames += late_frames
+        self.dropped += dropped
+        return self
+
+    def add_room(self, room):
+        return self.add({name: stats for name, stats in room.stage_stats().items() if name not in room.producer.stats},
+                        room.frames_sent, room.bytes_sent, room.late_frames, room.source_q.dropped)
+
+    def add_stream(self, stream):
+        return self.add({"send": stream.send_stats}, stream.frames_sent, stream.bytes_sent)
+
+    def copy(self):
+        return DeliveryTotals().add(self.stages, self.frames_sent, self.bytes_sent, self.late_frames, self.dropped)
+
+class Room:
+    """One DoodleSession rendered once per frame and shared by all of its viewers.
+
+    Viewers subscribe with an encoding variant, e.g. ("json", "jpeg", "high");
+    each variant in use is encoded once per frame no matter how many viewers
+    want it (see LadderEncoder). ("delta", codec, rung) variants produce
+    DeltaFrames instead of whole images.
+    """
+
+    def __init__(self, room_id, source_id, producer, session, encode, pool, encode_workers=2, private=False):
+        self.room_id = room_id
+        self.source_id = source_id
+        self.private = private  # one connection's own room, reported only in its source's totals
+        self.producer = producer
+        self.session = session
+        self.ladder = LadderEncoder(encode, pool)
+        self.variants = Counter()
+        self.source_q = producer.subscribe()
+        self.stage = RenderStage(self.source_q, session.render, self._encode, encode_workers)
+
+        # Delivery counters, updated by the viewers' send loops
+        self.send_stats = StageStats("send")
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.late_frames = 0
+
+    def record_send(self, start, size):
+        """Account one message of size bytes whose send began at perf_counter() start"""
+        self.send_stats.record(start)
+        self.frames_sent += 1
+        self.bytes_sent += size
+
+    @property
+    def running(self):
+        return self.stage.running and self.producer.running
+
+    def _encode(self, seq, output):
+        start = time.perf_counter()
+        blended, state = output
+        quality = self.session.quality
+        settings = quality.settings if quality is not None else None
+        # The adaptive quality level caps every rung's quality and scale
+        jpeg_quality, scale = 85, 1.0
+        if settings is not None:
+            jpeg_quality, scale = settings["jpeg_quality"], settings["output_scale"]
+        encoded = self.ladder.encode(seq, blended, list(self.variants), jpeg_quality, scale)
+
+        if quality is not None:
+            # Frame cost: render + encode on this frame, or inference if that is the slower stage
+            encode_ms = (time.perf_counter() - start) * 1000.0
+            frame_ms = max(self.stage.stats["render"].last_ms + encode_ms, self.producer.stats["inference"].last_ms)
+            quality.observe(frame_ms)
+        return state, encoded
+
+    def latest(self):
+        return self.stage.latest()
+
+    def encoded(self, seq, variant):
+        """A variant of frame seq that the frame's own encode pass did not produce, encoded now if still cached"""
+        return self.ladder.get(seq, variant)
+
+    def stage_stats(self):
+        """All StageStats for this room by name: source, render, encode, send and render sub-stages"""
+        stats = {**self.producer.stats, **self.stage.stats, "send": self.send_stats}
+        stats.update((rung.name, rung) for rung in self.ladder.stats.values() if rung.count)
+        if self.session.profile or self.session.hud:
+            stats.update(self.session.stats)
+        return stats
+
+    def stats_dict(self):
+        return {
+            "room": self.room_id,
+            "viewers": sum(self.variants.values()),
+            "stages": {name: s.as_dict() for name, s in self.stage_stats().items()},
+            "particles": len(self.session.particle_system),
+            "hands": len(self.session.hands),
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "late_frames": self.late_frames,
+            "quality": self.session.quality.as_dict() if self.session.quality is not None else None,
+            "encoding": self.ladder.stats_dict(),
+            "recognizer": self.session.recognizer.stats_dict(),
+            "dropped": self.producer.dropped + self.source_q.dropped
+        }
+
+# Tries at getting a running producer when its last viewer leaves (or it fails) mid-join
+OPEN_ATTEMPTS = 3
+
+class SessionManager:
+    """Shares one capture + inference producer per source between all rooms on it"""
+
+    def __init__(self, open_source, make_recognizer, encode, trace_dir=None, profile=False, target_fps=None,
+                 encode_workers=None):
+        self.open_source = open_source          # source id -> FrameSource, not yet started
+        self.make_recognizer = make_recognizer  # () -> GestureRecognizer
+        self.encode = encode                    # (frame, (protocol, codec), jpeg quality) -> encoded data
+        # One encode pool for every room's rungs, sized to the cores by default
+        self.encode_pool = ThreadPoolExecutor(encode_workers or os.cpu_count(), thread_name_prefix="encode-rung")
+        self.trace_dir = trace_dir              # record a landmark trace per room here
+        self.profile = profile                  # time render sub-stages in every session
+        self.target_fps = target_fps            # adaptive quality target, None = fixed quality
+        self.producers = {}
+        self.recognizers = {}
+        self.rooms = {}
+        self.streams = {}                       # LandmarkStream -> source id
+        # Counters of closed private rooms and client-rendered viewers, per source
+        self.retired_private = {}
+        self.retired_streams = {}
+        self._lock = threading.Lock()
+        self._opening = {}                      # source id -> lock held while that source opens
+
+    def _producer(self, source_id):
+        """(producer, recognizer) running for a source, started on first use; call without the lock.
+
+        Opening a camera and building a recognizer take seconds, so they run
+        under the source's own lock and never block the manager's. Callers
+        check producer.running again under the manager lock before subscribing.
+        """
+        with self._lock:
+            opening = self._opening.setdefault(source_id, threading.Lock())
+        with opening:
+            with self._lock:
+                producer = self.producers.get(source_id)
+                if producer is not None and producer.running:
+                    return producer, self.recognizers[source_id]
+            recognizer = self.make_recognizer()
+            producer = SourceProducer(self.open_source(source_id), recognizer.get_hands).start()
+            with self._lock:
+                self.producers[source_id] = producer
+                self.recognizers[source_id] = recognizer
+            return producer, recognizer
+
+    def _trace_path(self, name):
+        if not self.trace_dir:
+            return None
+        return os.path.join(self.trace_dir, f"{name}-{int(time.time())}.trace")
+
+    def _release(self, source_id, producer, queue):
+        """Drop one subscription, stopping the producer when it was the last; call with the lock held"""
+        if producer.unsubscribe(queue) == 0:
+            producer.stop()
+            if self.producers.get(source_id) is producer:
+                del self.producers[source_id]
+                del self.recognizers[source_id]
+
+    def join(self, room_id, source_id, variant, private=False):
+        """Add a viewer to a room, starting its source and renderer on first use"""
+        for _ in range(OPEN_ATTEMPTS):
+            with self._lock:
+                room = self.rooms.get(room_id)
+                if room is not None:
+                    room.variants[variant] += 1
+                    return room
+            producer, recognizer = self._producer(source_id)
+            with self._lock:
+                room = self.rooms.get(room_id)
+                if room is None:
+                    if not producer.running:
+                        continue  # its last viewer left while this one was opening it
+                    trace_path = self._trace_path(room_id)
+                    quality = QualityController(self.target_fps) if self.target_fps else None
+                    session = DoodleSession(recognizer, trace_path=trace_path, profile=self.profile, quality=quality)
+                    room = Room(room_id, source_id, producer, session, self.encode, self.encode_pool,
+                                private=private)
+                    room.stage.start()
+                    self.rooms[room_id] = room
+                room.variants[variant] += 1
+                return room
+        raise ValueError(f"Source {source_id} stopped while opening")
+
+    def leave(self, room, variant):
+        """Remove a viewer; idle rooms and sources are shut down"""
+        with self._lock:
+            room.variants[variant] -= 1
+            if room.variants[variant] <= 0:
+                del room.variants[variant]
+            if room.variants:
+                return
+            room.stage.stop()
+            room.session.close()
+            self.rooms.pop(room.room_id, None)
+            if room.private:
+                self.retired_private.setdefault(room.source_id, DeliveryTotals()).add_room(room)
+            self._release(room.source_id, room.producer, room.source_q)
+
+    def stroke_log(self, room_id):
+        """A running room's StrokeLog, None when the room is not running or has not rendered yet"""
+        with self._lock:
+            room = self.rooms.get(room_id)
+            return room.session.stroke_log if room is not None else None
+
+    def watch(self, viewer_id, source_id, queue_size=8, loop=None):
+        """Subscribe a client-rendered viewer straight to a source, returns (producer, LandmarkStream, queue).
+
+        The queue is deeper than a room's: the browser draws the stroke from
+        every frame's fingertip, so landmarks are only dropped under real backlog.
+        Given an event loop, the queue is an AsyncDropQueue awaited on that loop.
+        """
+        for _ in range(OPEN_ATTEMPTS):
+            producer, recognizer = self._producer(source_id)
+            with self._lock:
+                if not producer.running:
+                    continue  # its last viewer left while this one was opening it
+                stream = LandmarkStream(recognizer, trace_path=self._trace_path(viewer_id))
+                self.streams[stream] = source_id
+                return producer, stream, producer.subscribe(queue_size, loop)
+        raise ValueError(f"Source {source_id} stopped while opening")
+
+    def unwatch(self, source_id, producer, stream, queue):
+        """Remove a client-rendered viewer; idle sources are shut down"""
+        with self._lock:
+            stream.close()
+            self.streams.pop(stream, None)
+            self.retired_streams.setdefault(source_id, DeliveryTotals()).add_stream(stream)
+            self._release(source_id, producer, queue)
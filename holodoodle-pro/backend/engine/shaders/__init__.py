@@ -1,4 +1,3 @@
-from .effects import apply_shader_effects, chromatic_aberration, glitch_distortion, ripple_pulse, vhs_noise
-
-__all__ = ['apply_shader_effects', 'chromatic_aberration', 'glitch_distortion', 'ripple_pulse', 'vhs_noise']
+from .effects import apply_shader_effects, chromatic_aberration, glitch_distortion, ripple_pulse, vhs_noise, ShaderChain
 
+__all__ = ['apply_shader_effects', 'chromatic_aberration', 'glitch_distortion', 'ripple_pulse', 'vhs_noise', 'ShaderChain']
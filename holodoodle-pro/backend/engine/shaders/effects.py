@@ -1,74 +1,144 @@
+import threading
 import cv2
 import numpy as np
 import random
 
+def _roll_columns(dst, src, offset):
+    """dst = np.roll(src, offset, axis=1) for non-overlapping 2D views"""
+    offset %= src.shape[1]
+    if offset == 0:
+        dst[:] = src
+        return
+    dst[:, offset:] = src[:, :-offset]
+    dst[:, :offset] = src[:, -offset:]
+
 def chromatic_aberration(frame, intensity=3):
     """RGB split effect"""
-    h, w = frame.shape[:2]
-    b, g, r = cv2.split(frame)
-    
-    # Shift channels
-    b_shifted = np.roll(b, intensity, axis=1)
-    r_shifted = np.roll(r, -intensity, axis=1)
-    
-    return cv2.merge([b_shifted, g, r_shifted])
+    result = frame.copy()
+    _roll_columns(result[:, :, 0], frame[:, :, 0], intensity)
+    _roll_columns(result[:, :, 2], frame[:, :, 2], -intensity)
+    return result
+
+def _glitch_slices(frame, intensity, rng):
+    """Shift 5 random horizontal slices of frame in place"""
+    h = frame.shape[0]
+    for _ in range(5):
+        y = rng.randint(0, h - 10)
+        height = rng.randint(5, 20)
+        offset = rng.randint(-intensity, intensity)
+        # Only non-negative offsets apply, as in the original effect
+        if 0 <= y + height < h and 0 <= offset:
+            band = frame[y:y + height]
+            band[:] = np.roll(band, offset, axis=1)
 
 def glitch_distortion(frame, intensity=5):
     """Digital glitch effect"""
-    h, w = frame.shape[:2]
     glitched = frame.copy()
-    
-    # Random horizontal slices
-    for _ in range(5):
-        y = random.randint(0, h - 10)
-        height = random.randint(5, 20)
-        offset = random.randint(-intensity, intensity)
-        if 0 <= y + height < h and 0 <= offset < w:
-            glitched[y:y+height, :] = np.roll(glitched[y:y+height, :], offset, axis=1)
-    
+    _glitch_slices(glitched, intensity, random)
     return glitched
 
+_ripple_fields = {}
+
+def _ripple_field(h, w, center):
+    """Cached sin(distance / 10) field around center"""
+    key = (h, w, center)
+    field = _ripple_fields.get(key)
+    if field is None:
+        y, x = np.ogrid[:h, :w]
+        dist = np.sqrt((x - center[0]) ** 2 + (y - center[1]) ** 2, dtype=np.float32)
+        field = np.sin(dist / 10.0)
+        if len(_ripple_fields) > 16:
+            _ripple_fields.clear()
+        _ripple_fields[key] = field
+    return field
+
 def ripple_pulse(frame, center, radius, intensity=20):
     """Ripple pulse effect from center point"""
     h, w = frame.shape[:2]
-    result = frame.copy()
-    
-    # Create ripple mask
-    y, x = np.ogrid[:h, :w]
-    dist = np.sqrt((x - center[0])**2 + (y - center[1])**2)
-    mask = np.sin(dist / 10.0) * intensity
-    mask = np.clip(mask, -intensity, intensity)
-    
-    # Apply ripple
-    for c in range(3):
-        result[:, :, c] = np.clip(result[:, :, c].astype(np.float32) + mask, 0, 255).astype(np.uint8)
-    
-    return result
+    mask = _ripple_field(h, w, tuple(center)) * intensity
+    return np.clip(frame + mask[:, :, None], 0, 255).astype(np.uint8)
 
 def vhs_noise(frame, intensity=10):
     """VHS tape noise effect"""
     h, w = frame.shape[:2]
     noise = np.random.randint(-intensity, intensity, (h, w, 3), dtype=np.int16)
     noisy = np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
-    
+
     # Scan lines
-    for y in range(0, h, 4):
-        noisy[y:y+1, :] = noisy[y:y+1, :] // 2
-    
+    noisy[::4] //= 2
+
     return noisy
 
-def apply_shader_effects(frame, effects_config):
-    """Apply all shader effects based on config"""
-    result = frame.copy()
-    
-    if effects_config.get('chromatic_aberration', False):
-        result = chromatic_aberration(result, effects_config.get('chromatic_intensity', 3))
-    
-    if effects_config.get('glitch', False):
-        result = glitch_distortion(result, effects_config.get('glitch_intensity', 5))
-    
-    if effects_config.get('vhs_noise', False):
-        result = vhs_noise(result, effects_config.get('vhs_intensity', 10))
-    
-    return result
+class ShaderChain:
+    """Runs the enabled effects in place with buffers reused across frames.
+
+    Noise is drawn from a pre-generated texture sampled at a random offset each
+    frame instead of a new random tensor, and scanlines are one strided pass.
+    The frame passed in is modified and returned, nothing full-size is allocated.
+    """
+
+    NOISE_PAD = 64
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self._noise = {}
+        self._scratch = None
+
+    def _noise_textures(self, h, w, intensity):
+        """(positive, negative) uint8 noise textures, so add + subtract == clip(frame + noise)"""
+        key = (h, w, intensity)
+        textures = self._noise.get(key)
+        if textures is None:
+            pad = self.NOISE_PAD
+            noise = self.np_rng.integers(-intensity, intensity, (h + pad, w + pad, 3), dtype=np.int16)
+            textures = (np.clip(noise, 0, None).astype(np.uint8),
+                        np.clip(-noise, 0, None).astype(np.uint8))
+            self._noise = {key: textures}
+        return textures
+
+    def chromatic_aberration(self, frame, intensity=3):
+        h, w = frame.shape[:2]
+        if self._scratch is None or self._scratch.shape != (h, w):
+            self._scratch = np.empty((h, w), dtype=np.uint8)
+        for channel, offset in ((0, intensity), (2, -intensity)):
+            np.copyto(self._scratch, frame[:, :, channel])
+            _roll_columns(frame[:, :, channel], self._scratch, offset)
+
+    def vhs_noise(self, frame, intensity=10):
+        h, w = frame.shape[:2]
+        pos, neg = self._noise_textures(h, w, intensity)
+        dy = self.rng.randrange(self.NOISE_PAD)
+        dx = self.rng.randrange(self.NOISE_PAD)
+        cv2.add(frame, pos[dy:dy + h, dx:dx + w], dst=frame)
+        cv2.subtract(frame, neg[dy:dy + h, dx:dx + w], dst=frame)
+
+        # Scan lines
+        scan = frame[::4]
+        np.right_shift(scan, 1, out=scan)
+
+    def __call__(self, frame, effects_config):
+        if effects_config.get('chromatic_aberration', False):
+            self.chromatic_aberration(frame, effects_config.get('chromatic_intensity', 3))
+
+        if effects_config.get('glitch', False):
+            _glitch_slices(frame, effects_config.get('glitch_intensity', 5), self.rng)
+
+        if effects_config.get('vhs_noise', False):
+            self.vhs_noise(frame, effects_config.get('vhs_intensity', 10))
+
+        return frame
+
+_local = threading.local()
+
+def apply_shader_effects(frame, effects_config, in_place=False, chain=None):
+    """Apply all shader effects based on config.
 
+    With in_place=True the frame itself is modified and returned; chain lets a
+    caller keep its own ShaderChain (and RNG) instead of the per-thread default.
+    """
+    if chain is None:
+        chain = getattr(_local, "chain", None)
+        if chain is None:
+            chain = _local.chain = ShaderChain()
+    return chain(frame if in_place else frame.copy(), effects_config)
@@ -0,0 +1,271 @@
+import glob
+import os
+import threading
+import time
+import cv2
+import numpy as np
+
+from .pipeline import StageStats
+
+class FrameRing:
+    """Preallocated ring of frames with sequence numbers and capture timestamps.
+
+    One writer fills slots in place; readers get zero-copy views of the newest
+    frame. A view stays valid until the writer wraps around to its slot, `size`
+    frames later, so readers that keep frames longer, or draw on them, copy.
+    """
+
+    def __init__(self, size=8):
+        self.size = size
+        self.frames = None  # (size, H, W, C), allocated on the first frame
+        self.seqs = np.full(size, -1, dtype=np.int64)
+        self.timestamps = np.zeros(size)
+        self.written = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def slot(self):
+        """Buffer the writer fills next, None until the frame shape is known"""
+        if self.frames is None:
+            return None
+        return self.frames[self.written % self.size]
+
+    def commit(self, frame, timestamp):
+        """Publish the next frame, copying it into its slot unless it was written there; returns its seq"""
+        slot = self.slot()
+        if slot is None or slot.shape != frame.shape or slot.dtype != frame.dtype:
+            # Readers still holding old views keep the old array alive
+            self.frames = np.empty((self.size,) + frame.shape, dtype=frame.dtype)
+            slot = self.slot()
+        if frame is not slot:
+            np.copyto(slot, frame)
+        with self._cond:
+            seq = self.written
+            index = seq % self.size
+            self.seqs[index] = seq
+            self.timestamps[index] = timestamp
+            self.written += 1
+            self._cond.notify_all()
+        return seq
+
+    def latest(self):
+        """Newest (seq, timestamp, frame view), or None before the first frame"""
+        with self._cond:
+            if not self.written:
+                return None
+            index = (self.written - 1) % self.size
+            return int(self.seqs[index]), float(self.timestamps[index]), self.frames[index]
+
+    def wait(self, after=-1, timeout=None):
+        """Block until a frame newer than seq `after` is published, returns latest() or None on timeout/close"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.written - 1 > after or self.closed, timeout):
+                return None
+            if self.written - 1 <= after:
+                return None
+        return self.latest()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class FrameSource:
+    """Reads frames on its own thread into a FrameRing.
+
+    Subclasses implement read(out), returning the next frame or None at the
+    end of the stream, and fill `out` in place when it is not None. Sources
+    with an `fps` are paced to it, live devices deliver at their own rate.
+    """
+
+    fps = None
+
+    def __init__(self, ring_size=8, mirror=False):
+        self.ring = FrameRing(ring_size)
+        self.mirror = mirror  # flip horizontally, like a selfie view
+        self.stats = StageStats("capture")
+        self._stop = threading.Event()
+        self._thread = None
+        self._raw = None
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    @property
+    def seq(self):
+        """Sequence number of the newest frame, -1 before the first"""
+        return self.ring.written - 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"capture-{type(self).__name__}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        self.ring.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self.release()
+
+    def release(self):
+        """Free the underlying device or file"""
+
+    def latest(self):
+        return self.ring.latest()
+
+    def wait(self, after=-1, timeout=None):
+        return self.ring.wait(after, timeout)
+
+    def read(self, out):
+        raise NotImplementedError
+
+    def _read_mirrored(self, slot):
+        if not self.mirror:
+            return self.read(slot)
+        # Read into a reused scratch frame, flipped into the slot
+        raw = self.read(self._raw)
+        if raw is None:
+            return None
+        self._raw = raw
+        return cv2.flip(raw, 1, dst=slot) if slot is not None and slot.shape == raw.shape else cv2.flip(raw, 1)
+
+    def _run(self):
+        interval = 1.0 / self.fps if self.fps else None
+        deadline = time.monotonic()
+        try:
+            while self.running:
+                if interval is not None:
+                    delay = deadline - time.monotonic()
+                    if delay > 0:
+                        self._stop.wait(delay)
+                    deadline = max(deadline + interval, time.monotonic() - interval)
+                start = time.perf_counter()
+                frame = self._read_mirrored(self.ring.slot())
+                if frame is None:
+                    break
+                self.ring.commit(frame, time.monotonic())
+                self.stats.record(start)
+        finally:
+            self._stop.set()
+            self.ring.close()
+
+class CameraSource(FrameSource):
+    """Live capture device, mirrored by default"""
+
+    def __init__(self, index=0, width=640, height=480, mirror=True, ring_size=8):
+        super().__init__(ring_size, mirror)
+        self.cap = cv2.VideoCapture(index)
+        if not self.cap.isOpened():
+            raise ValueError(f"Cannot open camera {index}")
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def read(self, out):
+        ret, frame = self.cap.read(out)
+        return frame if ret else None
+
+    def release(self):
+        self.cap.release()
+
+class VideoSource(FrameSource):
+    """Video file, paced to its own frame rate unless realtime is False"""
+
+    def __init__(self, path, realtime=True, loop=False, mirror=False, ring_size=8):
+        super().__init__(ring_size, mirror)
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Cannot open video {path}")
+        self.fps = (self.cap.get(cv2.CAP_PROP_FPS) or 30.0) if realtime else None
+
+    def read(self, out):
+        ret, frame = self.cap.read(out)
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(out)
+        return frame if ret else None
+
+    def release(self):
+        self.cap.release()
+
+class ImageSequenceSource(FrameSource):
+    """Numbered image files from a directory or glob pattern, in name order"""
+
+    EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+
+    def __init__(self, pattern, fps=30.0, loop=False, mirror=False, ring_size=8):
+        super().__init__(ring_size, mirror)
+        if os.path.isdir(pattern):
+            paths = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                     if name.lower().endswith(self.EXTENSIONS)]
+        else:
+            paths = glob.glob(pattern)
+        self.paths = sorted(paths)
+        if not self.paths:
+            raise ValueError(f"No images match {pattern}")
+        self.fps = fps
+        self.loop = loop
+        self.index = 0
+
+    def read(self, out):
+        if self.index >= len(self.paths):
+            if not self.loop:
+                return None
+            self.index = 0
+        frame = cv2.imread(self.paths[self.index])
+        self.index += 1
+        return frame
+
+class SyntheticSource(FrameSource):
+    """Generated frames for tests and benchmarks: a scrolling gradient with a moving disc"""
+
+    def __init__(self, width=640, height=480, fps=30.0, frames=None, mirror=False, ring_size=8):
+        super().__init__(ring_size, mirror)
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames = frames  # stop after this many, None runs until stopped
+        self.count = 0
+        # Twice as wide as a frame so each frame is one contiguous window copy
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 128, height, dtype=np.float32)[:, None]
+        gradient = np.dstack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                              np.broadcast_to(255 - x, (height, width))]).astype(np.uint8)
+        self.background = np.concatenate([gradient, gradient[:, ::-1]], axis=1)
+
+    def read(self, out):
+        if self.frames is not None and self.count >= self.frames:
+            return None
+        if out is None:
+            out = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        offset = (self.count * 4) % self.width
+        np.copyto(out, self.background[:, offset:offset + self.width])
+        angle = self.count * 0.1
+        center = (int(self.width / 2 + self.width / 4 * np.cos(angle)),
+                  int(self.height / 2 + self.height / 4 * np.sin(angle)))
+        cv2.circle(out, center, 24, (255, 255, 255), -1)
+        self.count += 1
+        return out
+
+def open_source(spec, **kwargs):
+    """FrameSource for a source id: a camera index, "synthetic[:WxH]", an image directory/glob, or a video path.
+
+    Specs can name any readable file, so only pass trusted ones (command-line
+    tools, benchmarks); app.py opens allowlisted camera indices directly.
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        return CameraSource(int(spec), **kwargs)
+    if spec.startswith("synthetic"):
+        _, _, size = spec.partition(":")
+        if size:
+            width, height = (int(v) for v in size.split("x"))
+            kwargs.setdefault("width", width)
+            kwargs.setdefault("height", height)
+        return SyntheticSource(**kwargs)
+    if os.path.isdir(spec) or glob.has_magic(spec):
+        return ImageSequenceSource(spec, **kwargs)
+    return VideoSource(spec, **kwargs)
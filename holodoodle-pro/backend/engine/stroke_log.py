@@ -0,0 +1,296 @@
+import json
+import threading
+import numpy as np
+
+from .brushes import get_brush
+
+# File layout, as for traces: MAGIC, uint32 header length, JSON header padded
+# to HEADER_ALIGN, then the header's "segments" records and "points" points
+MAGIC = b"HDSTROK1"
+HEADER_ALIGN = 64
+STROKE_LOG_VERSION = 1
+SEGMENT_DTYPE = np.dtype([
+    ("time", "<f8"),       # session timestamp, seconds
+    ("t", "<f4"),          # brush animation time in [0, 1)
+    ("brush", "u1"),       # index into the log's brush names
+    ("hand", "<u2"),       # stable hand ID
+    ("width", "<f4"),      # main stroke width in source pixels
+    ("start", "<i8"),      # first point in the point store
+    ("count", "<u4"),
+    ("box", "<f4", (4,)),  # normalized x1, y1, x2, y2 of the points
+])
+POINT_CHUNK = 1 << 14    # points per storage chunk, (x, y) normalized to [0, 1]
+SEGMENT_CHUNK = 1 << 10  # segments per storage chunk, one bounding box and time range each
+MAX_SEGMENT_CHUNKS = 256  # oldest chunks are dropped past this: about 35 minutes of four hands at 30 fps
+
+class StrokeLog:
+    """Append-only vector record of every stroke segment a session drew.
+
+    Points are stored normalized, so the drawing re-rasterizes at any size.
+    Storage is fixed-size NumPy chunks, so appends never copy what is already
+    logged. Each segment chunk keeps a bounding box and time range. Queries
+    skip whole chunks on those before testing single segments. Strokes are
+    drawn close together in time, so the boxes stay tight. Clears are kept as
+    timestamps rather than dropping data; only the oldest chunks are dropped
+    once there are more than max_chunks. Segment indices keep counting from
+    the first segment ever logged.
+    """
+
+    def __init__(self, width, height, brushes, point_chunk=POINT_CHUNK, segment_chunk=SEGMENT_CHUNK,
+                 max_chunks=MAX_SEGMENT_CHUNKS, origin=0.0):
+        self.width = width
+        self.height = height
+        self.brushes = list(brushes)
+        self.point_chunk = point_chunk
+        self.segment_chunk = segment_chunk
+        self.max_chunks = max_chunks
+        self.origin = origin  # timestamp the session started at, exports give times relative to it
+        self.points = 0
+        self.segments = 0
+        self.clears = []
+        self._point_chunks = []
+        self._segment_chunks = []
+        self._chunk_bounds = []  # per segment chunk: [x1, y1, x2, y2, first time, last time]
+        self._dropped_chunks = 0        # segment chunks dropped past max_chunks
+        self._dropped_point_chunks = 0  # point chunks only those used
+        self._scale = np.array([1.0 / width, 1.0 / height], dtype=np.float32)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.segments
+
+    @property
+    def last_clear(self):
+        return self.clears[-1] if self.clears else None
+
+    def append(self, stroke, timestamp, brush_index, hand_id=0, t=0.0):
+        """Log one (N, 2) pixel polyline drawn with brush_index at timestamp and animation time t"""
+        points = np.asarray(stroke, dtype=np.float32).reshape(-1, 2) * self._scale
+        if not len(points):
+            return
+        lo, hi = points.min(axis=0), points.max(axis=0)
+        with self.lock:
+            chunk, offset = divmod(self.segments, self.segment_chunk)
+            chunk -= self._dropped_chunks
+            if chunk == len(self._segment_chunks):
+                if chunk >= self.max_chunks:
+                    self._drop_oldest()
+                    chunk -= 1
+                self._segment_chunks.append(np.zeros(self.segment_chunk, dtype=SEGMENT_DTYPE))
+                self._chunk_bounds.append(np.array([lo[0], lo[1], hi[0], hi[1], timestamp, timestamp]))
+            start = self.points
+            self._write_points(points)
+            record = self._segment_chunks[chunk][offset]
+            record["time"] = timestamp
+            record["t"] = t
+            record["brush"] = brush_index
+            record["hand"] = hand_id & 0xFFFF
+            record["width"] = get_brush(self.brushes[brush_index]).width
+            record["start"] = start
+            record["count"] = len(points)
+            record["box"] = (lo[0], lo[1], hi[0], hi[1])
+            bounds = self._chunk_bounds[chunk]
+            bounds[:2] = np.minimum(bounds[:2], lo)
+            bounds[2:4] = np.maximum(bounds[2:4], hi)
+            bounds[5] = timestamp
+            self.segments += 1
+
+    def _drop_oldest(self):
+        """Forget the oldest segment chunk and the point chunks only it used; call with the lock held"""
+        self._segment_chunks.pop(0)
+        self._chunk_bounds.pop(0)
+        self._dropped_chunks += 1
+        first_point = int(self._segment_chunks[0][0]["start"]) if self._segment_chunks else self.points
+        while (self._dropped_point_chunks + 1) * self.point_chunk <= first_point:
+            self._point_chunks.pop(0)
+            self._dropped_point_chunks += 1
+
+    def _write_points(self, points):
+        done = 0
+        while done < len(points):
+            chunk, offset = divmod(self.points, self.point_chunk)
+            chunk -= self._dropped_point_chunks
+            if chunk == len(self._point_chunks):
+                self._point_chunks.append(np.empty((self.point_chunk, 2), dtype=np.float32))
+            n = min(len(points) - done, self.point_chunk - offset)
+            self._point_chunks[chunk][offset:offset + n] = points[done:done + n]
+            self.points += n
+            done += n
+
+    def clear(self, timestamp):
+        """Mark the canvas as cleared at timestamp; earlier segments stay in the log"""
+        with self.lock:
+            self.clears.append(timestamp)
+
+    def query(self, viewport=None, since=None, until=None, history=False):
+        """Indices of segments overlapping viewport (normalized x1, y1, x2, y2) and drawn in [since, until].
+
+        Segments from before the last clear are left out unless history is set.
+        """
+        last_clear = self.last_clear
+        if not history and last_clear is not None:
+            since = last_clear if since is None else max(since, last_clear)
+        hits = []
+        with self.lock:
+            count = self.segments
+            for chunk, (records, bounds) in enumerate(zip(self._segment_chunks, self._chunk_bounds),
+                                                      self._dropped_chunks):
+                if since is not None and bounds[5] < since:
+                    continue
+                if until is not None and bounds[4] > until:
+                    break  # appended in time order, later chunks are later still
+                if viewport is not None and not _overlaps(bounds, viewport):
+                    continue
+                records = records[:min(count - chunk * self.segment_chunk, self.segment_chunk)]
+                keep = np.ones(len(records), dtype=bool)
+                if since is not None:
+                    keep &= records["time"] >= since
+                if until is not None:
+                    keep &= records["time"] <= until
+                if viewport is not None:
+                    box = records["box"]
+                    keep &= ((box[:, 0] <= viewport[2]) & (box[:, 2] >= viewport[0]) &
+                             (box[:, 1] <= viewport[3]) & (box[:, 3] >= viewport[1]))
+                hits.append(np.flatnonzero(keep) + chunk * self.segment_chunk)
+        return np.concatenate(hits) if hits else np.zeros(0, dtype=np.int64)
+
+    def current(self, since=None):
+        """Indices of segments drawn since the last clear (and since `since`): what is on the canvas"""
+        return self.query(since=since)
+
+    def records(self, indices=None):
+        """SEGMENT_DTYPE records for segment indices (every stored segment by default), in log order"""
+        with self.lock:
+            first = self._dropped_chunks * self.segment_chunk
+            if indices is None:
+                indices = np.arange(first, self.segments)
+            indices = np.asarray(indices, dtype=np.int64)
+            indices = indices[indices >= first]  # dropped since they were queried
+            if not len(indices):
+                return np.zeros(0, dtype=SEGMENT_DTYPE)
+            chunks, offsets = np.divmod(indices - first, self.segment_chunk)
+            out = np.empty(len(indices), dtype=SEGMENT_DTYPE)
+            for chunk in np.unique(chunks):
+                mask = chunks == chunk
+                out[mask] = self._segment_chunks[chunk][offsets[mask]]
+            return out
+
+    def stroke_points(self, record):
+        """(N, 2) normalized points of one segment record, empty once they were dropped"""
+        start, count = int(record["start"]), int(record["count"])
+        with self.lock:
+            chunk, offset = divmod(start, self.point_chunk)
+            chunk -= self._dropped_point_chunks
+            if chunk < 0:
+                return np.zeros((0, 2), dtype=np.float32)
+            if offset + count <= self.point_chunk:
+                return self._point_chunks[chunk][offset:offset + count]
+            parts = []
+            while count:
+                n = min(count, self.point_chunk - offset)
+                parts.append(self._point_chunks[chunk][offset:offset + n])
+                count -= n
+                chunk, offset = chunk + 1, 0
+            return np.concatenate(parts)
+
+    def rasterize(self, height, width, indices=None, viewport=None, canvas=None, t_steps=64):
+        """Redraw segments with their brushes onto a (height, width) canvas.
+
+        viewport (normalized x1, y1, x2, y2) is stretched over the whole output;
+        by default the segments are the ones overlapping it. Segments are
+        batched per brush and animation time rounded to 1 / t_steps, so a
+        redraw is a few brush calls however many frames it covers.
+        """
+        if canvas is None:
+            canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        x1, y1, x2, y2 = viewport if viewport is not None else (0.0, 0.0, 1.0, 1.0)
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"Empty viewport {viewport}")
+        if indices is None:
+            indices = self.query(viewport)
+        origin = np.array([x1, y1], dtype=np.float32)
+        scale = np.array([width / (x2 - x1), height / (y2 - y1)], dtype=np.float32)
+        batches = {}
+        for record in self.records(indices):
+            points = self.stroke_points(record)
+            if not len(points):
+                continue
+            key = (int(record["brush"]), int(record["t"] * t_steps))
+            batches.setdefault(key, []).append(np.rint((points - origin) * scale).astype(np.int32))
+        for (brush_index, step), strokes in batches.items():
+            get_brush(self.brushes[brush_index]).draw(canvas, strokes, step / t_steps)
+        return canvas
+
+    def to_svg(self, indices=None, width=None, height=None, background="#000"):
+        """SVG document of segments (every one by default) as polylines in each brush's main color and width"""
+        width = width or self.width
+        height = height or self.height
+        size = np.array([width, height], dtype=np.float32)
+        stroke_scale = width / self.width
+        lines = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}">',
+            f'<rect width="100%" height="100%" fill="{background}"/>',
+            '<g fill="none" stroke-linecap="round" stroke-linejoin="round" style="mix-blend-mode:screen">',
+        ]
+        for record in self.records(indices):
+            stroke = self.stroke_points(record)
+            if not len(stroke):
+                continue
+            b, g, r = get_brush(self.brushes[int(record["brush"])]).color(float(record["t"]))
+            points = " ".join(f"{x:.1f},{y:.1f}" for x, y in (stroke * size).tolist())
+            lines.append(f'<polyline points="{points}" stroke="#{r:02x}{g:02x}{b:02x}" '
+                         f'stroke-width="{record["width"] * stroke_scale:.1f}"/>')
+        lines.append("</g>")
+        lines.append("</svg>")
+        return "\n".join(lines)
+
+    def dump(self, f, indices=None):
+        """Write segments (every one by default) and their points to a binary file object"""
+        records = self.records(indices)
+        points = [self.stroke_points(record) for record in records]
+        starts = np.cumsum([0] + [len(p) for p in points[:-1]]) if len(points) else []
+        records["start"] = starts
+        records["count"] = [len(p) for p in points]
+        header = json.dumps({
+            "version": STROKE_LOG_VERSION, "width": self.width, "height": self.height,
+            "brushes": self.brushes, "clears": self.clears, "origin": self.origin,
+            "segments": len(records), "points": int(records["count"].sum()),
+        }).encode()
+        size = len(MAGIC) + 4 + len(header)
+        header += b" " * (-size % HEADER_ALIGN)
+        f.write(MAGIC + np.uint32(len(header)).tobytes() + header)
+        f.write(records.tobytes())
+        for p in points:
+            f.write(np.ascontiguousarray(p, dtype="<f4").tobytes())
+
+    def save(self, path, indices=None):
+        with open(path, "wb") as f:
+            self.dump(f, indices)
+
+    @classmethod
+    def load(cls, path):
+        """StrokeLog read back from a file written by save()"""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a stroke log")
+            header_len = int(np.frombuffer(f.read(4), dtype=np.uint32)[0])
+            header = json.loads(f.read(header_len))
+            records = np.frombuffer(f.read(header["segments"] * SEGMENT_DTYPE.itemsize), dtype=SEGMENT_DTYPE)
+            points = np.frombuffer(f.read(header["points"] * 8), dtype="<f4").reshape(-1, 2)
+        log = cls(header["width"], header["height"], header["brushes"], origin=header.get("origin", 0.0))
+        log.clears = list(header["clears"])
+        log._write_points(points)
+        for chunk in range(0, len(records), log.segment_chunk):
+            part = records[chunk:chunk + log.segment_chunk]
+            records_chunk = np.zeros(log.segment_chunk, dtype=SEGMENT_DTYPE)
+            records_chunk[:len(part)] = part
+            box = part["box"]
+            log._segment_chunks.append(records_chunk)
+            log._chunk_bounds.append(np.array([box[:, 0].min(), box[:, 1].min(), box[:, 2].max(), box[:, 3].max(),
+                                               part["time"][0], part["time"][-1]]))
+        log.segments = len(records)
+        return log
+
+def _overlaps(bounds, viewport):
+    return bounds[0] <= viewport[2] and bounds[2] >= viewport[0] and bounds[1] <= viewport[3] and bounds[3] >= viewport[1]
@@ -0,0 +1,73 @@
+from collections import deque
+import numpy as np
+
+def catmull_rom(p0, p1, p2, p3, ts, alpha=0.5):
+    """Centripetal Catmull-Rom points between p1 and p2 at ts in [0, 1], shape (len(ts), 2)"""
+    def knot(a, b, t):
+        return t + max(np.hypot(*(b - a)) ** alpha, 1e-6)
+
+    t0 = 0.0
+    t1 = knot(p0, p1, t0)
+    t2 = knot(p1, p2, t1)
+    t3 = knot(p2, p3, t2)
+    t = (t1 + (t2 - t1) * ts)[:, None]
+
+    # Barry-Goldman pyramid, evaluated for every t at once
+    a1 = (t1 - t) / (t1 - t0) * p0 + (t - t0) / (t1 - t0) * p1
+    a2 = (t2 - t) / (t2 - t1) * p1 + (t - t1) / (t2 - t1) * p2
+    a3 = (t3 - t) / (t3 - t2) * p2 + (t - t2) / (t3 - t2) * p3
+    b1 = (t2 - t) / (t2 - t0) * a1 + (t - t0) / (t2 - t0) * a2
+    b2 = (t3 - t) / (t3 - t1) * a2 + (t - t1) / (t3 - t1) * a3
+    return (t2 - t) / (t2 - t1) * b1 + (t - t1) / (t2 - t1) * b2
+
+class StrokeBuilder:
+    """Turns fingertip samples into a smooth stroke resampled at fixed spacing.
+
+    Each new sample extends a centripetal Catmull-Rom spline through the last
+    few samples; the far end uses a mirrored phantom point so nothing waits for
+    the next frame. The curve is resampled every `spacing` pixels of arc length
+    (carrying the remainder across frames), so a fast hand at low FPS yields
+    the same evenly spaced points as a slow one at high FPS.
+    """
+
+    def __init__(self, spacing=4.0, alpha=0.5):
+        self.spacing = spacing
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self.points = deque(maxlen=2)
+        self._last = None   # last emitted sample
+        self._carry = 0.0   # arc length walked since the last emitted sample
+
+    def add(self, x, y, spacing=None):
+        """Add a sample; returns an (N, 2) int32 polyline from the last emitted point, or None"""
+        spacing = spacing or self.spacing
+        p2 = np.array((x, y), dtype=np.float64)
+        points = self.points
+        if not points:
+            points.append(p2)
+            self._last = p2
+            return None
+
+        p1 = points[-1]
+        chord = np.hypot(*(p2 - p1))
+        if chord < 1e-6:
+            return None
+        p0 = points[0] if len(points) > 1 else 2 * p1 - p2
+        p3 = 2 * p2 - p1
+        points.append(p2)
+
+        # Dense samples along the curve, then walk it at fixed arc length
+        curve = catmull_rom(p0, p1, p2, p3, np.linspace(0.0, 1.0, int(4 * chord / spacing) + 2), self.alpha)
+        arc = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(curve, axis=0).T))))
+        targets = np.arange(spacing - self._carry, arc[-1], spacing)
+        if not len(targets):
+            self._carry += arc[-1]
+            return None
+        self._carry = arc[-1] - targets[-1]
+
+        samples = np.stack((np.interp(targets, arc, curve[:, 0]), np.interp(targets, arc, curve[:, 1])), axis=1)
+        stroke = np.concatenate((self._last[None], samples))
+        self._last = samples[-1]
+        return np.rint(stroke).astype(np.int32)
@@ -0,0 +1,146 @@
+import json
+import os
+import numpy as np
+
+from .gesture import GESTURE_NAMES, Hands, NO_HANDS, as_hands
+
+# File layout: MAGIC, uint32 header length, JSON header padded to HEADER_ALIGN,
+# then one record per frame until the end of the file; the header's version
+# selects the record type
+MAGIC = b"HDTRACE1"
+HEADER_ALIGN = 64
+TRACE_VERSION = 2
+MAX_TRACE_HANDS = 4  # hands past this many on a frame are not recorded
+TRACE_DTYPE = np.dtype([
+    ("t", "<f8"),                                  # session timestamp, seconds
+    ("hands", "u1"),                               # hands tracked on this frame, the first slots below
+    ("ids", "<u2", (MAX_TRACE_HANDS,)),            # stable hand IDs
+    ("gestures", "i1", (MAX_TRACE_HANDS,)),        # raw (unstabilized) GESTURE_NAMES index, -1 for none
+    ("points", "<f4", (MAX_TRACE_HANDS, 21, 3)),   # normalized landmarks, zeros in unused slots
+])
+# Version 1: a single hand per frame
+TRACE_DTYPE_V1 = np.dtype([
+    ("t", "<f8"),
+    ("present", "u1"),
+    ("gesture", "i1"),
+    ("points", "<f4", (21, 3)),
+])
+
+class TraceWriter:
+    """Appends one record per rendered frame to a trace file.
+
+    Records are buffered and flushed every flush_every frames (and on close),
+    so a crashed recorder loses at most that many frames; readers ignore a
+    trailing partial record.
+    """
+
+    def __init__(self, path, width=None, height=None, flush_every=64, **meta):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer = np.zeros(flush_every, dtype=TRACE_DTYPE)
+        self._pending = 0
+        self.count = 0
+
+        header = json.dumps({"version": TRACE_VERSION, "width": width, "height": height, **meta}).encode()
+        size = len(MAGIC) + 4 + len(header)
+        header += b" " * (-size % HEADER_ALIGN)
+        self._file = open(path, "wb")
+        self._file.write(MAGIC + np.uint32(len(header)).tobytes() + header)
+
+    def write(self, t, hands=None, gestures=()):
+        """Record a frame: timestamp, Hands (or one hand's landmarks, or None) and each hand's gesture name"""
+        hands = as_hands(hands)
+        n = min(len(hands.ids), MAX_TRACE_HANDS)
+        buffer, i = self._buffer, self._pending
+        buffer["t"][i] = t
+        buffer["hands"][i] = n
+        buffer["ids"][i] = 0
+        buffer["ids"][i, :n] = hands.ids[:n]
+        buffer["gestures"][i] = -1
+        for slot, gesture in enumerate(list(gestures)[:n]):
+            if gesture in GESTURE_NAMES:
+                buffer["gestures"][i, slot] = GESTURE_NAMES.index(gesture)
+        buffer["points"][i] = 0
+        buffer["points"][i, :n] = hands.points[:n]
+        self._pending += 1
+        self.count += 1
+        if self._pending == self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._pending and not self._file.closed:
+            self._file.write(self._buffer[:self._pending].tobytes())
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_trace(path):
+    """(header dict, read-only memmap of records) for a trace file; version 1 files have TRACE_DTYPE_V1 records"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a landmark trace")
+        header_len = int(np.frombuffer(f.read(4), dtype=np.uint32)[0])
+        header = json.loads(f.read(header_len))
+    dtype = TRACE_DTYPE_V1 if header.get("version", 1) == 1 else TRACE_DTYPE
+    offset = len(MAGIC) + 4 + header_len
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count == 0:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
+
+class TraceReplay:
+    """Replays a trace through a DoodleSession without MediaPipe or a camera.
+
+    Stands in for the session's recognizer: hands and gestures come from the
+    recorded frames, so renders are deterministic for a given session seed.
+
+        replay = TraceReplay("session.trace")
+        session = DoodleSession(replay, seed=0)
+        for t, hands in replay:
+            blended, state = session.render(background, hands, t)
+    """
+
+    def __init__(self, path):
+        self.header, self.records = read_trace(path)
+        self.version = self.header.get("version", 1)
+        self.index = -1
+
+    @property
+    def size(self):
+        """(width, height) recorded in the header, or 640x480"""
+        return self.header.get("width") or 640, self.header.get("height") or 480
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        """Yields (timestamp, Hands) per recorded frame"""
+        for self.index in range(len(self.records)):
+            record = self.records[self.index]
+            if self.version == 1:
+                hands = NO_HANDS
+                if record["present"]:
+                    hands = Hands(np.zeros(1, dtype=np.int64), np.array(record["points"])[None])
+            else:
+                n = int(record["hands"])
+                hands = Hands(record["ids"][:n].astype(np.int64), np.array(record["points"][:n]))
+            yield float(record["t"]), hands
+
+    def detect_gestures(self, hands):
+        """The gestures recorded for the current frame's hands"""
+        record = self.records[self.index]
+        indices = [int(record["gesture"])] if self.version == 1 else record["gestures"][:len(hands.ids)].tolist()
+        return [GESTURE_NAMES[i] if i >= 0 else None for i in indices[:len(hands.ids)]]
+
+    def stats_dict(self):
+        return {"replayed_frames": self.index + 1, "trace_frames": len(self.records)}
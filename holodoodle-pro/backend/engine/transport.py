@@ -0,0 +1,135 @@
+import base64
+import struct
+import cv2
+import numpy as np
+
+# Binary /ws protocol. Every binary message starts with (message type, version);
+# frames carry the encoded image after their header, state is sent on change only.
+PROTOCOL_VERSION = 1
+MSG_FRAME = 1
+MSG_STATE = 2
+MSG_KEYFRAME = 3   # delta streams: full image that following deltas apply to
+MSG_DELTA = 4      # delta streams: changed tiles relative to a keyframe
+MSG_LANDMARKS = 5  # client-rendered streams: tracked hands' landmarks, drawn by the browser
+MSG_STROKES = 6    # client-rendered streams: a room's recent strokes, sent once to late joiners
+
+FRAME_HEADER = struct.Struct("<BBBxI")   # type, version, codec, pad, sequence number
+STATE_HEADER = struct.Struct("<BBBBB")   # type, version, flags, brush index, quality level
+KEYFRAME_HEADER = struct.Struct("<BBBxII")   # type, version, codec, pad, sequence number, keyframe id
+# type, version, codec, pad, sequence number, keyframe id, tile size, atlas columns, tile count;
+# followed by count (column, row) uint16 pairs and the atlas image
+DELTA_HEADER = struct.Struct("<BBBxIIHHH")
+# type, version, pad, hand count, sequence number, capture timestamp in seconds;
+# followed per hand by HAND_HEADER and 21 x (x, y, z) uint16 landmarks
+LANDMARKS_HEADER = struct.Struct("<BBxBId")
+# hand ID, gesture fired on this frame (GESTURE_NAMES index, -1 for none), brush index, flags (FLAG_DRAWING)
+HAND_HEADER = struct.Struct("<HbBBx")
+# type, version, pad, segment count; followed per segment by STROKE_HEADER and
+# its (x, y) uint16 points, normalized to [0, 1] like landmarks
+STROKES_HEADER = struct.Struct("<BBxxI")
+# age in seconds, brush index, animation time * 255, point count
+STROKE_HEADER = struct.Struct("<fBBH")
+# Landmark quantization: x, y in [0, 1] and z in [-LANDMARK_Z_RANGE, LANDMARK_Z_RANGE] map onto 0..65535
+LANDMARK_Z_RANGE = 0.5
+_LANDMARK_LOW = np.array([0.0, 0.0, -LANDMARK_Z_RANGE], dtype=np.float32)
+_LANDMARK_SPAN = np.array([1.0, 1.0, 2 * LANDMARK_Z_RANGE], dtype=np.float32)
+
+FLAG_DRAWING = 1 << 0
+FLAG_GLOW = 1 << 1
+FLAG_GLITCH = 1 << 2
+
+# codec name -> (wire id, file extension, quality flag)
+CODECS = {
+    "jpeg": (0, ".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (1, ".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+def encode_image(frame, codec="jpeg", quality=85):
+    """Compress a BGR frame, returns the raw encoded bytes"""
+    _, ext, quality_flag = CODECS[codec]
+    _, buffer = cv2.imencode(ext, frame, [quality_flag, quality])
+    return buffer.tobytes()
+
+def frame_to_base64(frame, quality=85):
+    """Convert frame to base64 string"""
+    return base64.b64encode(encode_image(frame, "jpeg", quality)).decode('utf-8')
+
+def pack_frame(seq, data, codec="jpeg"):
+    """Binary frame message: fixed header followed by encoded image bytes"""
+    return FRAME_HEADER.pack(MSG_FRAME, PROTOCOL_VERSION, CODECS[codec][0], seq & 0xFFFFFFFF) + data
+
+def pack_keyframe(seq, delta, codec="jpeg"):
+    """Binary keyframe message for a DeltaFrame's keyframe"""
+    return (KEYFRAME_HEADER.pack(MSG_KEYFRAME, PROTOCOL_VERSION, CODECS[codec][0], seq & 0xFFFFFFFF, delta.key_id) +
+            delta.key_data)
+
+def pack_delta(seq, delta, codec="jpeg"):
+    """Binary delta message: header, tile indices, then the atlas image (absent when no tile changed)"""
+    header = DELTA_HEADER.pack(MSG_DELTA, PROTOCOL_VERSION, CODECS[codec][0], seq & 0xFFFFFFFF,
+                               delta.key_id, delta.tile, delta.cols, len(delta.tiles))
+    return header + delta.tiles.astype("<u2").tobytes() + (delta.atlas or b"")
+
+class DeltaViewer:
+    """Per-viewer side of a delta stream: which keyframe it holds and whether tiles are on screen"""
+
+    def __init__(self):
+        self.key_id = None
+        self.showing_tiles = False
+
+    def messages(self, seq, delta, codec="jpeg"):
+        """Binary messages that bring this viewer's picture up to DeltaFrame delta"""
+        out = []
+        if delta.key_id != self.key_id:
+            out.append(pack_keyframe(seq, delta, codec))
+            self.key_id = delta.key_id
+            self.showing_tiles = False
+        if delta.tiles is not None and (len(delta.tiles) or self.showing_tiles):
+            # An empty delta is only needed to take stale tiles off screen
+            out.append(pack_delta(seq, delta, codec))
+            self.showing_tiles = bool(len(delta.tiles))
+        return out
+
+def quantize_landmarks(points):
+    """(..., 21, 3) normalized landmarks as uint16, about 1/65535 of the frame per step"""
+    scaled = (np.asarray(points, dtype=np.float32) - _LANDMARK_LOW) / _LANDMARK_SPAN
+    return np.rint(np.clip(scaled, 0.0, 1.0) * 65535).astype("<u2")
+
+def pack_landmarks(seq, timestamp, points, hands=()):
+    """Binary landmarks message for (H, 21, 3) points and H (id, gesture index, brush index, drawing) tuples"""
+    parts = [LANDMARKS_HEADER.pack(MSG_LANDMARKS, PROTOCOL_VERSION, len(hands), seq & 0xFFFFFFFF, timestamp)]
+    quantized = quantize_landmarks(points)
+    for (hand_id, gesture, brush, drawing), hand_points in zip(hands, quantized):
+        parts.append(HAND_HEADER.pack(hand_id & 0xFFFF, gesture, brush, FLAG_DRAWING if drawing else 0))
+        parts.append(hand_points.tobytes())
+    return b"".join(parts)
+
+def pack_strokes(log, indices, now):
+    """Binary strokes message for StrokeLog segments, ages relative to timestamp now"""
+    records = log.records(indices)
+    parts = [STROKES_HEADER.pack(MSG_STROKES, PROTOCOL_VERSION, len(records))]
+    for record in records:
+        points = np.clip(np.rint(log.stroke_points(record) * 65535), 0, 65535).astype("<u2")
+        parts.append(STROKE_HEADER.pack(max(now - float(record["time"]), 0.0), int(record["brush"]),
+                                        min(int(record["t"] * 256), 255), len(points)))
+        parts.append(points.tobytes())
+    return b"".join(parts)
+
+def pack_state(state, brushes):
+    """Binary state message for a state dict as produced by the render stage"""
+    flags = ((FLAG_DRAWING if state["drawing"] else 0) |
+             (FLAG_GLOW if state["glow"] else 0) |
+             (FLAG_GLITCH if state["glitch"] else 0))
+    return STATE_HEADER.pack(MSG_STATE, PROTOCOL_VERSION, flags, brushes.index(state["brush"]),
+                             state.get("quality", 0))
+
+class StateTracker:
+    """Remembers the last state sent so unchanged state is not resent"""
+
+    def __init__(self):
+        self.last = None
+
+    def changed(self, state):
+        if state == self.last:
+            return False
+        self.last = dict(state)
+        return True
@@ -1,4 +1,4 @@
 from .canvas import Canvas
+from .layers import LAYERS, Layer, LayerStack
 
-__all__ = ['Canvas']
-
+__all__ = ['Canvas', 'LAYERS', 'Layer', 'LayerStack']
@@ -1,24 +1,141 @@
+import threading
+from contextlib import contextmanager
 import numpy as np
 import cv2
 
+def tile_runs(active, tile_size):
+    """Pixel slices covering the True cells of a (rows, cols) tile grid, merged into horizontal runs per row"""
+    ts = tile_size
+    for row in np.flatnonzero(active.any(axis=1)):
+        cols = np.flatnonzero(active[row])
+        breaks = np.flatnonzero(np.diff(cols) > 1)
+        starts = np.concatenate(([cols[0]], cols[breaks + 1]))
+        ends = np.concatenate((cols[breaks], [cols[-1]]))
+        ys = slice(row * ts, (row + 1) * ts)
+        for c1, c2 in zip(starts, ends):
+            yield ys, slice(c1 * ts, (c2 + 1) * ts)
+
 class Canvas:
-    def __init__(self, height, width):
+    """Drawing buffer that tracks which tiles hold content.
+
+    Every tile has a countdown of fade steps left before its pixels reach zero.
+    Fading and compositing only touch tiles whose countdown is running, so idle
+    and sparse frames cost close to nothing. Anything drawn into the buffer must
+    be reported through mark_dirty (or set_canvas) to be faded and composited.
+
+    The buffer is persistent: draw() hands out the live array under a lock so
+    brushes and particles render in place, and snapshot() copies only for
+    consumers that need an immutable frame.
+    """
+
+    def __init__(self, height, width, tile_size=64, channels=3):
         self.height = height
         self.width = width
-        self.canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        self.tile_size = tile_size
+        self.canvas = np.zeros((height, width, channels), dtype=np.uint8)
+        self.lock = threading.RLock()
+        self.tile_ttl = np.zeros((-(-height // tile_size), -(-width // tile_size)), dtype=np.int16)
+        self._blend_luts = {}
         self.motion_blur_factor = 0.92
-    
+
+    @property
+    def motion_blur_factor(self):
+        return self._motion_blur_factor
+
+    @motion_blur_factor.setter
+    def motion_blur_factor(self, factor):
+        self._motion_blur_factor = factor
+        # Integer fade table, identical to (canvas * factor).astype(np.uint8)
+        self._fade_lut = (np.arange(256) * factor).astype(np.uint8)
+
+        # Number of fades after which even a 255 pixel has reached zero
+        value, steps = 255, 0
+        while value > 0 and steps < 32767:
+            nxt = int(self._fade_lut[value])
+            if nxt == value:
+                steps = 32767  # factor >= 1: content never fades out
+                break
+            value, steps = nxt, steps + 1
+        self.fade_steps = steps
+
+    @property
+    def active(self):
+        return bool(self.tile_ttl.any())
+
+    def mark_dirty(self, x1, y1, x2, y2):
+        """Flag the pixel rectangle [x1, x2) x [y1, y2) as holding fresh content"""
+        ts = self.tile_size
+        x1, y1 = max(int(x1), 0), max(int(y1), 0)
+        x2, y2 = min(int(x2), self.width), min(int(y2), self.height)
+        if x1 >= x2 or y1 >= y2:
+            return
+        self.tile_ttl[y1 // ts:(y2 - 1) // ts + 1, x1 // ts:(x2 - 1) // ts + 1] = self.fade_steps
+
+    def mark_all_dirty(self):
+        self.tile_ttl[:] = self.fade_steps
+
+    def _runs(self):
+        """Pixel slices covering active tiles, merged into horizontal runs per tile row"""
+        return tile_runs(self.tile_ttl > 0, self.tile_size)
+
+    @contextmanager
+    def draw(self, region=None):
+        """Lock the live buffer for in-place drawing.
+
+        region (x1, y1, x2, y2) is marked dirty on exit; without it the caller
+        marks what it drew with mark_dirty inside the block.
+        """
+        with self.lock:
+            yield self.canvas
+            if region is not None:
+                self.mark_dirty(*region)
+
+    def view(self):
+        """Read-only view of the live buffer, valid until the next draw"""
+        view = self.canvas.view()
+        view.flags.writeable = False
+        return view
+
+    def snapshot(self):
+        """Immutable copy of the current buffer"""
+        with self.lock:
+            return self.canvas.copy()
+
     def fade(self):
         """Apply motion blur fade"""
-        self.canvas = (self.canvas * self.motion_blur_factor).astype(np.uint8)
-    
+        with self.lock:
+            for ys, xs in self._runs():
+                region = self.canvas[ys, xs]
+                cv2.LUT(region, self._fade_lut, dst=region)
+            np.subtract(self.tile_ttl, 1, out=self.tile_ttl, where=self.tile_ttl > 0)
+
+    def composite(self, frame, frame_weight=0.5):
+        """Return frame * frame_weight + canvas, blending only active tiles"""
+        lut = self._blend_luts.get(frame_weight)
+        if lut is None:
+            lut = np.clip(np.round(np.arange(256) * frame_weight), 0, 255).astype(np.uint8)
+            self._blend_luts[frame_weight] = lut
+        out = cv2.LUT(frame, lut)
+        with self.lock:
+            for ys, xs in self._runs():
+                cv2.addWeighted(frame[ys, xs], frame_weight, self.canvas[ys, xs], 1.0, 0, dst=out[ys, xs])
+        return out
+
     def clear(self):
         """Clear the canvas"""
-        self.canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-    
+        with self.lock:
+            self.canvas.fill(0)
+            self.tile_ttl[:] = 0
+
     def get_canvas(self):
-        return self.canvas.copy()
-    
-    def set_canvas(self, canvas):
-        self.canvas = canvas
+        return self.snapshot()
 
+    def set_canvas(self, canvas, region=None):
+        """Copy canvas into the buffer; region (x1, y1, x2, y2) limits what is marked dirty"""
+        with self.lock:
+            if canvas is not self.canvas:
+                np.copyto(self.canvas, canvas)
+            if region is None:
+                self.mark_all_dirty()
+            else:
+                self.mark_dirty(*region)
@@ -0,0 +1,166 @@
+"""Headless rendering of recorded videos: python render_offline.py input.mp4 output.mp4
+
+Runs hand tracking, brushes, particles and shaders on every frame as fast as
+possible and writes the composited video. Long files are cut into chunks that
+worker processes render in parallel; each chunk first renders a few seconds of
+warm-up frames (not written) so canvas trails and filters have settled when
+its first written frame comes up. Gesture toggles made before a chunk's
+warm-up window (brush, glow, drawing on/off) do not carry into it.
+With --seed, every chunk gets its own derived seed, so the same input, seed
+and chunk length give identical output with any number of workers.
+
+Frames are encoded once: with one worker every chunk writes straight into
+the output, and parallel chunk files are joined by ffmpeg's concat demuxer
+without re-encoding (decoded and re-encoded, lossily, only when ffmpeg is
+not installed).
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+
+from engine.brushes import seed_brushes
+from engine.gesture import GestureRecognizer
+from engine.session import DoodleSession
+
+def probe(path):
+    """(frame count, fps, width, height) of a video file"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open {path}")
+    info = (int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS) or 30.0,
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap.release()
+    return info
+
+def plan_chunks(total, chunk_frames, warmup):
+    """[(index, warmup start, first written frame, end)] covering frames [0, total)"""
+    chunk_frames = chunk_frames or total
+    return [(i, max(start - warmup, 0), start, min(start + chunk_frames, total))
+            for i, start in enumerate(range(0, total, chunk_frames))]
+
+def render_chunk(job, writer=None):
+    """Render frames [start, end) of the input into its own file (or writer), returns (index, frames, seconds)"""
+    (index, warm_start, start, end), opts = job
+    seed = None if opts["seed"] is None else opts["seed"] + index
+    seed_brushes(seed)
+    recognizer = GestureRecognizer(inference_scale=opts["inference_scale"], roi_tracking=opts["roi_tracking"],
+                                   detect_every=opts["detect_every"], max_hands=opts["max_hands"])
+    session = DoodleSession(recognizer, max_particles=opts["max_particles"], seed=seed)
+
+    cap = cv2.VideoCapture(opts["input"])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warm_start)
+    fps = opts["fps"]
+    own_writer = writer is None
+    if own_writer:
+        writer = cv2.VideoWriter(opts["parts"][index], cv2.VideoWriter_fourcc(*opts["fourcc"]),
+                                 fps, (opts["width"], opts["height"]))
+    began = time.perf_counter()
+    written = 0
+    for frame_index in range(warm_start, end):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if opts["flip"]:
+            frame = cv2.flip(frame, 1)
+        # Video time, not wall time, drives the gesture and tip filters
+        blended, _ = session.render(frame, recognizer.get_hands(frame), frame_index / fps)
+        if frame_index >= start:
+            writer.write(blended)
+            written += 1
+    elapsed = time.perf_counter() - began
+    cap.release()
+    if own_writer:
+        writer.release()
+    recognizer.hands.close()
+    return index, written, elapsed
+
+def concat(parts, output, fourcc, fps, size):
+    """Join the chunk files into the output video, copying the encoded stream when ffmpeg is available"""
+    if len(parts) == 1:
+        shutil.move(parts[0], output)
+        return
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        listing = os.path.join(os.path.dirname(parts[0]), "parts.txt")
+        with open(listing, "w") as f:
+            f.writelines(f"file '{part}'\n" for part in parts)
+        subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", listing,
+                        "-c", "copy", output], check=True)
+        return
+    print("ffmpeg not found: re-encoding chunks to join them")
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    for part in parts:
+        cap = cv2.VideoCapture(part)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(frame)
+        cap.release()
+    writer.release()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a recorded video through HoloDoodle offline")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--chunk-seconds", type=float, default=30.0,
+                        help="frames per chunk, in seconds of video; 0 renders the file as one chunk")
+    parser.add_argument("--warmup-seconds", type=float, default=2.0, help="frames rendered before each chunk")
+    parser.add_argument("--seed", type=int, default=None, help="seed for particles, brushes and shader noise")
+    parser.add_argument("--fourcc", default="mp4v")
+    parser.add_argument("--flip", action="store_true", help="mirror frames like the live camera view")
+    parser.add_argument("--max-particles", type=int, default=300)
+    parser.add_argument("--inference-scale", type=float, default=1.0)
+    parser.add_argument("--roi-tracking", action="store_true")
+    parser.add_argument("--detect-every", type=int, default=1)
+    parser.add_argument("--max-hands", type=int, default=1, help="hands tracked, each drawing with its own brush")
+    args = parser.parse_args(argv)
+
+    total, fps, width, height = probe(args.input)
+    chunks = plan_chunks(total, int(args.chunk_seconds * fps), int(args.warmup_seconds * fps))
+    workdir = tempfile.mkdtemp(prefix="holodoodle-")
+    opts = {
+        "input": args.input, "fps": fps, "width": width, "height": height,
+        "fourcc": args.fourcc, "flip": args.flip, "seed": args.seed,
+        "max_particles": args.max_particles, "inference_scale": args.inference_scale,
+        "roi_tracking": args.roi_tracking, "detect_every": args.detect_every, "max_hands": args.max_hands,
+        "parts": [os.path.join(workdir, f"part{i:04d}.mp4") for i in range(len(chunks))],
+    }
+
+    began = time.perf_counter()
+    try:
+        jobs = [(chunk, opts) for chunk in chunks]
+        if args.workers > 1 and len(chunks) > 1:
+            # spawn: MediaPipe graphs do not survive a fork
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(args.workers, mp_context=context) as pool:
+                results = list(pool.map(render_chunk, jobs))
+            render_time = time.perf_counter() - began
+            concat(opts["parts"], args.output, args.fourcc, fps, (width, height))
+        else:
+            # One process: every chunk writes straight into the output, encoded once
+            writer = cv2.VideoWriter(args.output, cv2.VideoWriter_fourcc(*args.fourcc), fps, (width, height))
+            try:
+                results = [render_chunk(job, writer) for job in jobs]
+            finally:
+                writer.release()
+            render_time = time.perf_counter() - began
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - began
+    frames = sum(r[1] for r in results)
+    busy = sum(r[2] for r in results)
+    print(f"Rendered {frames} frames ({frames / fps:.1f}s of video) in {elapsed:.1f}s")
+    print(f"Throughput: {frames / elapsed:.1f} FPS end to end, {frames / render_time:.1f} FPS rendering, "
+          f"{frames / elapsed / fps:.2f}x realtime, {frames / busy:.1f} FPS per worker")
+
+if __name__ == "__main__":
+    main()
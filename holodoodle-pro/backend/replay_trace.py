@@ -0,0 +1,56 @@
+"""Replay a landmark trace through the renderer: python replay_trace.py session.trace
+
+No camera or MediaPipe is needed. Hands and gestures come from the trace
+and RNGs are seeded, so the same trace and seed always render the same frames.
+Use it to reproduce field issues and as a repeatable brush/particle/shader
+benchmark; throughput is printed at the end.
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+
+from engine.brushes import seed_brushes
+from engine.session import DoodleSession
+from engine.trace import TraceReplay
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a HoloDoodle landmark trace")
+    parser.add_argument("trace")
+    parser.add_argument("--output", help="write the rendered frames to this video")
+    parser.add_argument("--background", help="video to render over instead of a black frame")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=30.0, help="frame rate of the output video")
+    args = parser.parse_args(argv)
+
+    replay = TraceReplay(args.trace)
+    width, height = replay.size
+    seed_brushes(args.seed)
+    session = DoodleSession(replay, seed=args.seed)
+
+    background = cv2.VideoCapture(args.background) if args.background else None
+    black = np.zeros((height, width, 3), dtype=np.uint8)
+    writer = None
+    if args.output:
+        writer = cv2.VideoWriter(args.output, cv2.VideoWriter_fourcc(*"mp4v"), args.fps, (width, height))
+
+    began = time.perf_counter()
+    for t, hands in replay:
+        frame = black
+        if background is not None:
+            ret, frame = background.read()
+            frame = cv2.resize(frame, (width, height)) if ret else black
+        blended, _ = session.render(frame, hands, t)
+        if writer is not None:
+            writer.write(blended)
+    elapsed = time.perf_counter() - began
+
+    if writer is not None:
+        writer.release()
+    if background is not None:
+        background.release()
+    frames = len(replay)
+    print(f"Replayed {frames} frames in {elapsed:.2f}s ({frames / max(elapsed, 1e-9):.1f} FPS)")
+
+if __name__ == "__main__":
+    main()
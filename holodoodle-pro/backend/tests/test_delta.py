@@ -0,0 +1,24 @@
+import numpy as np
+
+from engine.delta import TileDeltaEncoder
+
+def background(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 200, (240, 320, 3)).astype(np.uint8)
+
+def test_small_change_marks_its_tile():
+    encoder = TileDeltaEncoder()
+    frame = background()
+    encoder.encode(frame)
+    frame = frame.copy()
+    frame[100:103, 200:203] = 255      # a 3x3 particle, far below the old tile-mean threshold
+    delta = encoder.encode(frame)
+    assert delta.tiles.tolist() == [[6, 3]]
+
+def test_sensor_noise_is_ignored():
+    encoder = TileDeltaEncoder()
+    frame = background()
+    encoder.encode(frame)
+    noise = np.random.default_rng(1).integers(-5, 6, frame.shape)
+    delta = encoder.encode(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    assert len(delta.tiles) == 0
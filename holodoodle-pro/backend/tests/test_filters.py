@@ -0,0 +1,34 @@
+import pytest
+
+from engine.filters import GestureStabilizer
+
+def run(stabilizer, fps, timeline, duration):
+    """Feed (start, label) changes at fps for duration seconds, returns [(t, fired gesture)]"""
+    fired = []
+    for i in range(int(duration * fps) + 1):
+        t = i / fps
+        label = [label for start, label in timeline if start <= t][-1]
+        gesture = stabilizer.update(label, t)
+        if gesture:
+            fired.append((t, gesture))
+    return fired
+
+@pytest.mark.parametrize("fps", [15, 30, 60])
+def test_gesture_stable_during_cooldown_fires_when_it_ends(fps):
+    stabilizer = GestureStabilizer(cooldown=0.5)
+    fired = run(stabilizer, fps, [(0.0, "peace"), (0.3, "fist")], 1.8)
+    assert [gesture for _, gesture in fired] == ["peace", "fist"]
+    (peace_t, _), (fist_t, _) = fired
+    # The fist is stable well before the cooldown ends, so it fires on the first frame after it
+    assert peace_t + 0.5 <= fist_t <= peace_t + 0.5 + 1.0 / fps
+
+@pytest.mark.parametrize("fps", [15, 30, 60])
+def test_gesture_released_during_cooldown_never_fires(fps):
+    stabilizer = GestureStabilizer(cooldown=0.5)
+    fired = run(stabilizer, fps, [(0.0, "peace"), (0.3, "fist"), (0.45, None)], 1.8)
+    assert [gesture for _, gesture in fired] == ["peace"]
+
+def test_held_gesture_fires_once():
+    stabilizer = GestureStabilizer(cooldown=0.5)
+    fired = run(stabilizer, 30, [(0.0, "fist")], 3.0)
+    assert [gesture for _, gesture in fired] == ["fist"]
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+import time
+
+from engine.pipeline import AsyncDropQueue
+
+def test_async_queue_receives_items_from_a_thread():
+    async def main():
+        queue = AsyncDropQueue(asyncio.get_running_loop(), maxsize=8)
+
+        def produce():
+            for i in range(5):
+                time.sleep(0.01)
+                queue.put(i)
+        threading.Thread(target=produce).start()
+        return [await queue.get_async(1.0) for _ in range(5)]
+    assert asyncio.run(main()) == [0, 1, 2, 3, 4]
+
+def test_async_queue_times_out_and_wakes_on_close():
+    async def main():
+        queue = AsyncDropQueue(asyncio.get_running_loop())
+        start = time.perf_counter()
+        assert await queue.get_async(0.05) is None
+        assert time.perf_counter() - start >= 0.05
+        threading.Timer(0.02, queue.close).start()
+        start = time.perf_counter()
+        assert await queue.get_async(5.0) is None
+        return time.perf_counter() - start
+    assert asyncio.run(main()) < 1.0
+
+def test_many_waiters_hold_no_threads():
+    async def main():
+        queues = [AsyncDropQueue(asyncio.get_running_loop()) for _ in range(200)]
+        waiters = [asyncio.ensure_future(queue.get_async(2.0)) for queue in queues]
+        await asyncio.sleep(0.05)
+        threads = threading.active_count()
+        for i, queue in enumerate(queues):
+            queue.put(i)
+        return threads, await asyncio.gather(*waiters)
+    threads, items = asyncio.run(main())
+    assert threads < 10
+    assert items == list(range(200))
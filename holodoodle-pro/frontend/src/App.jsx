@@ -1,13 +1,26 @@
 import { useState } from 'react'
 import { motion } from 'framer-motion'
 import { VideoCanvas } from './components/VideoCanvas'
+import { ClientCanvas } from './components/ClientCanvas'
 import { BrushPicker } from './components/BrushPicker'
 import { ControlPanel } from './components/ControlPanel'
 import { GestureGuide } from './components/GestureGuide'
 import { useWebSocket } from './hooks/useWebSocket'
+import { useLandmarkStream } from './hooks/useLandmarkStream'
+
+// ?render=client draws strokes and effects in the browser from streamed landmarks
+// instead of receiving rendered frames; &camera=1 adds the browser's camera behind them
+const params = new URLSearchParams(window.location.search)
+const CLIENT_RENDER = params.get('render') === 'client'
+const CLIENT_CAMERA = params.get('camera') === '1'
+// &room=<name> (client rendering) starts from that room's still-visible strokes
+const ROOM = params.get('room')
+// Rendered-video rung: ?rung=high|medium|low, else picked from the screen width
+const RUNG = params.get('rung') || (window.screen.width <= 480 ? 'low' : window.screen.width <= 960 ? 'medium' : 'high')
+const useStream = CLIENT_RENDER ? useLandmarkStream : useWebSocket
 
 function App() {
-  const { frame, brush, drawing, glow, glitch, fps } = useWebSocket('ws://localhost:8000/ws')
+  const { frame, eventsRef, stateRef, brush, drawing, glow, glitch, fps, quality } = useStream('ws://localhost:8000/ws', CLIENT_RENDER ? { room: ROOM } : { rung: RUNG })
   const [particleIntensity, setParticleIntensity] = useState(1.0)
 
   return (
@@ -35,7 +48,9 @@ function App() {
           backdropFilter: 'blur(10px)'
         }}
       >
-        {frame ? (
+        {CLIENT_RENDER ? (
+          <ClientCanvas eventsRef={eventsRef} stateRef={stateRef} camera={CLIENT_CAMERA} />
+        ) : frame ? (
           <VideoCanvas frame={frame} />
         ) : (
           <div style={{
@@ -73,6 +88,7 @@ function App() {
         onGlitchChange={() => {}}
         onParticleIntensityChange={setParticleIntensity}
         fps={fps}
+        quality={quality}
       />
 
       {/* Gesture Guide */}
@@ -0,0 +1,68 @@
+import { useEffect, useRef } from 'react'
+import { ClientRenderer } from '../render/renderer'
+
+// Renders a landmark stream in the browser. camera: true shows the browser's
+// own camera behind the drawing (a black background otherwise); landmarks
+// always come from the server's source, so it only lines up with the same camera.
+export function ClientCanvas({ eventsRef, stateRef, camera = false, width = 640, height = 480 }) {
+  const canvasRef = useRef(null)
+  const videoRef = useRef(null)
+
+  useEffect(() => {
+    if (!camera) return
+    let stream = null
+    let cancelled = false
+    navigator.mediaDevices?.getUserMedia({ video: { width, height } }).then((media) => {
+      if (cancelled) {
+        media.getTracks().forEach((track) => track.stop())
+        return
+      }
+      stream = media
+      const video = document.createElement('video')
+      video.srcObject = media
+      video.muted = true
+      video.play()
+      videoRef.current = video
+    }).catch((error) => console.error('Camera unavailable:', error))
+
+    return () => {
+      cancelled = true
+      stream?.getTracks().forEach((track) => track.stop())
+      videoRef.current = null
+    }
+  }, [camera, width, height])
+
+  useEffect(() => {
+    const canvas = canvasRef.current
+    canvas.width = width
+    canvas.height = height
+    const ctx = canvas.getContext('2d')
+    const renderer = new ClientRenderer(width, height)
+    let frameId
+
+    const loop = () => {
+      // Every landmark event since the last paint extends the strokes, in order
+      const events = eventsRef.current
+      eventsRef.current = []
+      for (const event of events) renderer.handle(event)
+      const video = videoRef.current
+      renderer.draw(ctx, video && video.readyState >= 2 ? video : null, stateRef.current)
+      frameId = requestAnimationFrame(loop)
+    }
+    frameId = requestAnimationFrame(loop)
+    return () => cancelAnimationFrame(frameId)
+  }, [eventsRef, stateRef, width, height])
+
+  return (
+    <canvas
+      ref={canvasRef}
+      style={{
+        width: '100%',
+        height: '100%',
+        objectFit: 'contain',
+        borderRadius: '12px',
+        boxShadow: '0 20px 60px rgba(0,0,0,0.3)'
+      }}
+    />
+  )
+}
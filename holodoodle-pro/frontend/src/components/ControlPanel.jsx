@@ -9,7 +9,8 @@ export function ControlPanel({
   onGlowChange,
   onGlitchChange,
   onParticleIntensityChange,
-  fps 
+  fps,
+  quality = 0
 }) {
   return (
     <motion.div
@@ -69,6 +70,11 @@ export function ControlPanel({
           <div style={{ color: '#fff', fontSize: '14px' }}>
             FPS: <span style={{ color: '#00ff00', fontWeight: 'bold' }}>{fps}</span>
           </div>
+          <div style={{ color: '#fff', fontSize: '14px', marginTop: '4px' }}>
+            Quality: <span style={{ color: quality === 0 ? '#00ff00' : '#ffaa00', fontWeight: 'bold' }}>
+              {quality === 0 ? 'Full' : `Reduced (${quality})`}
+            </span>
+          </div>
         </div>
       </div>
     </motion.div>
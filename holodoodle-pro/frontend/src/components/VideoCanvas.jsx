@@ -1,20 +1,53 @@
 import { useEffect, useRef } from 'react'
 
+// Draw a delta-stream frame: the keyframe, then each changed tile from the atlas
+function drawDelta(ctx, { key, atlas, tiles, tile, cols }) {
+  ctx.drawImage(key, 0, 0)
+  if (!atlas) return
+  for (let i = 0; i < tiles.length / 2; i++) {
+    const dx = tiles[i * 2] * tile
+    const dy = tiles[i * 2 + 1] * tile
+    // Edge tiles are cut off by the frame border
+    const w = Math.min(tile, key.width - dx)
+    const h = Math.min(tile, key.height - dy)
+    ctx.drawImage(atlas, (i % cols) * tile, Math.floor(i / cols) * tile, w, h, dx, dy, w, h)
+  }
+}
+
+// frame is a decoded ImageBitmap (binary protocol), an image URL (JSON protocol)
+// or a { key, atlas, tiles, tile, cols } delta frame (binary protocol with delta=1)
 export function VideoCanvas({ frame }) {
   const canvasRef = useRef(null)
 
   useEffect(() => {
-    if (frame && canvasRef.current) {
-      const img = new Image()
-      img.onload = () => {
-        const canvas = canvasRef.current
-        const ctx = canvas.getContext('2d')
+    if (!frame || !canvasRef.current) return
+
+    const draw = (img, paint = (ctx) => ctx.drawImage(img, 0, 0)) => {
+      const canvas = canvasRef.current
+      if (!canvas) return
+      const ctx = canvas.getContext('2d')
+      if (canvas.width !== img.width || canvas.height !== img.height) {
         canvas.width = img.width
         canvas.height = img.height
-        ctx.drawImage(img, 0, 0)
       }
-      img.src = `data:image/jpeg;base64,${frame}`
+      paint(ctx)
     }
+
+    if (typeof frame === 'string') {
+      const img = new Image()
+      img.onload = () => draw(img)
+      img.src = frame
+      return
+    }
+
+    if (frame.key) {
+      // Keyframes are owned by useWebSocket, only the atlas is ours to release
+      draw(frame.key, (ctx) => drawDelta(ctx, frame))
+      return () => frame.atlas?.close()
+    }
+
+    draw(frame)
+    return () => frame.close()
   }, [frame])
 
   return (
@@ -30,4 +63,3 @@ export function VideoCanvas({ frame }) {
     />
   )
 }
-
@@ -0,0 +1,141 @@
+import { useEffect, useRef, useState } from 'react'
+
+// Landmarks protocol (see backend/engine/transport.py and app.stream_landmarks)
+const MSG_STATE = 2
+const MSG_LANDMARKS = 5
+const MSG_STROKES = 6
+const STROKES_HEADER_SIZE = 8
+const STROKE_HEADER_SIZE = 8
+const LANDMARKS_HEADER_SIZE = 16
+const HAND_HEADER_SIZE = 6
+const HAND_SIZE = HAND_HEADER_SIZE + 63 * 2
+const LANDMARK_Z_RANGE = 0.5
+const FLAG_DRAWING = 1 << 0
+const FLAG_GLOW = 1 << 1
+const FLAG_GLITCH = 1 << 2
+
+const DEFAULT_BRUSHES = ['neon', 'lightning', 'fire', 'galaxy', 'energy']
+const DEFAULT_GESTURES = ['peace', 'thumbs_up', 'pinch', 'fist', 'rock']
+
+// Client-side rendering: the server sends only landmarks, fired gestures and
+// state. Landmark events queue up in eventsRef for ClientCanvas to drain on
+// its next animation frame, so they never go through React state. With a
+// room, the room's recent strokes arrive first so a late joiner's canvas
+// starts with what is still visible there.
+export function useLandmarkStream(url, { room = null } = {}) {
+  const [brush, setBrush] = useState('neon')
+  const [drawing, setDrawing] = useState(true)
+  const [glow, setGlow] = useState(false)
+  const [glitch, setGlitch] = useState(false)
+  const [fps, setFps] = useState(0)
+  const eventsRef = useRef([])
+  const stateRef = useRef({ brush: 'neon', drawing: true, glow: false, glitch: false })
+  const frameCountRef = useRef(0)
+  const lastFpsTimeRef = useRef(Date.now())
+  const brushesRef = useRef(DEFAULT_BRUSHES)
+  const gesturesRef = useRef(DEFAULT_GESTURES)
+
+  useEffect(() => {
+    const ws = new WebSocket(url + '?protocol=landmarks' + (room ? '&room=' + encodeURIComponent(room) : ''))
+    ws.binaryType = 'arraybuffer'
+    eventsRef.current = []
+
+    const countFrame = () => {
+      frameCountRef.current++
+      const now = Date.now()
+      if (now - lastFpsTimeRef.current >= 1000) {
+        setFps(frameCountRef.current)
+        frameCountRef.current = 0
+        lastFpsTimeRef.current = now
+      }
+    }
+
+    const handleBinary = (buffer) => {
+      const view = new DataView(buffer)
+      const type = view.getUint8(0)
+      if (type === MSG_STATE) {
+        const flags = view.getUint8(2)
+        const state = {
+          brush: brushesRef.current[view.getUint8(3)],
+          drawing: Boolean(flags & FLAG_DRAWING),
+          glow: Boolean(flags & FLAG_GLOW),
+          glitch: Boolean(flags & FLAG_GLITCH)
+        }
+        stateRef.current = state
+        setBrush(state.brush)
+        setDrawing(state.drawing)
+        setGlow(state.glow)
+        setGlitch(state.glitch)
+      } else if (type === MSG_STROKES) {
+        // Per segment: float32 age in seconds, uint8 brush, uint8 t * 256, uint16 count, count uint16 (x, y)
+        const backlog = []
+        const count = view.getUint32(4, true)
+        let offset = STROKES_HEADER_SIZE
+        for (let s = 0; s < count; s++) {
+          const n = view.getUint16(offset + 6, true)
+          const points = new Float32Array(n * 2)
+          for (let i = 0; i < n * 2; i++) {
+            points[i] = view.getUint16(offset + STROKE_HEADER_SIZE + i * 2, true) / 65535
+          }
+          backlog.push({
+            age: view.getFloat32(offset, true),
+            brush: brushesRef.current[view.getUint8(offset + 4)],
+            t: view.getUint8(offset + 5) / 256,
+            points
+          })
+          offset += STROKE_HEADER_SIZE + n * 4
+        }
+        eventsRef.current.push({ hands: [], backlog })
+      } else if (type === MSG_LANDMARKS) {
+        // Per hand: uint16 id, int8 gesture, uint8 brush, uint8 flags, pad, then
+        // uint16 x, y in [0, 1] and z in [-LANDMARK_Z_RANGE, LANDMARK_Z_RANGE]
+        const hands = []
+        const count = view.getUint8(3)
+        for (let h = 0; h < count; h++) {
+          const offset = LANDMARKS_HEADER_SIZE + h * HAND_SIZE
+          const gesture = view.getInt8(offset + 2)
+          const points = new Float32Array(63)
+          for (let i = 0; i < 63; i++) {
+            const value = view.getUint16(offset + HAND_HEADER_SIZE + i * 2, true) / 65535
+            points[i] = i % 3 === 2 ? (value * 2 - 1) * LANDMARK_Z_RANGE : value
+          }
+          hands.push({
+            id: view.getUint16(offset, true),
+            gesture: gesture >= 0 ? gesturesRef.current[gesture] : null,
+            brush: brushesRef.current[view.getUint8(offset + 3)],
+            drawing: Boolean(view.getUint8(offset + 4) & FLAG_DRAWING),
+            points
+          })
+        }
+        eventsRef.current.push({
+          seq: view.getUint32(4, true),
+          t: view.getFloat64(8, true),
+          hands
+        })
+        countFrame()
+      }
+    }
+
+    ws.onmessage = (event) => {
+      if (typeof event.data !== 'string') {
+        handleBinary(event.data)
+        return
+      }
+      const data = JSON.parse(event.data)
+      if (data.type === 'hello') {
+        brushesRef.current = data.brushes
+        gesturesRef.current = data.gestures
+      }
+    }
+
+    ws.onerror = (error) => {
+      console.error('WebSocket error:', error)
+    }
+
+    return () => {
+      ws.close()
+    }
+  }, [url, room])
+
+  return { eventsRef, stateRef, brush, drawing, glow, glitch, fps, quality: 0 }
+}
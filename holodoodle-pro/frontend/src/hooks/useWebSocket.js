@@ -1,41 +1,148 @@
 import { useEffect, useRef, useState } from 'react'
 
-export function useWebSocket(url) {
+// Binary protocol (see backend/engine/transport.py)
+const MSG_FRAME = 1
+const MSG_STATE = 2
+const MSG_KEYFRAME = 3
+const MSG_DELTA = 4
+const FRAME_HEADER_SIZE = 8
+const KEYFRAME_HEADER_SIZE = 12
+const DELTA_HEADER_SIZE = 18
+const FLAG_DRAWING = 1 << 0
+const FLAG_GLOW = 1 << 1
+const FLAG_GLITCH = 1 << 2
+const CODEC_TYPES = ['image/jpeg', 'image/webp']
+
+const DEFAULT_BRUSHES = ['neon', 'lightning', 'fire', 'galaxy', 'energy']
+
+// delta: true streams keyframes plus changed tiles; frames are then
+// { key, atlas, tiles, tile, cols } objects that VideoCanvas composes.
+// rung: 'high' | 'medium' | 'low' output size and quality, shared server-side
+// with every viewer on the same rung
+export function useWebSocket(url, { protocol = 'binary', codec = 'jpeg', delta = false, rung = null } = {}) {
   const [frame, setFrame] = useState(null)
   const [brush, setBrush] = useState('neon')
   const [drawing, setDrawing] = useState(true)
   const [glow, setGlow] = useState(false)
   const [glitch, setGlitch] = useState(false)
+  const [quality, setQuality] = useState(0)
   const [fps, setFps] = useState(0)
   const wsRef = useRef(null)
   const frameCountRef = useRef(0)
   const lastFpsTimeRef = useRef(Date.now())
+  const brushesRef = useRef(DEFAULT_BRUSHES)
+  const lastSeqRef = useRef(-1)
+  const keyRef = useRef(null)
 
   useEffect(() => {
-    const ws = new WebSocket(url)
+    const params = new URLSearchParams()
+    if (protocol === 'binary') {
+      params.set('protocol', 'binary')
+      params.set('codec', codec)
+      if (delta) params.set('delta', '1')
+    }
+    if (rung) params.set('rung', rung)
+    const query = params.toString()
+    const ws = new WebSocket(query ? `${url}?${query}` : url)
+    ws.binaryType = 'arraybuffer'
     wsRef.current = ws
+    lastSeqRef.current = -1
+    keyRef.current = null
+
+    const countFrame = () => {
+      // Calculate FPS
+      frameCountRef.current++
+      const now = Date.now()
+      if (now - lastFpsTimeRef.current >= 1000) {
+        setFps(frameCountRef.current)
+        frameCountRef.current = 0
+        lastFpsTimeRef.current = now
+      }
+    }
+
+    const decode = (buffer, offset, codecId) => {
+      const mime = CODEC_TYPES[codecId] || CODEC_TYPES[0]
+      return createImageBitmap(new Blob([new Uint8Array(buffer, offset)], { type: mime }))
+    }
+
+    // Show a decoded frame unless a newer one already made it to the screen
+    const present = (seq, next, release) => {
+      if (seq < lastSeqRef.current) {
+        release()
+        return
+      }
+      lastSeqRef.current = seq
+      setFrame(next)
+      countFrame()
+    }
+
+    const handleBinary = (buffer) => {
+      const view = new DataView(buffer)
+      const type = view.getUint8(0)
+      if (type === MSG_STATE) {
+        const flags = view.getUint8(2)
+        setBrush(brushesRef.current[view.getUint8(3)])
+        setDrawing(Boolean(flags & FLAG_DRAWING))
+        setGlow(Boolean(flags & FLAG_GLOW))
+        setGlitch(Boolean(flags & FLAG_GLITCH))
+        // Adaptive quality level (0 = full), appended after the brush index
+        if (view.byteLength > 4) setQuality(view.getUint8(4))
+      } else if (type === MSG_FRAME) {
+        const seq = view.getUint32(4, true)
+        // Decodes can finish out of order; never show an older frame
+        decode(buffer, FRAME_HEADER_SIZE, view.getUint8(2)).then((bitmap) => present(seq, bitmap, () => bitmap.close()))
+      } else if (type === MSG_KEYFRAME) {
+        const seq = view.getUint32(4, true)
+        const id = view.getUint32(8, true)
+        const previous = keyRef.current
+        const key = { id, bitmap: decode(buffer, KEYFRAME_HEADER_SIZE, view.getUint8(2)) }
+        keyRef.current = key
+        key.bitmap.then((bitmap) => {
+          present(seq, { key: bitmap, atlas: null, tiles: null }, () => {})
+          // The old keyframe is no longer referenced by any later frame
+          if (previous) previous.bitmap.then((old) => old.close())
+        })
+      } else if (type === MSG_DELTA) {
+        const seq = view.getUint32(4, true)
+        const key = keyRef.current
+        if (!key || key.id !== view.getUint32(8, true)) return
+        const tile = view.getUint16(12, true)
+        const cols = view.getUint16(14, true)
+        const count = view.getUint16(16, true)
+        const tiles = new Uint16Array(count * 2)
+        for (let i = 0; i < count * 2; i++) tiles[i] = view.getUint16(DELTA_HEADER_SIZE + i * 2, true)
+        const atlas = count ? decode(buffer, DELTA_HEADER_SIZE + count * 4, view.getUint8(2)) : Promise.resolve(null)
+        Promise.all([key.bitmap, atlas]).then(([keyBitmap, atlasBitmap]) => {
+          // A newer keyframe arrived meanwhile and closes this one's bitmap once decoded
+          if (keyRef.current.id !== key.id) {
+            atlasBitmap?.close()
+            return
+          }
+          present(seq, { key: keyBitmap, atlas: atlasBitmap, tiles, tile, cols }, () => atlasBitmap?.close())
+        })
+      }
+    }
 
     ws.onopen = () => {
       console.log('WebSocket connected')
     }
 
     ws.onmessage = (event) => {
+      if (typeof event.data !== 'string') {
+        handleBinary(event.data)
+        return
+      }
       const data = JSON.parse(event.data)
-      if (data.type === 'frame') {
-        setFrame(data.data)
+      if (data.type === 'hello') {
+        brushesRef.current = data.brushes
+      } else if (data.type === 'frame') {
+        setFrame(`data:image/jpeg;base64,${data.data}`)
         setBrush(data.brush)
         setDrawing(data.drawing)
         setGlow(data.glow)
         setGlitch(data.glitch)
-        
-        // Calculate FPS
-        frameCountRef.current++
-        const now = Date.now()
-        if (now - lastFpsTimeRef.current >= 1000) {
-          setFps(frameCountRef.current)
-          frameCountRef.current = 0
-          lastFpsTimeRef.current = now
-        }
+        setQuality(data.quality ?? 0)
+        countFrame()
       }
     }
 
@@ -50,8 +157,7 @@ export function useWebSocket(url) {
     return () => {
       ws.close()
     }
-  }, [url])
+  }, [url, protocol, codec, delta, rung])
 
-  return { frame, brush, drawing, glow, glitch, fps }
+  return { frame, brush, drawing, glow, glitch, fps, quality }
 }
-
@@ -0,0 +1,109 @@
+// Canvas 2D versions of the backend brushes (backend/engine/brushes), keyed by
+// the same names. Each draws one stroke segment from (x1, y1) to (x2, y2);
+// t in [0, 1) animates the colors like the server's time counter.
+
+const rgb = (r, g, b) => `rgb(${r | 0}, ${g | 0}, ${b | 0})`
+
+function line(ctx, x1, y1, x2, y2, color, width) {
+  ctx.strokeStyle = color
+  ctx.lineWidth = width
+  ctx.beginPath()
+  ctx.moveTo(x1, y1)
+  ctx.lineTo(x2, y2)
+  ctx.stroke()
+}
+
+function neon(ctx, x1, y1, x2, y2, t) {
+  const core = rgb(255 * t, 80 + 175 * t, 255)
+  ctx.shadowColor = core
+  ctx.shadowBlur = 20
+  line(ctx, x1, y1, x2, y2, core, 12)
+  ctx.shadowBlur = 0
+  line(ctx, x1, y1, x2, y2, rgb(255, 255 * t, 255 * (1 - t)), 8)
+  line(ctx, x1, y1, x2, y2, '#fff', 4)
+}
+
+function lightning(ctx, x1, y1, x2, y2, t) {
+  const color = rgb(255, 200 + 55 * t, 100 + 155 * t)
+  ctx.shadowColor = color
+  ctx.shadowBlur = 10
+  // Jagged bolt: the segment split in a few pieces, each knee pushed sideways
+  const steps = 4
+  const nx = -(y2 - y1)
+  const ny = x2 - x1
+  const length = Math.hypot(nx, ny) || 1
+  ctx.strokeStyle = color
+  ctx.lineWidth = 3
+  ctx.beginPath()
+  ctx.moveTo(x1, y1)
+  for (let i = 1; i < steps; i++) {
+    const offset = (Math.random() - 0.5) * 16 / length
+    ctx.lineTo(x1 + (x2 - x1) * i / steps + nx * offset, y1 + (y2 - y1) * i / steps + ny * offset)
+  }
+  ctx.lineTo(x2, y2)
+  ctx.stroke()
+  ctx.shadowBlur = 0
+  if (length > 30) {
+    // Sparks on fast strokes
+    ctx.fillStyle = '#fff'
+    for (let i = 0; i < 3; i++) {
+      ctx.fillRect(x2 + (Math.random() - 0.5) * 20, y2 + (Math.random() - 0.5) * 20, 2, 2)
+    }
+  }
+}
+
+function fire(ctx, x1, y1, x2, y2, t) {
+  const core = rgb(255, 140 + 115 * t, 0)
+  const mid = rgb(255, 50 + 50 * t, 0)
+  ctx.shadowColor = mid
+  ctx.shadowBlur = 16
+  line(ctx, x1, y1, x2, y2, mid, 10)
+  ctx.shadowBlur = 0
+  line(ctx, x1, y1, x2, y2, core, 4)
+  // Flickering embers rising off the stroke
+  ctx.fillStyle = core
+  for (let i = 0; i < 3; i++) {
+    const k = Math.random()
+    ctx.beginPath()
+    ctx.arc(x1 + (x2 - x1) * k + (Math.random() - 0.5) * 8, y1 + (y2 - y1) * k - Math.random() * 8,
+      1 + Math.random() * 2, 0, Math.PI * 2)
+    ctx.fill()
+  }
+}
+
+function galaxy(ctx, x1, y1, x2, y2, t) {
+  ctx.globalAlpha = 0.5
+  line(ctx, x1, y1, x2, y2, rgb(255, 100 + 155 * t, 255 * (0.5 + 0.5 * t)), 14)
+  ctx.globalAlpha = 1
+  line(ctx, x1, y1, x2, y2, rgb(200 + 55 * t, 150 * t, 255), 6)
+  // Star field scattered around the stroke
+  ctx.fillStyle = '#fff'
+  for (let i = 0; i < 4; i++) {
+    const size = 1 + Math.random() * 2
+    ctx.beginPath()
+    ctx.arc(x2 + (Math.random() - 0.5) * 40, y2 + (Math.random() - 0.5) * 40, size, 0, Math.PI * 2)
+    ctx.fill()
+  }
+}
+
+function energy(ctx, x1, y1, x2, y2, t) {
+  const color = rgb(100 + 155 * t, 255, 200 + 55 * t)
+  ctx.lineWidth = 2
+  // Rings spiralling around the stroke end, fading with size
+  for (let i = 0; i < 3; i++) {
+    const angle = t * Math.PI * 4 + i * Math.PI * 2 / 3
+    const radius = 8 + i * 8
+    ctx.globalAlpha = 1 - i * 0.3
+    ctx.strokeStyle = color
+    ctx.beginPath()
+    ctx.arc(x2 + Math.cos(angle) * radius, y2 + Math.sin(angle) * radius, radius / 2, 0, Math.PI * 2)
+    ctx.stroke()
+  }
+  ctx.globalAlpha = 1
+  line(ctx, x1, y1, x2, y2, color, 4)
+}
+
+export const BRUSHES = { neon, lightning, fire, galaxy, energy }
+
+// Trail particle color for a brush at time t, as the server's draw_strokes picks it
+export const particleColor = (t) => rgb(100 + 155 * t, 200 + 55 * t, 255)
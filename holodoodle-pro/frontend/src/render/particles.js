@@ -0,0 +1,67 @@
+// Struct-of-arrays particle store, the browser twin of backend/engine/particles
+export class ParticleSystem {
+  constructor(maxParticles = 300, gravity = 0.2, friction = 0.98) {
+    this.maxParticles = maxParticles
+    this.gravity = gravity
+    this.friction = friction
+    this.count = 0
+    this.x = new Float32Array(maxParticles)
+    this.y = new Float32Array(maxParticles)
+    this.vx = new Float32Array(maxParticles)
+    this.vy = new Float32Array(maxParticles)
+    this.size = new Float32Array(maxParticles)
+    this.age = new Float32Array(maxParticles)
+    this.lifetime = new Float32Array(maxParticles)
+    this.color = new Array(maxParticles)
+  }
+
+  clear() {
+    this.count = 0
+  }
+
+  spawnTrail(x, y, color, count = 3) {
+    const n = Math.min(count, this.maxParticles - this.count)
+    for (let i = this.count; i < this.count + n; i++) {
+      this.x[i] = x
+      this.y[i] = y
+      this.vx[i] = Math.random() * 2 - 1
+      this.vy[i] = Math.random() * 2 - 1
+      this.size[i] = 2 + Math.random() * 2
+      this.age[i] = 0
+      this.lifetime[i] = 10 + Math.random() * 10
+      this.color[i] = color
+    }
+    this.count += n
+  }
+
+  // Integrate one frame, cull dead particles (live ones stay packed in [0, count)) and draw
+  update(ctx) {
+    let live = 0
+    for (let i = 0; i < this.count; i++) {
+      const age = this.age[i] + 1
+      const size = this.size[i] - 0.1
+      if (age >= this.lifetime[i] || size <= 0) continue
+      this.x[live] = this.x[i] + this.vx[i]
+      this.y[live] = this.y[i] + this.vy[i]
+      this.vx[live] = this.vx[i] * this.friction
+      this.vy[live] = (this.vy[i] + this.gravity) * this.friction
+      this.size[live] = size
+      this.age[live] = age
+      this.lifetime[live] = this.lifetime[i]
+      this.color[live] = this.color[i]
+      live++
+    }
+    this.count = live
+
+    ctx.save()
+    ctx.globalCompositeOperation = 'lighter'
+    for (let i = 0; i < live; i++) {
+      ctx.globalAlpha = 1 - this.age[i] / this.lifetime[i]
+      ctx.fillStyle = this.color[i]
+      ctx.beginPath()
+      ctx.arc(this.x[i], this.y[i], this.size[i], 0, Math.PI * 2)
+      ctx.fill()
+    }
+    ctx.restore()
+  }
+}
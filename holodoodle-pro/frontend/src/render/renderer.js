@@ -0,0 +1,216 @@
+import { BRUSHES, particleColor } from './brushes'
+import { ParticleSystem } from './particles'
+
+// mp.solutions.hands.HAND_CONNECTIONS, as in backend/engine/gesture.py
+const HAND_CONNECTIONS = [
+  [0, 1], [1, 2], [2, 3], [3, 4], [0, 5], [5, 6], [6, 7], [7, 8],
+  [5, 9], [9, 10], [10, 11], [11, 12], [9, 13], [13, 14], [14, 15], [15, 16],
+  [13, 17], [0, 17], [17, 18], [18, 19], [19, 20],
+]
+const FADE_ALPHA = 0.05      // stroke layer fade per frame, like Canvas.fade
+const TIP_SMOOTHING = 0.5    // EMA weight of the newest fingertip position
+const MIN_STEP = 2           // px the tip must move before a segment is drawn
+const RIPPLE_MS = 400
+
+function makeCanvas(width, height) {
+  const canvas = document.createElement('canvas')
+  canvas.width = width
+  canvas.height = height
+  return canvas
+}
+
+// Client-side rendering of a landmark stream (see useLandmarkStream): keeps the
+// fading stroke layer and particles, and composes them with effects over a
+// background (the browser's own camera, or black) into the output canvas.
+export class ClientRenderer {
+  constructor(width = 640, height = 480, maxParticles = 300) {
+    this.width = width
+    this.height = height
+    this.particles = new ParticleSystem(maxParticles)
+    this.strokes = makeCanvas(width, height)
+    this.tips = new Map()   // hand id -> smoothed fingertip
+    this.hands = []
+    this.rippleStart = null
+    this.frame = 0
+
+    // VHS noise: one random tile drawn at a random offset every frame
+    this.noise = makeCanvas(256, 256)
+    const noiseCtx = this.noise.getContext('2d')
+    const pixels = noiseCtx.createImageData(256, 256)
+    for (let i = 0; i < pixels.data.length; i += 4) {
+      const v = Math.random() * 255
+      pixels.data[i] = pixels.data[i + 1] = pixels.data[i + 2] = v
+      pixels.data[i + 3] = 40
+    }
+    noiseCtx.putImageData(pixels, 0, 0)
+  }
+
+  // Apply one landmarks event: { hands: [{ id, gesture, brush, drawing, points: Float32Array(63) }] },
+  // or a late joiner's { backlog } of recent strokes
+  handle(event) {
+    if (event.backlog) this.drawBacklog(event.backlog)
+    for (const hand of event.hands) {
+      if (hand.gesture === 'fist') {
+        this.strokes.getContext('2d').clearRect(0, 0, this.width, this.height)
+        this.particles.clear()
+      } else if (hand.gesture === 'peace') {
+        this.rippleStart = performance.now()
+      }
+    }
+
+    this.hands = event.hands
+    const t = (this.frame % 1000) / 1000
+    const ctx = this.strokes.getContext('2d')
+    ctx.save()
+    ctx.lineCap = 'round'
+    ctx.lineJoin = 'round'
+    const seen = new Set()
+    for (const hand of event.hands) {
+      seen.add(hand.id)
+      // Each hand has its own pinch toggle; the room-wide flag only mirrors one hand
+      if (!hand.drawing) {
+        this.tips.delete(hand.id)
+        continue
+      }
+      this.stroke(ctx, hand, t)
+    }
+    ctx.restore()
+    // Hands that left the frame lift their pen
+    for (const id of this.tips.keys()) {
+      if (!seen.has(id)) this.tips.delete(id)
+    }
+  }
+
+  // Extend one hand's stroke towards its index fingertip
+  stroke(ctx, hand, t) {
+    const x = hand.points[8 * 3] * this.width
+    const y = hand.points[8 * 3 + 1] * this.height
+    const tip = this.tips.get(hand.id)
+    if (!tip) {
+      this.tips.set(hand.id, { x, y })
+      return
+    }
+    const nx = tip.x + TIP_SMOOTHING * (x - tip.x)
+    const ny = tip.y + TIP_SMOOTHING * (y - tip.y)
+    if (Math.hypot(nx - tip.x, ny - tip.y) < MIN_STEP) return
+
+    const brush = BRUSHES[hand.brush] || BRUSHES.neon
+    brush(ctx, tip.x, tip.y, nx, ny, t)
+    this.particles.spawnTrail(nx, ny, particleColor(t), 3)
+    this.tips.set(hand.id, { x: nx, y: ny })
+  }
+
+  // Strokes drawn before this viewer joined, faded as much as they would have been by now
+  drawBacklog(backlog) {
+    const ctx = this.strokes.getContext('2d')
+    const { width, height } = this
+    ctx.save()
+    ctx.lineCap = 'round'
+    ctx.lineJoin = 'round'
+    for (const { age, brush, t, points } of backlog) {
+      const alpha = (1 - FADE_ALPHA) ** (age * 60)
+      if (alpha < 0.02) continue
+      const draw = BRUSHES[brush] || BRUSHES.neon
+      for (let i = 2; i < points.length; i += 2) {
+        ctx.globalAlpha = alpha  // some brushes reset it
+        draw(ctx, points[i - 2] * width, points[i - 1] * height, points[i] * width, points[i + 1] * height, t)
+      }
+    }
+    ctx.restore()
+  }
+
+  // Draw one output frame onto ctx; background is a video element or null
+  draw(ctx, background, state) {
+    const { width, height } = this
+    this.frame++
+
+    // Fade the stroke layer towards transparent
+    const strokes = this.strokes.getContext('2d')
+    strokes.save()
+    strokes.globalCompositeOperation = 'destination-out'
+    strokes.fillStyle = `rgba(0, 0, 0, ${FADE_ALPHA})`
+    strokes.fillRect(0, 0, width, height)
+    strokes.restore()
+
+    ctx.save()
+    ctx.fillStyle = '#000'
+    ctx.fillRect(0, 0, width, height)
+    if (background) {
+      // Mirrored like the server's capture
+      ctx.translate(width, 0)
+      ctx.scale(-1, 1)
+      ctx.drawImage(background, 0, 0, width, height)
+      ctx.setTransform(1, 0, 0, 1, 0, 0)
+    }
+
+    ctx.globalCompositeOperation = 'lighter'
+    if (state.glow) {
+      // Glow: blurred copies of the drawing pulled apart sideways, added under it
+      ctx.globalAlpha = 0.5
+      ctx.filter = 'blur(4px)'
+      ctx.drawImage(this.strokes, -3, 0)
+      ctx.drawImage(this.strokes, 3, 0)
+      ctx.filter = 'none'
+      ctx.globalAlpha = 1
+    }
+    ctx.drawImage(this.strokes, 0, 0)
+    ctx.restore()
+
+    this.particles.update(ctx)
+    for (const hand of this.hands) this.drawSkeleton(ctx, hand.points)
+    this.drawRipple(ctx)
+    if (state.glitch) this.drawGlitch(ctx)
+  }
+
+  drawSkeleton(ctx, p) {
+    const { width, height } = this
+    ctx.save()
+    ctx.strokeStyle = 'rgb(224, 224, 224)'
+    ctx.lineWidth = 2
+    ctx.beginPath()
+    for (const [a, b] of HAND_CONNECTIONS) {
+      ctx.moveTo(p[a * 3] * width, p[a * 3 + 1] * height)
+      ctx.lineTo(p[b * 3] * width, p[b * 3 + 1] * height)
+    }
+    ctx.stroke()
+    ctx.fillStyle = 'rgb(255, 0, 0)'
+    for (let i = 0; i < 21; i++) {
+      ctx.beginPath()
+      ctx.arc(p[i * 3] * width, p[i * 3 + 1] * height, 2, 0, Math.PI * 2)
+      ctx.fill()
+    }
+    ctx.restore()
+  }
+
+  drawRipple(ctx) {
+    if (this.rippleStart === null) return
+    const k = (performance.now() - this.rippleStart) / RIPPLE_MS
+    if (k >= 1) {
+      this.rippleStart = null
+      return
+    }
+    ctx.save()
+    ctx.strokeStyle = `rgba(255, 255, 255, ${1 - k})`
+    ctx.lineWidth = 4
+    ctx.beginPath()
+    ctx.arc(this.width / 2, this.height / 2, 50 + k * 150, 0, Math.PI * 2)
+    ctx.stroke()
+    ctx.restore()
+  }
+
+  // Glitch: a few horizontal slices shifted sideways, then VHS noise on top
+  drawGlitch(ctx) {
+    const { width, height } = this
+    const canvas = ctx.canvas
+    for (let i = 0; i < 3; i++) {
+      const y = Math.random() * height
+      const h = 4 + Math.random() * 16
+      ctx.drawImage(canvas, 0, y, width, h, (Math.random() - 0.5) * 20, y, width, h)
+    }
+    ctx.save()
+    ctx.translate(-Math.random() * 256, -Math.random() * 256)
+    ctx.fillStyle = ctx.createPattern(this.noise, 'repeat')
+    ctx.fillRect(0, 0, width + 256, height + 256)
+    ctx.restore()
+  }
+}